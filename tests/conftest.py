@@ -0,0 +1,31 @@
+import os
+import sys
+
+import pytest
+
+# The game modules live flat in the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import xonix_field
+
+BACKENDS = ('list', 'numpy', 'bitboard', 'chunked')
+
+def build_field(rows, backend, unfilled=0, filled=1):
+    # A field of the given backend holding the values of plain rows
+    if backend == 'numpy':
+        if not xonix_field.numpy_available():
+            pytest.skip("numpy is not installed")
+        return xonix_field.np.array(rows, dtype=xonix_field.np.uint8)
+    if backend == 'bitboard':
+        return xonix_field.BitboardField.from_rows(rows, unfilled, filled)
+    if backend == 'chunked':
+        field = xonix_field.ChunkedField(len(rows[0]), len(rows), unfilled, filled)
+        for y, row in enumerate(rows):
+            for x, value in enumerate(row):
+                if value != field.default_value(y, x):
+                    field.set(y, x, value)
+        return field
+    return [list(row) for row in rows]
+
+def plain_rows(game_field):
+    return [list(row) for row in xonix_field.field_rows(game_field)]
@@ -0,0 +1,94 @@
+import random
+
+import pytest
+from conftest import plain_rows
+
+import xonix_field
+import xonix_headless
+import xonix_logic
+import xonix_snapshot
+import xonix_tournament
+
+def random_rows(seed, width=23, height=17, values=(0, 1, 2, 3)):
+    rng = random.Random(seed)
+    return [[rng.choice(values) for _ in range(width)] for _ in range(height)]
+
+@pytest.mark.parametrize('seed', range(5))
+def test_rows_round_trip_and_reads(seed):
+    rows = random_rows(seed)
+    field = xonix_field.BitboardField.from_rows(rows, 0, 1)
+    assert field.rows() == rows
+    assert all(field.get(y, x) == value for y, row in enumerate(rows) for x, value in enumerate(row))
+    assert all(field[y][x] == value for y, row in enumerate(rows) for x, value in enumerate(row))
+    for value in range(4):
+        assert field.count(value) == sum(row.count(value) for row in rows)
+        cells = field.bit_cells(field.board(value))
+        assert cells == [(y, x) for y, row in enumerate(rows) for x, cell in enumerate(row) if cell == value]
+        assert field.cells_mask(cells) == field.board(value)
+
+def test_writes_move_cells_between_boards():
+    rows = random_rows(7)
+    field = xonix_field.BitboardField.from_rows(rows, 0, 1)
+    rng = random.Random(7)
+    for _ in range(200):
+        y, x, value = rng.randrange(17), rng.randrange(23), rng.randrange(5)
+        field.set(y, x, value)
+        rows[y][x] = value
+    cells = [(y, x) for y in range(0, 17, 2) for x in range(3, 9)]
+    field.move_bits(field.cells_mask(cells), 1)
+    for y, x in cells:
+        rows[y][x] = 1
+    assert field.rows() == rows
+    mask = field.cells_mask(cells)
+    assert field.row_counts(mask) == {y: 6 for y in range(0, 17, 2)}
+
+def test_copy_and_equality():
+    field = xonix_field.BitboardField.from_rows(random_rows(2), 0, 1)
+    copied = field.copy()
+    assert copied == field
+    copied.set(5, 5, 3 if field.get(5, 5) != 3 else 2)
+    assert copied != field
+    assert field.rows() == random_rows(2)
+
+def test_dilation_stays_inside_its_row():
+    # Bits at the end of one row must not leak into the start of the next
+    rows = [[0] * 6 for _ in range(3)]
+    rows[1][0] = 1
+    field = xonix_field.BitboardField.from_rows(rows, 0, 1)
+    start = field.positions_mask([(5, 0)])
+    grown = field.dilate(start, field.board(0))
+    assert {(x, y) for y, x in field.bit_cells(grown)} == {(x, y) for y in range(3) for x in range(6)} - {(0, 1)}
+
+def play(config, seed, ticks):
+    engine = xonix_headless.HeadlessEngine(config, seed)
+    policy = xonix_tournament.ScriptedPolicy(config, seed)
+    history = []
+    for _ in range(ticks):
+        engine.step(policy.decide(engine.game_state))
+        game_state = engine.game_state
+        history.append((game_state.score, game_state.level, game_state.lives,
+                        [(enemy.x, enemy.y) for enemy in game_state.enemies]))
+    return history, plain_rows(engine.game_state.game_field), engine
+
+@pytest.mark.parametrize('size', ['small', 'big'])
+@pytest.mark.parametrize('seed', [1, 5])
+def test_games_match_the_list_backend(size, seed):
+    results = []
+    for backend in ('list', 'bitboard'):
+        config = xonix_logic.GameConfig('classic', size)
+        config.apply_settings({'FIELD_BACKEND': backend})
+        results.append(play(config, seed, 2500))
+    (list_history, list_rows, _), (bit_history, bit_rows, engine) = results
+    assert xonix_field.is_bitboard_field(engine.game_state.game_field)
+    assert bit_history == list_history
+    assert bit_rows == list_rows
+
+def test_clone_does_not_write_through():
+    config = xonix_logic.GameConfig('classic', 'small')
+    config.apply_settings({'FIELD_BACKEND': 'bitboard'})
+    _, rows, engine = play(config, 3, 300)
+    clone = engine.game_state.clone()
+    clone.fill_trail([(x, 10) for x in range(3, 20)])
+    assert plain_rows(engine.game_state.game_field) == rows
+    restored = xonix_snapshot.load_snapshot(xonix_snapshot.save_snapshot(engine.game_state))
+    assert restored.game_field == engine.game_state.game_field
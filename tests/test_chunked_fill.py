@@ -0,0 +1,107 @@
+import random
+
+import pytest
+from conftest import build_field, plain_rows
+
+import xonix_field
+
+UNFILLED = 0
+FILLED = 1
+
+class CountingField(xonix_field.ChunkedField):
+    # Counts cell reads, which is what the flood's work is made of
+    reads = 0
+
+    def get(self, y, x):
+        self.reads += 1
+        return super().get(y, x)
+
+def counting_field(width, height):
+    return CountingField(width, height, UNFILLED, FILLED)
+
+def trail_seeds(game_field, trail):
+    # Unfilled cells next to the trail, the way GameState picks them
+    seeds = set()
+    for x, y in trail:
+        for seed in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)):
+            if (0 <= seed[0] < game_field.width and 0 <= seed[1] < game_field.height and
+                    game_field.get(seed[1], seed[0]) == UNFILLED):
+                seeds.add(seed)
+    return sorted(seeds)
+
+def notch_trail(x0, width, depth):
+    # Down from the top border, across and back up: encloses width x depth cells
+    top = xonix_field.BORDER_ROWS
+    return ([(x0, y) for y in range(top, top + depth + 1)] +
+            [(x, top + depth) for x in range(x0 + 1, x0 + width + 1)] +
+            [(x0 + width + 1, y) for y in range(top + depth, top - 1, -1)])
+
+def close_trail(game_field, trail):
+    for x, y in trail:
+        game_field.set(y, x, FILLED)
+
+def fill_both_ways(rows, trail, blocked):
+    # Fill a chunked copy by flooding and a list copy by labelling; returns both fields and counts
+    chunked = build_field(rows, 'chunked')
+    listed = build_field(rows, 'list')
+    for x, y in trail:
+        listed[y][x] = FILLED
+    close_trail(chunked, trail)
+    seeds = trail_seeds(chunked, trail)
+    counts = (xonix_field.fill_enclosed_regions(chunked, seeds, UNFILLED, blocked, FILLED),
+              xonix_field.fill_enclosed_regions(listed, seeds, UNFILLED, blocked, FILLED))
+    return plain_rows(chunked), listed, counts
+
+@pytest.mark.parametrize('size', [600, 2000])
+def test_notch_work_follows_the_enclosed_area(size):
+    game_field = counting_field(size, size)
+    trail = notch_trail(10, 3, 4)
+    close_trail(game_field, trail)
+    seeds = trail_seeds(game_field, trail)
+    row_counts = {}
+    filled = xonix_field.fill_enclosed_regions(game_field, seeds, UNFILLED, [(size // 2, size // 2)], FILLED, row_counts)
+    assert filled == 12
+    assert row_counts == {y: 3 for y in range(2, 6)}
+    # The open side only grows while the notch does
+    assert game_field.reads < 400
+
+def test_notch_matches_labelling():
+    rows = plain_rows(xonix_field.ChunkedField(300, 200, UNFILLED, FILLED))
+    chunked, listed, counts = fill_both_ways(rows, notch_trail(40, 5, 7), [(150, 100)])
+    assert chunked == listed
+    assert counts == (35, 35)
+
+def test_enclosed_crocodile_leaves_the_other_side_to_be_filled():
+    # A wall splits the map into A (crocodile far away) and B. The trail cuts B into a
+    # small piece holding B's crocodile and a large empty side, which must be filled.
+    width, height = 120, 80
+    rows = plain_rows(xonix_field.ChunkedField(width, height, UNFILLED, FILLED))
+    for y in range(height):
+        rows[y][60] = FILLED
+    trail = notch_trail(70, 6, 6)
+    chunked, listed, counts = fill_both_ways(rows, trail, [(20, 40), (73, 5)])
+    assert chunked == listed
+    assert counts[0] == counts[1] > 1000
+
+@pytest.mark.parametrize('seed', range(6))
+def test_regions_holding_a_blocked_cell_match_labelling(seed):
+    # Walls split the map into regions that each hold a crocodile, as in a game; then
+    # a random rectangle trail is closed against the top border
+    rng = random.Random(seed)
+    width, height = 90, 60
+    rows = plain_rows(xonix_field.ChunkedField(width, height, UNFILLED, FILLED))
+    for _ in range(3):
+        wall_x = rng.randrange(8, width - 8)
+        for y in range(height):
+            rows[y][wall_x] = FILLED
+    trail = notch_trail(rng.randrange(4, width - 20), rng.randrange(2, 12), rng.randrange(2, height - 8))
+    trail_cells = set(trail)
+    labels, _ = xonix_field.label_regions(rows, UNFILLED)
+    blocked = []
+    for label in {label for row in labels for label in row if label}:
+        cells = [(x, y) for y, row in enumerate(labels) for x, cell in enumerate(row)
+                 if cell == label and (x, y) not in trail_cells]
+        blocked.append(rng.choice(cells))
+    chunked, listed, counts = fill_both_ways(rows, trail, blocked)
+    assert chunked == listed
+    assert counts[0] == counts[1]
@@ -0,0 +1,34 @@
+import pytest
+
+import xonix_logic
+import xonix_replay
+import xonix_tournament
+
+DERIVED = ('UNITS_TO_WIN', 'SCORE_FONT_SIZE', 'MESSAGE_FONT_SIZE', 'SCORE_SPACE', 'GAME_AREA_WIDTH',
+           'GAME_AREA_HEIGHT', 'VIEW_WIDTH', 'VIEW_HEIGHT', 'SCREEN_HEIGHT', 'PLAYER_SPEED', 'ENEMY_SPEED',
+           'FIELD_BACKEND')
+
+@pytest.mark.parametrize('layout', [{'GAME_LOGIC_AREA_WIDTH': 200},
+                                    {'GAME_LOGIC_AREA_HEIGHT': 90, 'UNIT_SIZE': 8},
+                                    {'GAME_LOGIC_AREA_WIDTH': 600, 'GAME_LOGIC_AREA_HEIGHT': 500, 'UNIT_SIZE': 2}])
+def test_layout_settings_match_the_custom_map_constructor(layout):
+    config = xonix_logic.GameConfig('classic', 'small')
+    config.apply_settings(layout)
+    expected = xonix_logic.GameConfig('classic', 'small', layout.get('GAME_LOGIC_AREA_WIDTH'),
+                                      layout.get('GAME_LOGIC_AREA_HEIGHT'), layout.get('UNIT_SIZE'))
+    for name in DERIVED:
+        assert getattr(config, name) == getattr(expected, name), name
+
+def test_explicit_settings_win_over_derived_ones():
+    config = xonix_tournament.make_config('big', {'GAME_LOGIC_AREA_WIDTH': 120, 'UNITS_TO_WIN': 77})
+    assert config.UNITS_TO_WIN == 77
+
+def test_replayed_layout_keeps_its_win_threshold():
+    config = xonix_logic.GameConfig('classic', 'small')
+    config.apply_settings({'GAME_LOGIC_AREA_WIDTH': 80, 'GAME_LOGIC_AREA_HEIGHT': 60})
+    loaded = xonix_replay.Replay.from_bytes(xonix_replay.Replay(config, 1, b'').to_bytes())
+    assert loaded.config.UNITS_TO_WIN == config.UNITS_TO_WIN != xonix_logic.GameConfig('classic', 'small').UNITS_TO_WIN
+
+def test_too_small_layout_is_rejected():
+    with pytest.raises(ValueError):
+        xonix_logic.GameConfig('classic', 'small').apply_settings({'GAME_LOGIC_AREA_WIDTH': 5})
@@ -0,0 +1,105 @@
+import random
+
+import pytest
+from conftest import BACKENDS, build_field
+
+import xonix_enemies
+import xonix_field
+import xonix_logic
+
+def make_rows(config, seed, boxes=12):
+    # The starting layout with some filled rectangles inside for enemies to bounce off
+    rng = random.Random(seed)
+    rows = [list(row) for row in xonix_field.field_rows(xonix_field.create_game_field(config))]
+    width = config.GAME_LOGIC_AREA_WIDTH
+    height = config.GAME_LOGIC_AREA_HEIGHT
+    for _ in range(boxes):
+        x0 = rng.randrange(xonix_field.BORDER_COLUMNS, width - 8)
+        y0 = rng.randrange(xonix_field.BORDER_ROWS, height - 6)
+        for y in range(y0, y0 + rng.randint(1, 4)):
+            for x in range(x0, x0 + rng.randint(1, 6)):
+                rows[y][x] = config.GAME_FIELD_FILLED
+    return rows
+
+def make_enemies(config, rows, seed, crocodiles):
+    # Crocodiles on unfilled cells, wolves on the filled top border
+    rng = random.Random(seed)
+    unit = config.UNIT_SIZE
+    open_cells = [(x, y) for y, row in enumerate(rows) for x, value in enumerate(row)
+                  if value == config.GAME_FIELD_UNFILLED]
+    enemies = [xonix_logic.Enemy(x * unit, y * unit, 'unfilled', config, rng)
+               for x, y in rng.sample(open_cells, crocodiles)]
+    for x in rng.sample(range(config.GAME_LOGIC_AREA_WIDTH), 3):
+        enemies.append(xonix_logic.Enemy(x * unit, 0, 'filled', config, rng))
+    return enemies
+
+def enemy_states(enemies):
+    return [(enemy.x, enemy.y, enemy.dx, enemy.dy, enemy.type) for enemy in enemies]
+
+def baseline_move_until_collision(enemies, game_field, config, player_cell, player_on_unfilled, line_cells):
+    # Enemy.move one enemy at a time, checking each for a hit right after it moves
+    unit = config.UNIT_SIZE
+    for index, enemy in enumerate(enemies):
+        enemy.move(game_field)
+        enemy_cell = (enemy.x // unit, enemy.y // unit)
+        if enemy_cell == player_cell:
+            if enemy.type == 'filled':
+                return index, xonix_enemies.HIT_WOLF
+            if player_on_unfilled:
+                return index, xonix_enemies.HIT_CROCODILE
+        elif enemy.type == 'unfilled' and enemy_cell in line_cells:
+            return index, xonix_enemies.HIT_TRAIL
+    return None
+
+@pytest.mark.parametrize('backend', BACKENDS)
+@pytest.mark.parametrize('crocodiles', [5, 40])
+def test_group_moves_like_enemy_move(backend, crocodiles):
+    # 40 crocodiles on a numpy field take the vectorized path, everything else the scalar one
+    config = xonix_logic.GameConfig('classic', 'small')
+    rows = make_rows(config, crocodiles)
+    enemies = make_enemies(config, rows, crocodiles, crocodiles)
+    group = xonix_enemies.EnemyGroup(config)
+    for enemy in enemies:
+        group.append(enemy)
+    game_field = build_field(rows, backend)
+    for _ in range(400):
+        for enemy in enemies:
+            enemy.move(rows)
+        group.move_all(game_field)
+        assert enemy_states(group) == enemy_states(enemies)
+
+@pytest.mark.parametrize('backend', BACKENDS)
+@pytest.mark.parametrize('crocodiles', [5, 40])
+def test_move_until_collision_stops_at_the_same_hit(backend, crocodiles):
+    config = xonix_logic.GameConfig('classic', 'small')
+    rows = make_rows(config, crocodiles + 1)
+    enemies = make_enemies(config, rows, crocodiles + 1, crocodiles)
+    group = xonix_enemies.EnemyGroup(config)
+    for enemy in enemies:
+        group.append(enemy)
+    game_field = build_field(rows, backend)
+    # A long trail across the field so crocodiles cross it regularly
+    trail_y = config.GAME_LOGIC_AREA_HEIGHT // 2
+    line_cells = {(x, trail_y) for x in range(xonix_field.BORDER_COLUMNS, config.GAME_LOGIC_AREA_WIDTH - xonix_field.BORDER_COLUMNS)}
+    rng = random.Random(crocodiles)
+    hits = 0
+    for _ in range(400):
+        player_cell = (rng.randrange(config.GAME_LOGIC_AREA_WIDTH), rng.randrange(config.GAME_LOGIC_AREA_HEIGHT))
+        player_on_unfilled = rows[player_cell[1]][player_cell[0]] == config.GAME_FIELD_UNFILLED
+        expected = baseline_move_until_collision(enemies, rows, config, player_cell, player_on_unfilled, line_cells)
+        assert group.move_until_collision(game_field, player_cell, player_on_unfilled, line_cells) == expected
+        assert enemy_states(group) == enemy_states(enemies)
+        hits += expected is not None
+    assert hits
+
+def test_copy_is_independent():
+    config = xonix_logic.GameConfig('classic', 'small')
+    rows = make_rows(config, 1)
+    group = xonix_enemies.EnemyGroup(config)
+    for enemy in make_enemies(config, rows, 1, 4):
+        group.append(enemy)
+    copied = group.copy()
+    before = enemy_states(copied)
+    group.move_all(rows)
+    assert enemy_states(copied) == before
+    assert enemy_states(group) != before
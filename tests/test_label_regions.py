@@ -0,0 +1,102 @@
+import random
+
+import pytest
+from conftest import BACKENDS, build_field, plain_rows
+
+import xonix_field
+import xonix_logic
+
+UNFILLED = 0
+FILLED = 1
+TEMP = 2
+
+def random_rows(seed, width=30, height=20, walls=0.35):
+    # Border filled, interior cut into many regions by random filled cells
+    rng = random.Random(seed)
+    rows = []
+    for y in range(height):
+        row = []
+        for x in range(width):
+            border = not (xonix_field.BORDER_COLUMNS <= x < width - xonix_field.BORDER_COLUMNS and
+                          xonix_field.BORDER_ROWS <= y < height - xonix_field.BORDER_ROWS)
+            row.append(FILLED if border or rng.random() < walls else UNFILLED)
+        rows.append(row)
+    return rows
+
+def random_positions(seed, rows, count):
+    rng = random.Random(seed)
+    return [(rng.randrange(len(rows[0])), rng.randrange(len(rows))) for _ in range(count)]
+
+def baseline_state(rows):
+    config = xonix_logic.GameConfig('classic', 'custom', len(rows[0]), len(rows), 10)
+    config.apply_settings({'FIELD_BACKEND': 'list'})
+    game_state = xonix_logic.GameState(config)
+    game_state.game_field = [row[:] for row in rows]
+    return game_state
+
+def baseline_fill(rows, seeds, blocked):
+    # The original algorithm: flood each seed with a temporary value, fill the
+    # floods that reached no blocked cell and turn the others back
+    game_state = baseline_state(rows)
+    field = game_state.game_field
+    blocked = set(blocked)
+    filled = 0
+    for x, y in seeds:
+        if field[y][x] != UNFILLED:
+            continue
+        area = game_state.temp_flood_fill((x, y), TEMP, [FILLED, TEMP])
+        if not any((area_x, area_y) in blocked for area_y, area_x in area):
+            for area_y, area_x in area:
+                field[area_y][area_x] = FILLED
+            filled += len(area)
+    for row in field:
+        for x, value in enumerate(row):
+            if value == TEMP:
+                row[x] = UNFILLED
+    return field, filled
+
+@pytest.mark.parametrize('seed', range(8))
+def test_labels_match_flood_fill(seed):
+    rows = random_rows(seed)
+    labels, sizes = xonix_field.label_regions(rows, UNFILLED)
+    seen = set()
+    for y, row in enumerate(rows):
+        for x, value in enumerate(row):
+            label = labels[y][x]
+            assert (label == 0) == (value != UNFILLED)
+            if not label or label in seen:
+                continue
+            seen.add(label)
+            area = baseline_state(rows).temp_flood_fill((x, y), TEMP, [FILLED, TEMP])
+            assert {labels[area_y][area_x] for area_y, area_x in area} == {label}
+            assert len(area) == sizes[label]
+    assert seen == set(range(1, len(sizes)))
+
+@pytest.mark.parametrize('backend', BACKENDS)
+@pytest.mark.parametrize('seed', range(6))
+def test_fill_enclosed_regions_matches_baseline(backend, seed):
+    rows = random_rows(seed)
+    seeds = [(x, y) for x, y in random_positions(seed + 100, rows, 40) if rows[y][x] == UNFILLED]
+    blocked = random_positions(seed + 200, rows, 6)
+    expected, expected_count = baseline_fill(rows, seeds, blocked)
+
+    game_field = build_field(rows, backend)
+    row_counts = {}
+    changes = set()
+    count = xonix_field.fill_enclosed_regions(game_field, seeds, UNFILLED, blocked, FILLED, row_counts, changes)
+    assert plain_rows(game_field) == expected
+    assert count == expected_count
+    assert sum(row_counts.values()) == count
+    assert changes == {(y, x) for y, row in enumerate(rows) for x, value in enumerate(row) if value != expected[y][x]}
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_temp_flood_fill_is_the_same_on_every_backend(backend):
+    rows = random_rows(3, walls=0.2)
+    start = next((x, y) for y, row in enumerate(rows) for x, value in enumerate(row) if value == UNFILLED)
+    expected_state = baseline_state(rows)
+    expected_area = expected_state.temp_flood_fill(start, TEMP, [FILLED, TEMP])
+
+    game_state = baseline_state(rows)
+    game_state.game_field = build_field(rows, backend)
+    assert sorted(game_state.temp_flood_fill(start, TEMP, [FILLED, TEMP])) == sorted(expected_area)
+    assert plain_rows(game_state.game_field) == expected_state.game_field
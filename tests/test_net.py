@@ -0,0 +1,112 @@
+import asyncio
+import os
+import pytest
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import xonix_field
+import xonix_gui
+import xonix_headless
+import xonix_logic
+import xonix_net
+import xonix_server
+import xonix_snapshot
+from conftest import BACKENDS
+
+def read_frames(data):
+    return xonix_net.FrameBuffer().feed(data)
+
+def join(full_message, player_index=0, backend=None):
+    # A client app that has just applied the server's FULL, without opening a window
+    (message_type, payload), = read_frames(full_message)
+    assert message_type == xonix_net.MSG_FULL
+    app = xonix_gui.XonixApp()
+    app.config = xonix_snapshot.snapshot_config(xonix_net.decode_full(payload)[2])
+    if backend:
+        app.config.FIELD_BACKEND = backend
+    app.apply_full(payload, player_index)
+    return app
+
+def field_cells(game_state):
+    return [tuple(row) for row in xonix_field.field_rows(game_state.game_field)]
+
+def assert_in_step(app, game):
+    unit = game.config.UNIT_SIZE
+    assert field_cells(app.game_state) == field_cells(game.state)
+    assert list(app.game_state.enemies.cells()) == list(game.state.enemies.cells())
+    local = [app.game_state.player] + app.other_players
+    for client_player, server_player in zip(local, game.players):
+        assert (client_player.x // unit, client_player.y // unit) == (server_player.x // unit, server_player.y // unit)
+        assert client_player.line == server_player.line
+
+def test_frame_buffer_reassembles_split_frames():
+    data = xonix_net.encode_input(5) + xonix_net.encode_resync() + xonix_net.encode_welcome(1, 2)
+    frames = xonix_net.FrameBuffer()
+    messages = []
+    for index in range(0, len(data), 3):
+        messages.extend(frames.feed(data[index:index + 3]))
+    assert messages == [(xonix_net.MSG_INPUT, bytes([5])), (xonix_net.MSG_RESYNC, b''),
+                        (xonix_net.MSG_WELCOME, bytes([1, 2]))]
+
+def test_delta_round_trip():
+    runs = [(3, 4, 2, 1), (7, 0, 5, 1)]
+    players = [(4, 5, 3, 120, False, [(4, 5), (4, 6)]), (9, 1, 5, 0, True, [])]
+    enemies = [(10, 0), (20, 30)]
+    (message_type, payload), = read_frames(xonix_net.encode_delta(42, 3, runs, players, enemies))
+    assert message_type == xonix_net.MSG_DELTA
+    assert xonix_net.decode_delta(payload) == (42, 3, runs, players, enemies)
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_client_follows_server_through_deltas(backend):
+    if backend == 'numpy' and not xonix_field.numpy_available():
+        pytest.skip("numpy is not installed")
+    game = xonix_server.MultiplayerGame(xonix_logic.GameConfig('classic', 'small'), seed=9)
+    app = join(game.full_message(), backend=backend)
+    assert_in_step(app, game)
+    inputs = [xonix_headless.random_inputs(seed, 1500) for seed in (1, 2)]
+    for _ in range(1500):
+        game.keys = [next(player_inputs) for player_inputs in inputs]
+        game.tick()
+        (message_type, payload), = read_frames(game.tick_message())
+        if message_type == xonix_net.MSG_FULL:
+            app.apply_full(payload, 0)
+        else:
+            assert app.apply_delta(payload, 0)
+        assert_in_step(app, game)
+
+def test_enemy_count_mismatch_is_a_desync():
+    game = xonix_server.MultiplayerGame(xonix_logic.GameConfig('classic', 'small'), seed=3)
+    game.tick()
+    app = join(game.tick_message())  # The first tick message is a FULL
+    app.game_state.enemies.append(xonix_logic.Enemy(40, 40, 'unfilled', app.config))
+    before = field_cells(app.game_state)
+    game.tick()
+    (message_type, payload), = read_frames(game.tick_message())
+    assert message_type == xonix_net.MSG_DELTA
+    assert not app.apply_delta(payload, 0)
+    assert field_cells(app.game_state) == before
+
+def test_server_answers_resync_with_full():
+    async def exchange():
+        server = xonix_server.GameServer(xonix_logic.GameConfig('classic', 'small'), seed=4, player_count=1)
+        listener = await asyncio.start_server(server.handle_client, '127.0.0.1', 0)
+        port = listener.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        frames = xonix_net.FrameBuffer()
+        messages = []
+
+        async def read_until(count):
+            while len(messages) < count:
+                messages.extend(frames.feed(await reader.read(65536)))
+
+        await read_until(2)
+        writer.write(xonix_net.encode_resync())
+        await writer.drain()
+        await read_until(3)
+        writer.close()
+        listener.close()
+        await listener.wait_closed()
+        return [message_type for message_type, _ in messages]
+
+    assert asyncio.run(exchange()) == [xonix_net.MSG_WELCOME, xonix_net.MSG_FULL, xonix_net.MSG_FULL]
@@ -0,0 +1,96 @@
+import random
+
+import pytest
+from conftest import plain_rows
+
+import xonix_field
+import xonix_headless
+import xonix_logic
+import xonix_tournament
+
+UNFILLED = 0
+FILLED = 1
+
+def random_rows(seed, width=40, height=30, walls=0.2):
+    rng = random.Random(seed)
+    return [[FILLED if rng.random() < walls else UNFILLED for _ in range(width)] for _ in range(height)]
+
+def index_regions(index):
+    # {label: set of (x, y)} for every region in the index
+    regions = {}
+    for y in range(index.height):
+        for x in range(index.width):
+            label = index.label_at(x, y)
+            if label:
+                regions.setdefault(label, set()).add((x, y))
+    return regions
+
+def assert_matches_field(index, rows):
+    # Same regions as labelling the field from scratch, with consistent counts and boxes
+    fresh = index_regions(xonix_field.RegionIndex.from_field(rows, UNFILLED))
+    regions = index_regions(index)
+    assert sorted(map(sorted, regions.values())) == sorted(map(sorted, fresh.values()))
+    assert set(index.counts) == set(regions)
+    for label, cells in regions.items():
+        assert index.counts[label] == len(cells)
+        x0, y0, x1, y1 = index.bounds[label]
+        assert all(x0 <= x <= x1 and y0 <= y <= y1 for x, y in cells)
+
+@pytest.mark.parametrize('seed', range(10))
+def test_removing_cells_splits_like_relabelling(seed):
+    rows = random_rows(seed)
+    index = xonix_field.RegionIndex.from_field(rows, UNFILLED)
+    rng = random.Random(seed)
+    for _ in range(25):
+        # Straight strokes, like trails, cut regions apart
+        x, y = rng.randrange(len(rows[0])), rng.randrange(len(rows))
+        dx, dy = rng.choice([(1, 0), (0, 1)])
+        stroke = [(x + dx * step, y + dy * step) for step in range(rng.randint(1, 20))
+                  if x + dx * step < len(rows[0]) and y + dy * step < len(rows)]
+        for stroke_x, stroke_y in stroke:
+            rows[stroke_y][stroke_x] = FILLED
+        index.remove_cells(stroke)
+        assert_matches_field(index, rows)
+
+def test_take_region_returns_its_cells():
+    rows = random_rows(3)
+    index = xonix_field.RegionIndex.from_field(rows, UNFILLED)
+    regions = index_regions(index)
+    label = max(regions, key=lambda label: len(regions[label]))
+    taken = {(x, y) for y, xs in index.take_region(label) for x in xs}
+    assert taken == regions[label]
+    assert label not in index.counts and label not in index.bounds
+    assert all(index.label_at(x, y) == 0 for x, y in taken)
+
+def test_copy_is_independent():
+    rows = random_rows(4)
+    index = xonix_field.RegionIndex.from_field(rows, UNFILLED)
+    copied = index.copy()
+    before = index_regions(copied)
+    index.remove_cells([(x, 15) for x in range(40)])
+    assert index_regions(copied) == before
+
+def run_game(config, seed, ticks, use_index):
+    engine = xonix_headless.HeadlessEngine(config, seed)
+    game_state = engine.game_state
+    if not use_index:
+        # Without an index handle_area_filling labels the whole field on every fill
+        game_state.writable_regions = lambda: None
+    policy = xonix_tournament.ScriptedPolicy(config, seed)
+    states = []
+    for _ in range(ticks):
+        engine.step(policy.decide(game_state))
+        game_state = engine.game_state
+        states.append((game_state.score, game_state.filled_units, game_state.level, game_state.lives))
+    return states, plain_rows(game_state.game_field)
+
+@pytest.mark.parametrize('backend', ['list', 'numpy'])
+@pytest.mark.parametrize('seed', [1, 2])
+def test_games_match_fills_without_the_index(backend, seed):
+    if backend == 'numpy' and not xonix_field.numpy_available():
+        pytest.skip("numpy is not installed")
+    config = xonix_logic.GameConfig('classic', 'small')
+    config.apply_settings({'FIELD_BACKEND': backend})
+    with_index = run_game(config, seed, 3000, True)
+    assert with_index == run_game(config, seed, 3000, False)
+    assert with_index[0][-1][0] > 0
@@ -0,0 +1,54 @@
+import pytest
+
+import xonix_field
+import xonix_headless
+import xonix_logic
+import xonix_replay
+
+def record_replay(config, seed, ticks):
+    recorder = xonix_replay.ReplayRecorder(config, seed)
+    for keys_pressed in xonix_headless.random_inputs(seed, ticks):
+        recorder.record(keys_pressed)
+    return recorder.replay
+
+def engine_state(engine):
+    game_state = engine.game_state
+    return (game_state.level, game_state.lives, game_state.score,
+            [tuple(row) for row in xonix_field.field_rows(game_state.game_field)])
+
+def test_round_trip_keeps_keys_and_header():
+    config = xonix_logic.GameConfig('classic', 'small')
+    replay = record_replay(config, 3, 500)
+    loaded = xonix_replay.Replay.from_bytes(replay.to_bytes())
+    assert loaded.seed == 3
+    assert loaded.key_log == replay.key_log
+    assert loaded.config.size == 'small'
+    assert loaded.config.FIELD_BACKEND == config.FIELD_BACKEND
+    assert xonix_replay.changed_settings(loaded.config) == {}
+
+def test_round_trip_keeps_changed_settings():
+    config = xonix_logic.GameConfig('classic', 'small')
+    config.apply_settings({'CROCODILES_PER_LEVEL': 4, 'WIN_MODE': 'percent', 'WIN_PERCENT': 40,
+                           'ENEMY_SPEED': 2 * config.UNIT_SIZE, 'FIELD_BACKEND': 'bitboard'})
+    replay = record_replay(config, 7, 3000)
+    loaded = xonix_replay.Replay.from_bytes(replay.to_bytes())
+    for name in xonix_logic.RECORDED_SETTINGS:
+        assert getattr(loaded.config, name) == getattr(config, name), name
+    assert engine_state(xonix_replay.fast_forward(loaded)) == engine_state(xonix_replay.fast_forward(replay))
+
+def test_custom_map_round_trip():
+    config = xonix_logic.GameConfig('classic', 'custom', 50, 40, 10)
+    config.apply_settings({'WIN_PERCENT': 50})
+    loaded = xonix_replay.Replay.from_bytes(record_replay(config, 1, 200).to_bytes())
+    assert (loaded.config.GAME_LOGIC_AREA_WIDTH, loaded.config.GAME_LOGIC_AREA_HEIGHT) == (50, 40)
+    assert loaded.config.UNIT_SIZE == 10
+    assert loaded.config.WIN_PERCENT == 50
+
+def test_unknown_setting_is_rejected():
+    config = xonix_logic.GameConfig('classic', 'small')
+    with pytest.raises(ValueError):
+        config.apply_settings({'NOT_A_SETTING': 1})
+
+def test_bad_magic_is_rejected():
+    with pytest.raises(ValueError):
+        xonix_replay.Replay.from_bytes(b'XXXX' + bytes(40))
@@ -0,0 +1,68 @@
+import pytest
+
+import xonix_field
+import xonix_headless
+import xonix_logic
+import xonix_snapshot
+
+def played_engine(config, seed, ticks):
+    engine = xonix_headless.HeadlessEngine(config, seed)
+    engine.run(xonix_headless.random_inputs(seed, ticks))
+    return engine
+
+def state_summary(game_state):
+    return (game_state.level, game_state.lives, game_state.score, game_state.filled_units,
+            [tuple(row) for row in xonix_field.field_rows(game_state.game_field)],
+            (game_state.player.x, game_state.player.y, list(game_state.player.line)),
+            [(enemy.x, enemy.y, enemy.dx, enemy.dy, enemy.type) for enemy in game_state.enemies])
+
+@pytest.mark.parametrize('backend', ['list', 'chunked', 'bitboard'])
+def test_round_trip_resumes_the_same_game(backend):
+    config = xonix_logic.GameConfig('classic', 'small')
+    config.apply_settings({'FIELD_BACKEND': backend, 'CROCODILES_PER_LEVEL': 3})
+    engine = played_engine(config, 11, 1500)
+    restored = xonix_snapshot.load_snapshot(xonix_snapshot.save_snapshot(engine.game_state))
+    assert restored.config.CROCODILES_PER_LEVEL == 3
+    assert restored.config.FIELD_BACKEND == backend
+    assert state_summary(restored) == state_summary(engine.game_state)
+
+    # Both copies continue identically, random sequence included
+    resumed = xonix_headless.HeadlessEngine(config, 11)
+    resumed.game_state = restored
+    inputs = list(xonix_headless.random_inputs(12, 1500))
+    engine.run(inputs)
+    resumed.run(inputs)
+    assert state_summary(resumed.game_state) == state_summary(engine.game_state)
+
+def test_snapshot_config_keeps_changed_settings():
+    config = xonix_logic.GameConfig('classic', 'big')
+    config.apply_settings({'WIN_MODE': 'percent', 'WIN_PERCENT': 60, 'ENEMY_SPEED': 2 * config.UNIT_SIZE})
+    restored = xonix_snapshot.snapshot_config(xonix_snapshot.save_snapshot(played_engine(config, 2, 50).game_state))
+    for name in xonix_logic.LAYOUT_SETTINGS + xonix_logic.RECORDED_SETTINGS:
+        assert getattr(restored, name) == getattr(config, name), name
+
+def test_caller_config_may_change_backend_and_view():
+    config = xonix_logic.GameConfig('classic', 'small')
+    data = xonix_snapshot.save_snapshot(played_engine(config, 5, 300).game_state)
+    other = xonix_snapshot.snapshot_config(data)
+    other.view = 'modern'
+    other.FIELD_BACKEND = 'chunked'
+    restored = xonix_snapshot.load_snapshot(data, other)
+    assert xonix_field.is_chunked_field(restored.game_field)
+
+    # A chunked snapshot comes back dense when the caller asks for plain rows
+    chunked = xonix_snapshot.save_snapshot(restored)
+    other = xonix_snapshot.snapshot_config(chunked)
+    other.FIELD_BACKEND = 'list'
+    listed = xonix_snapshot.load_snapshot(chunked, other)
+    assert isinstance(listed.game_field, list)
+    assert xonix_field.field_rows(listed.game_field) == [list(row) for row in restored.game_field]
+
+def test_caller_config_with_other_rules_is_rejected():
+    config = xonix_logic.GameConfig('classic', 'small')
+    config.apply_settings({'CROCODILES_PER_LEVEL': 4})
+    data = xonix_snapshot.save_snapshot(played_engine(config, 5, 300).game_state)
+    with pytest.raises(ValueError, match='CROCODILES_PER_LEVEL'):
+        xonix_snapshot.load_snapshot(data, xonix_logic.GameConfig('classic', 'small'))
+    with pytest.raises(ValueError):
+        xonix_snapshot.load_snapshot(data, xonix_logic.GameConfig('classic', 'big'))
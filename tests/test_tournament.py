@@ -0,0 +1,33 @@
+import pytest
+
+import xonix_logic
+import xonix_tournament
+
+def test_overrides_go_through_apply_settings():
+    config = xonix_tournament.make_config('small', {'CROCODILES_PER_LEVEL': 2, 'UNIT_SIZE': 10})
+    assert config.CROCODILES_PER_LEVEL == 2
+    # Layout-derived settings follow the new unit size
+    assert config.PLAYER_SPEED == config.ENEMY_SPEED == 10
+    assert config.GAME_AREA_WIDTH == config.GAME_LOGIC_AREA_WIDTH * 10
+
+@pytest.mark.parametrize('name', ['FRAME_RATE', 'DIRTY_RECT_RENDERING', 'NO_SUCH_SETTING'])
+def test_settings_the_headless_game_ignores_are_rejected(name):
+    with pytest.raises(ValueError):
+        xonix_tournament.make_config('small', {name: 1})
+
+def test_game_speed_changes_reported_seconds():
+    results = []
+    for speed in (7, 14):
+        config = xonix_tournament.make_config('small', {'GAME_SPEED_ADJUSTMENT': speed})
+        results.append(xonix_tournament.play_game(config, 3, 'random', max_ticks=2000))
+    slow, fast = results
+    assert slow['ticks'] == fast['ticks']
+    assert slow['seconds'] == pytest.approx(2 * fast['seconds'])
+    assert fast['seconds'] == pytest.approx(fast['ticks'] / 14)
+
+def test_report_is_reproducible():
+    config = xonix_logic.GameConfig('classic', 'small')
+    first = xonix_tournament.run_tournament(config, 4, max_ticks=1000, processes=0).to_dict()
+    second = xonix_tournament.run_tournament(config, 4, max_ticks=1000, processes=0).to_dict()
+    assert first == second
+    assert first['seconds']['max'] <= 1000 / config.GAME_SPEED_ADJUSTMENT
@@ -0,0 +1,85 @@
+# xonix_assets.py - Sprite loading with an on-disk cache of scaled tiles
+#
+# The source PNGs are large (1024x1024) while the game only ever draws them at
+# UNIT_SIZE. Scaled tiles are cached on disk per UNIT_SIZE, keyed by the source
+# file's mtime and content hash, and kept in memory once loaded, so later
+# launches and mode switches skip the expensive decode and scale.
+
+import hashlib
+import json
+import os
+import pygame
+
+ASSET_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(ASSET_DIR, '.xonix_cache')
+MANIFEST_FILE = 'manifest.json'
+
+# In-process cache: (path, unit_size) -> surface converted to the display format
+_loaded_tiles = {}
+
+def _load_manifest():
+    try:
+        with open(os.path.join(CACHE_DIR, MANIFEST_FILE), 'r') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+def _save_manifest(manifest):
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with open(os.path.join(CACHE_DIR, MANIFEST_FILE), 'w') as file:
+            json.dump(manifest, file, indent=2)
+    except OSError as e:
+        print(f"Asset cache error: {e}")
+
+def _source_hash(path, manifest):
+    # Reuse the stored hash while the file's mtime and size are unchanged
+    stat = os.stat(path)
+    entry = manifest.get(path)
+    if entry and entry['mtime'] == stat.st_mtime and entry['size'] == stat.st_size:
+        return entry['sha1']
+
+    with open(path, 'rb') as file:
+        sha1 = hashlib.sha1(file.read()).hexdigest()
+    manifest[path] = {'mtime': stat.st_mtime, 'size': stat.st_size, 'sha1': sha1}
+    _save_manifest(manifest)
+    return sha1
+
+def _cache_path(path, unit_size, sha1):
+    name = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(CACHE_DIR, f'{name}_{unit_size}_{sha1[:16]}.png')
+
+def _convert(surface):
+    # Match the display's pixel format once so blits skip per-call conversion
+    if pygame.display.get_surface() is None:
+        return surface
+    if surface.get_flags() & pygame.SRCALPHA:
+        return surface.convert_alpha()
+    return surface.convert()
+
+def load_tile(filename, unit_size):
+    path = os.path.join(ASSET_DIR, filename)
+    key = (path, unit_size)
+    tile = _loaded_tiles.get(key)
+    if tile is not None:
+        return tile
+
+    manifest = _load_manifest()
+    cache_path = _cache_path(path, unit_size, _source_hash(path, manifest))
+
+    if os.path.exists(cache_path):
+        tile = pygame.image.load(cache_path)
+    else:
+        tile = pygame.transform.scale(pygame.image.load(path), (unit_size, unit_size))
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            pygame.image.save(tile, cache_path)
+        except (OSError, pygame.error) as e:
+            print(f"Asset cache error: {e}")
+
+    tile = _convert(tile)
+    _loaded_tiles[key] = tile
+    return tile
+
+def clear_memory_cache():
+    _loaded_tiles.clear()
@@ -0,0 +1,339 @@
+# xonix_bench.py - Benchmarks for the Xonix logic and rendering hot paths
+#
+# Every scenario is seeded, so two runs on the same tree do the same work.
+# Results are written as JSON and can be compared with an earlier run:
+#   python xonix_bench.py --output bench.json
+#   python xonix_bench.py --output new.json --compare bench.json
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import xonix_logic
+import xonix_field
+import xonix_headless
+
+# Synthetic grids larger than the built-in 'big' layout: (width, height, unit size)
+SYNTHETIC_GRIDS = [(120, 80, 8), (400, 300, 2)]
+
+def synthetic_config(width, height, unit_size):
+    return xonix_logic.GameConfig('classic', 'custom', width, height, unit_size)
+
+def benchmark_configs(quick):
+    configs = [('small', xonix_logic.GameConfig('classic', 'small')), ('big', xonix_logic.GameConfig('classic', 'big'))]
+    bitboard_config = xonix_logic.GameConfig('classic', 'big')
+    bitboard_config.FIELD_BACKEND = 'bitboard'
+    configs.append(('big_bits', bitboard_config))
+    grids = SYNTHETIC_GRIDS[:1] if quick else SYNTHETIC_GRIDS
+    for width, height, unit_size in grids:
+        configs.append((f'{width}x{height}', synthetic_config(width, height, unit_size)))
+    return configs
+
+def new_game_state(config, seed, level=1):
+    game_state = xonix_logic.GameState(config, seed)
+    game_state.level = level
+    game_state.player = xonix_logic.Player(config)
+    game_state.initialize_enemies()
+    return game_state
+
+def measure(setup, run, repeats):
+    # Time run(context) once per repeat; setup work is excluded from the timing
+    samples = []
+    for _ in range(repeats):
+        context = setup()
+        start_time = time.perf_counter()
+        run(context)
+        samples.append(time.perf_counter() - start_time)
+    return samples
+
+def trail_positions(config, length):
+    # A serpentine trail through the unfilled area, never touching the border
+    positions = []
+    x_range = range(3, config.GAME_LOGIC_AREA_WIDTH - 3)
+    for row, y in enumerate(range(3, config.GAME_LOGIC_AREA_HEIGHT - 3, 2)):
+        xs = x_range if row % 2 == 0 else reversed(x_range)
+        for x in xs:
+            positions.append((x, y))
+            if len(positions) >= length:
+                return positions
+    return positions
+
+# Logic scenarios
+
+def bench_flood_fill(config, seed, repeats):
+    start_pos = (config.GAME_LOGIC_AREA_WIDTH // 2, config.GAME_LOGIC_AREA_HEIGHT // 2)
+
+    def setup():
+        return new_game_state(config, seed)
+
+    def run(game_state):
+        game_state.temp_flood_fill(start_pos, config.GAME_FIELD_TEMP_FILLED,
+                                   boundary_values=[config.GAME_FIELD_FILLED, config.GAME_FIELD_TEMP_FILLED])
+
+    return measure(setup, run, repeats)
+
+def bench_area_filling(config, seed, repeats):
+    # Close a vertical wall across the whole field, enclosing the enemy-free left third
+    wall_x = config.GAME_LOGIC_AREA_WIDTH // 3
+
+    def setup():
+        game_state = new_game_state(config, seed)
+        for enemy in game_state.enemies:
+            if enemy.type == 'unfilled':
+                enemy.x = (config.GAME_LOGIC_AREA_WIDTH - 5) * config.UNIT_SIZE
+        for y in range(xonix_field.BORDER_ROWS, config.GAME_LOGIC_AREA_HEIGHT - xonix_field.BORDER_ROWS):
+            game_state.player.add_line_position((wall_x, y))
+            game_state.game_field[y][wall_x] = config.GAME_FIELD_FILLED
+        game_state.player.returned_to_filled_area = True
+        game_state.recount_territory()
+        return game_state
+
+    def run(game_state):
+        game_state.handle_area_filling()
+
+    return measure(setup, run, repeats)
+
+def bench_small_loop(config, seed, repeats, size=8):
+    # Close a small notch off the bottom border on a field whose regions are already indexed,
+    # the common case mid-level: the cost should follow the notch, not the map
+    def setup():
+        game_state = new_game_state(config, seed)
+        for enemy in game_state.enemies:
+            if enemy.type == 'unfilled':
+                enemy.y = xonix_field.BORDER_ROWS * config.UNIT_SIZE
+        game_state.writable_regions()
+        bottom = config.GAME_LOGIC_AREA_HEIGHT - xonix_field.BORDER_ROWS - 1
+        left = xonix_field.BORDER_COLUMNS + 1
+        for y in range(bottom, bottom - size, -1):
+            game_state.player.add_line_position((left, y))
+        for x in range(left + 1, left + size):
+            game_state.player.add_line_position((x, bottom - size + 1))
+        for y in range(bottom - size + 2, bottom + 1):
+            game_state.player.add_line_position((left + size - 1, y))
+        game_state.player.returned_to_filled_area = True
+        return game_state
+
+    def run(game_state):
+        game_state.fill_trail(game_state.player.line_cells)
+        game_state.handle_area_filling()
+
+    return measure(setup, run, repeats)
+
+def bench_collisions(config, seed, repeats, level=20, trail_length=400, ticks=50):
+    # High level (many crocodiles) with a long trail; enemies keep moving every tick
+    def setup():
+        game_state = new_game_state(config, seed, level)
+        for position in trail_positions(config, trail_length):
+            game_state.player.add_line_position(position)
+        # Park the player in the border so collisions do not reset the trail
+        game_state.player.x = 0
+        game_state.player.y = 0
+        return game_state
+
+    def run(game_state):
+        for _ in range(ticks):
+            game_state.handle_collisions()
+
+    return [sample / ticks for sample in measure(setup, run, repeats)]
+
+def bench_enemy_move(config, seed, repeats, level=50, ticks=50):
+    def setup():
+        return new_game_state(config, seed, level)
+
+    def run(game_state):
+        for _ in range(ticks):
+            game_state.enemies.move_all(game_state.game_field)
+
+    return [sample / ticks for sample in measure(setup, run, repeats)]
+
+def bench_headless(config, seed, repeats, ticks=5000):
+    def setup():
+        return xonix_headless.HeadlessEngine(config, seed)
+
+    def run(engine):
+        engine.run(xonix_headless.random_inputs(seed, ticks))
+
+    return [sample / ticks for sample in measure(setup, run, repeats)]
+
+def bench_clone(config, seed, repeats, clones=200):
+    # Lookahead cost: clone a mid-game state and advance the clone one tick
+    def setup():
+        engine = xonix_headless.HeadlessEngine(config, seed)
+        engine.run(xonix_headless.random_inputs(seed, 300))
+        return engine.game_state
+
+    def run(game_state):
+        for _ in range(clones):
+            clone = game_state.clone()
+            clone.handle_player_movement(xonix_headless.KEY_UP)
+            clone.handle_collisions()
+
+    return [sample / clones for sample in measure(setup, run, repeats)]
+
+# Rendering scenarios
+
+def use_dummy_display():
+    # Render offscreen through SDL's dummy video driver
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+def load_gui():
+    use_dummy_display()
+    import xonix_gui
+    return xonix_gui
+
+def play_into_state(app, seed, ticks):
+    # Advance the app's game state so the frame has fills, a trail and moving enemies
+    engine = xonix_headless.HeadlessEngine(app.config, seed)
+    engine.game_state = app.game_state
+    engine.run(xonix_headless.random_inputs(seed, ticks))
+
+def bench_render(config, seed, repeats, view, mode, frames=30):
+    xonix_gui = load_gui()
+    gui = xonix_gui.XonixApp()
+    config.view = view
+    # 'full_rects' is the full redraw with the classic field drawn cell by cell, for comparison
+    config.PALETTE_FIELD_RENDERING = mode != 'full_rects'
+    gui.setup(config, seed)
+    play_into_state(gui, seed, 500)
+    inputs = xonix_headless.random_inputs(seed + 1, frames * repeats)
+    renderer = xonix_gui.DirtyRectRenderer(gui)
+    renderer.draw()
+
+    def setup():
+        return None
+
+    def run(_):
+        for _ in range(frames):
+            game_state = gui.game_state
+            game_state.handle_player_movement(next(inputs))
+            game_state.handle_collisions()
+            game_state.handle_area_filling()
+            if mode in ('full', 'full_rects'):
+                gui.draw_game_field()
+                gui.display_game_score_level_lives_etc()
+            else:
+                renderer.draw()
+                gui.display_game_score_level_lives_etc(blit_game_area=False, force=False)
+
+    return [sample / frames for sample in measure(setup, run, repeats)]
+
+# Startup scenarios
+
+# Each sample runs in a fresh interpreter so nothing is already imported or loaded
+STARTUP_SCENARIOS = [
+    ('startup_import_logic', False, 'import xonix_logic'),
+    ('startup_import_gui', True, 'import xonix_gui'),
+    ('startup_launch_to_first_frame', True, '''import xonix_logic, xonix_gui
+app = xonix_gui.XonixApp()
+app.setup(xonix_logic.GameConfig('modern', 'big'))
+app.draw_game_field()
+app.display_game_score_level_lives_etc()
+xonix_gui.pygame.display.flip()'''),
+]
+
+def bench_startup(code, repeats):
+    # Seconds from the first import to the end of code, measured inside the new process
+    use_dummy_display()
+    script = 'import time\nstart = time.perf_counter()\n' + code + '\nprint(time.perf_counter() - start)'
+    samples = []
+    for _ in range(repeats):
+        output = subprocess.run([sys.executable, '-c', script], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                capture_output=True, text=True, check=True)
+        samples.append(float(output.stdout.split()[-1]))
+    return samples
+
+def summarize(name, config_name, samples):
+    return {
+        'name': name,
+        'config': config_name,
+        'repeats': len(samples),
+        'min': min(samples),
+        'median': statistics.median(samples),
+        'mean': statistics.fmean(samples),
+        'max': max(samples),
+    }
+
+def run_benchmarks(seed=0, quick=False, include_render=True):
+    repeats = 3 if quick else 10
+    results = []
+
+    for name, needs_pygame, code in STARTUP_SCENARIOS:
+        if needs_pygame and not include_render:
+            continue
+        results.append(summarize(name, 'process', bench_startup(code, repeats)))
+        print(f"{'process':>10} {name:<36} {results[-1]['median'] * 1000:10.3f} ms")
+
+    for config_name, config in benchmark_configs(quick):
+        scenarios = [
+            ('flood_fill', bench_flood_fill),
+            ('area_filling', bench_area_filling),
+            ('small_loop_filling', bench_small_loop),
+            ('collisions_per_tick', bench_collisions),
+            ('enemy_move_per_tick', bench_enemy_move),
+            ('headless_tick', bench_headless),
+            ('clone_and_tick', bench_clone),
+        ]
+        for name, bench in scenarios:
+            results.append(summarize(name, config_name, bench(config, seed, repeats)))
+            print(f"{config_name:>10} {name:<36} {results[-1]['median'] * 1000:10.3f} ms")
+
+    if include_render:
+        render_configs = benchmark_configs(True)
+        for config_name, config in render_configs:
+            for view in ['classic', 'modern']:
+                modes = ['full', 'full_rects', 'dirty'] if view == 'classic' else ['full', 'dirty']
+                for mode in modes:
+                    name = f'render_{view}_{mode}_per_frame'
+                    results.append(summarize(name, config_name, bench_render(config, seed, repeats, view, mode)))
+                    print(f"{config_name:>10} {name:<36} {results[-1]['median'] * 1000:10.3f} ms")
+
+    return results
+
+def environment_info():
+    info = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'numpy': None,
+        'pygame': None,
+    }
+    if xonix_field.numpy_available():
+        info['numpy'] = xonix_field.np.__version__
+    if 'pygame' in sys.modules:
+        info['pygame'] = sys.modules['pygame'].version.ver
+    return info
+
+def compare(results, baseline):
+    # Print median ratios against an earlier results file (>1.0 means slower now)
+    previous = {(entry['name'], entry['config']): entry for entry in baseline['results']}
+    for entry in results:
+        old = previous.get((entry['name'], entry['config']))
+        if old and old['median'] > 0:
+            ratio = entry['median'] / old['median']
+            print(f"{entry['config']:>10} {entry['name']:<24} {ratio:6.2f}x")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Xonix logic and rendering")
+    parser.add_argument('--output', default='bench_output.json')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--quick', action='store_true', help="fewer repeats and grids")
+    parser.add_argument('--no-render', action='store_true', help="skip the pygame rendering benchmarks")
+    parser.add_argument('--compare', help="earlier results file to compare against")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.seed, args.quick, not args.no_render)
+    report = {'environment': environment_info(), 'seed': args.seed, 'results': results}
+    with open(args.output, 'w') as file:
+        json.dump(report, file, indent=2)
+
+    if args.compare:
+        with open(args.compare, 'r') as file:
+            compare(results, json.load(file))
+
+if __name__ == "__main__":
+    main()
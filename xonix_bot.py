@@ -0,0 +1,220 @@
+# xonix_bot.py - Lookahead autoplayer for Xonix
+#
+# The bot clones the GameState and simulates candidate plans: head out in one
+# direction, turn, and come back to the filled area. Plans that lose a life
+# are discarded and the rest are ranked by score gained per tick. The chosen
+# plan is re-simulated every tick and replaced as soon as it becomes unsafe.
+# The search budget caps how many ticks are simulated per decision, and each
+# decision's latency is compared with the tick length that
+# GAME_SPEED_ADJUSTMENT implies.
+#
+#   python xonix_bot.py --size big --ticks 5000 --budget 600
+#   python xonix_bot.py --gui --budget 300
+
+import argparse
+import statistics
+import time
+from collections import deque
+import xonix_logic
+import xonix_field
+import xonix_headless
+
+# Direction -> keys_pressed tuple and grid step
+DIRECTIONS = {
+    'left': (xonix_headless.KEY_LEFT, (-1, 0)),
+    'right': (xonix_headless.KEY_RIGHT, (1, 0)),
+    'up': (xonix_headless.KEY_UP, (0, -1)),
+    'down': (xonix_headless.KEY_DOWN, (0, 1)),
+}
+OPPOSITE = {'left': 'right', 'right': 'left', 'up': 'down', 'down': 'up'}
+PERPENDICULAR = {'left': ('up', 'down'), 'right': ('up', 'down'), 'up': ('left', 'right'), 'down': ('left', 'right')}
+
+# Leg lengths tried, in cells; a coarse spread keeps the plan count small
+OUT_LENGTHS = (1, 2, 3, 5, 8)
+SIDE_LENGTHS = (0, 1, 2, 4, 6, 9)
+
+DEFAULT_BUDGET = 1500  # Simulated ticks per decision
+DEATH_PENALTY = 1000.0
+
+def simulate_tick(game_state, keys_pressed):
+    # One logic tick, as in HeadlessEngine.step; returns True if a life was lost
+    lives = game_state.lives
+    game_state.handle_player_movement(keys_pressed)
+    game_state.handle_collisions()
+    game_state.handle_area_filling()
+    game_state.handle_level_up()
+    return game_state.lives < lives
+
+def direction_to_unfilled(config, game_state):
+    # First step of a shortest path from the player to the nearest unfilled cell
+    rows = xonix_field.field_rows(game_state.game_field)
+    unit = config.UNIT_SIZE
+    start = (game_state.player.x // unit, game_state.player.y // unit)
+    first_steps = {start: None}
+    queue = deque([start])
+    while queue:
+        x, y = queue.popleft()
+        if rows[y][x] == config.GAME_FIELD_UNFILLED:
+            return first_steps[(x, y)]
+        for direction, (_, (step_x, step_y)) in DIRECTIONS.items():
+            next_cell = (x + step_x, y + step_y)
+            if next_cell in first_steps:
+                continue
+            if 0 <= next_cell[0] < config.GAME_LOGIC_AREA_WIDTH and 0 <= next_cell[1] < config.GAME_LOGIC_AREA_HEIGHT:
+                first_steps[next_cell] = first_steps[(x, y)] or direction
+                queue.append(next_cell)
+    return None
+
+class AutoPlayer:
+    def __init__(self, config, budget=DEFAULT_BUDGET):
+        self.config = config
+        self.budget = budget
+        self.plan = []  # Directions still to follow
+        self.plans = self.candidate_plans()
+        self.tick_budget = 1.0 / config.GAME_SPEED_ADJUSTMENT
+        self.latencies = []
+        self.simulated_ticks = 0
+        self.plans_evaluated = 0
+
+    def candidate_plans(self):
+        # Short plans first, so a small budget still sees the cheap options
+        plans = []
+        for out in OUT_LENGTHS:
+            for side in SIDE_LENGTHS:
+                for direction in DIRECTIONS:
+                    if side == 0:
+                        plans.append([direction] * out + [OPPOSITE[direction]] * out)
+                        continue
+                    for turn in PERPENDICULAR[direction]:
+                        plans.append([direction] * out + [turn] * side + [OPPOSITE[direction]] * (out + 1))
+        plans.sort(key=len)
+        return [[]] + plans
+
+    def evaluate(self, game_state, plan, remaining):
+        # (value, ticks used); value is score per tick, or a penalty when the plan loses a life.
+        # A plan that closes its trail early stops there, so ticks is also the useful plan length.
+        state = game_state.clone()
+        score = state.score
+        level = state.level
+        ticks = 0
+        for direction in plan or [None]:
+            if ticks >= remaining:
+                break
+            keys_pressed = DIRECTIONS[direction][0] if direction else xonix_headless.NO_KEYS
+            ticks += 1
+            if simulate_tick(state, keys_pressed):
+                return -DEATH_PENALTY + ticks, ticks
+            # Stop as soon as the trail is closed; the rest of the plan is not needed
+            if plan and ticks > 1 and not state.player.line and state.score > score:
+                break
+        gained = state.score - score + (state.level - level) * self.config.UNITS_TO_WIN
+        value = gained / ticks
+        if state.player.line:
+            # Still out in the open: the plan did not finish inside the budget or the map
+            value -= len(state.player.line)
+        return value, ticks
+
+    def search_root(self, game_state):
+        # Clone to simulate from; NumPy fields become plain rows, which enemies read much faster
+        root = game_state.clone()
+        if xonix_field.is_array_field(root.game_field):
+            root.game_field = root.game_field.tolist()
+            root.field_shared = False
+        return root
+
+    def decide(self, game_state):
+        # keys_pressed for the next tick
+        start_time = time.perf_counter()
+        remaining = self.budget
+        root = self.search_root(game_state)
+
+        # Keep following the current plan while it is still safe
+        if self.plan:
+            value, ticks = self.evaluate(root, self.plan, len(self.plan))
+            remaining -= ticks
+            if value <= -DEATH_PENALTY / 2:
+                self.plan = []
+
+        best_value = None
+        best_plan = self.plan
+        if not self.plan:
+            for plan in self.plans:
+                if remaining <= 0:
+                    break
+                value, ticks = self.evaluate(root, plan, min(remaining, len(plan) + 1))
+                remaining -= ticks
+                self.plans_evaluated += 1
+                if best_value is None or value > best_value:
+                    best_value = value
+                    best_plan = plan[:ticks]
+
+        # Nothing to gain nearby: walk through the filled area towards open space
+        if best_value is not None and best_value <= 0 and not root.player.line:
+            direction = direction_to_unfilled(self.config, root)
+            if direction is not None:
+                # A held key keeps the previous movement direction, so the step can stall;
+                # releasing the keys for a tick (the empty plan) clears it
+                state = root.clone()
+                moved = not simulate_tick(state, DIRECTIONS[direction][0]) and \
+                    (state.player.x, state.player.y) != (root.player.x, root.player.y)
+                if moved:
+                    best_plan = [direction]
+
+        self.simulated_ticks += self.budget - remaining
+        self.plan = best_plan[1:]
+        self.latencies.append(time.perf_counter() - start_time)
+        return DIRECTIONS[best_plan[0]][0] if best_plan else xonix_headless.NO_KEYS
+
+    def input_source(self, get_game_state):
+        # A callable for xonix_gui.main that asks the bot for every tick's keys
+        return lambda: self.decide(get_game_state())
+
+    def latency_report(self):
+        if not self.latencies:
+            return {}
+        latencies = sorted(self.latencies)
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        return {
+            'decisions': len(latencies),
+            'budget': self.budget,
+            'tick_budget_ms': self.tick_budget * 1000,
+            'mean_ms': statistics.fmean(latencies) * 1000,
+            'p95_ms': p95 * 1000,
+            'max_ms': latencies[-1] * 1000,
+            'p95_share_of_tick': p95 / self.tick_budget,
+            'over_tick_budget': sum(1 for latency in latencies if latency > self.tick_budget),
+            'simulated_ticks_per_decision': self.simulated_ticks / len(latencies),
+        }
+
+def play_headless(config, seed, ticks, budget):
+    engine = xonix_headless.HeadlessEngine(config, seed)
+    bot = AutoPlayer(config, budget)
+    for _ in range(ticks):
+        engine.step(bot.decide(engine.game_state))
+    return engine, bot
+
+def main():
+    parser = argparse.ArgumentParser(description="Let the lookahead bot play Xonix")
+    parser.add_argument('--size', choices=['small', 'big'], default='small')
+    parser.add_argument('--ticks', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--budget', type=int, default=DEFAULT_BUDGET, help="simulated ticks per decision")
+    parser.add_argument('--gui', action='store_true', help="watch the bot play in a window")
+    args = parser.parse_args()
+
+    config = xonix_logic.GameConfig('modern' if args.gui else 'classic', args.size)
+    if args.gui:
+        import xonix_gui
+        bot = AutoPlayer(config, args.budget)
+        app = xonix_gui.XonixApp()
+        app.run_game(config, args.seed, input_source=bot.input_source(lambda: app.game_state))
+    else:
+        engine, bot = play_headless(config, args.seed, args.ticks, args.budget)
+        for name, value in engine.summary().items():
+            print(f'{name}: {value}')
+
+    for name, value in bot.latency_report().items():
+        print(f'{name}: {value}')
+
+if __name__ == "__main__":
+    main()
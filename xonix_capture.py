@@ -0,0 +1,143 @@
+# xonix_capture.py - Background recording of presented frames
+#
+# The game loop hands every presented frame to FrameCapture.add(), which only
+# copies the screen's pixels and puts them on a bounded queue. A writer thread
+# drains the queue to disk or into an encoder process. When the writer falls
+# behind the queue fills up and new frames are dropped and counted, so
+# recording never stalls the game loop.
+#
+# Formats:
+#   'raw'  - one file of packed RGB24 frames, plus a .json sidecar with the
+#            size and frame rate needed to decode it
+#   'png'  - a directory of numbered PNG files
+#   'pipe' - RGB24 frames written to the stdin of a command, e.g.
+#            ffmpeg -f rawvideo -pix_fmt rgb24 -s {width}x{height} -r {fps} -i - out.mp4
+
+import json
+import os
+import queue
+import shlex
+import struct
+import subprocess
+import threading
+import zlib
+import pygame
+
+FORMATS = ('raw', 'png', 'pipe')
+DEFAULT_QUEUE_FRAMES = 30
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+def surface_bytes(surface):
+    # pygame 2.1.3 renamed tostring to tobytes
+    to_bytes = getattr(pygame.image, 'tobytes', None) or pygame.image.tostring
+    return to_bytes(surface, 'RGB')
+
+def _png_chunk(kind, data):
+    return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+def encode_png(frame, size):
+    # RGB24 bytes to a PNG. zlib releases the GIL while compressing, unlike
+    # pygame.image.save, so the writer thread does not slow down the game loop.
+    width, height = size
+    stride = width * 3
+    rows = b''.join(b'\x00' + frame[offset:offset + stride] for offset in range(0, stride * height, stride))
+    header = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)
+    return (PNG_SIGNATURE + _png_chunk(b'IHDR', header) + _png_chunk(b'IDAT', zlib.compress(rows, 1)) +
+            _png_chunk(b'IEND', b''))
+
+class FrameCapture:
+    def __init__(self, output, size, fps, capture_format='raw', max_queue=DEFAULT_QUEUE_FRAMES):
+        if capture_format not in FORMATS:
+            raise ValueError(f"Unknown capture format {capture_format!r}")
+        self.output = output
+        self.size = size
+        self.fps = fps
+        self.format = capture_format
+        self.frames = queue.Queue(maxsize=max_queue)
+        self.captured = 0
+        self.dropped = 0
+        self.written = 0
+        self.error = None
+        self.file = None
+        self.process = None
+        self.open_output()
+        self.thread = threading.Thread(target=self.write_frames, name='xonix-capture', daemon=True)
+        self.thread.start()
+
+    @classmethod
+    def from_config(cls, config, size):
+        # None when capture is switched off in config
+        if not config.CAPTURE_OUTPUT:
+            return None
+        return cls(config.CAPTURE_OUTPUT, size, config.FRAME_RATE, config.CAPTURE_FORMAT, config.CAPTURE_QUEUE_FRAMES)
+
+    def open_output(self):
+        width, height = self.size
+        if self.format == 'raw':
+            self.file = open(self.output, 'wb')
+        elif self.format == 'png':
+            os.makedirs(self.output, exist_ok=True)
+        else:
+            command = shlex.split(self.output.format(width=width, height=height, fps=self.fps))
+            self.process = subprocess.Popen(command, stdin=subprocess.PIPE)
+            self.file = self.process.stdin
+
+    def add(self, surface):
+        # Called from the game loop; never waits for the writer
+        self.captured += 1
+        if self.error is not None:
+            self.dropped += 1
+            return False
+        try:
+            self.frames.put_nowait(surface_bytes(surface))
+        except queue.Full:
+            self.dropped += 1
+            return False
+        return True
+
+    def write_frames(self):
+        # Writer thread: runs until close() queues None
+        while True:
+            frame = self.frames.get()
+            if frame is None:
+                return
+            if self.error is not None:
+                continue
+            try:
+                self.write(frame)
+                self.written += 1
+            except (OSError, ValueError) as e:
+                # A dead encoder or full disk ends the recording, not the game
+                self.error = e
+
+    def write(self, frame):
+        if self.format == 'png':
+            with open(os.path.join(self.output, f'frame_{self.written:06d}.png'), 'wb') as file:
+                file.write(encode_png(frame, self.size))
+        else:
+            self.file.write(frame)
+
+    def close(self):
+        # Finish writing the queued frames; returns a summary of the recording
+        self.frames.put(None)
+        self.thread.join()
+        if self.file:
+            self.file.close()
+        if self.process:
+            self.process.wait()
+        summary = {
+            'format': self.format,
+            'width': self.size[0],
+            'height': self.size[1],
+            'pixel_format': 'rgb24',
+            'fps': self.fps,
+            'captured': self.captured,
+            'written': self.written,
+            'dropped': self.dropped,
+        }
+        if self.format == 'raw':
+            with open(self.output + '.json', 'w') as file:
+                json.dump(summary, file, indent=2)
+        if self.error is not None:
+            print(f"Capture stopped early: {self.error}")
+        return summary
@@ -0,0 +1,274 @@
+# xonix_enemies.py - Structure-of-arrays storage and movement for Xonix enemies
+#
+# EnemyGroup keeps every enemy's position, velocity and type in typed arrays
+# instead of one object per enemy. Iterating it yields lightweight views with
+# the same x/y/dx/dy/type attributes as xonix_logic.Enemy, so drawing and
+# saving code does not change. With NumPy and an array field, a tick moves
+# all enemies at once: the arrays are shared with NumPy without copying and
+# the bounce prediction of Enemy.move is evaluated for every enemy together.
+
+from array import array
+import xonix_field
+
+ENEMY_TYPES = ('filled', 'unfilled')
+FILLED = 0
+UNFILLED = 1
+
+# Below this many enemies the scalar loop beats the fixed cost of the vector path
+VECTORIZE_MIN_ENEMIES = 32
+
+# Kinds of hit returned by move_until_collision
+HIT_WOLF = 'wolf'
+HIT_CROCODILE = 'crocodile'
+HIT_TRAIL = 'trail'
+
+class EnemyView:
+    # One enemy of a group, readable and writable like an Enemy
+    __slots__ = ('group', 'index')
+
+    def __init__(self, group, index):
+        self.group = group
+        self.index = index
+
+    @property
+    def x(self):
+        return self.group.xs[self.index]
+
+    @x.setter
+    def x(self, value):
+        self.group.xs[self.index] = value
+
+    @property
+    def y(self):
+        return self.group.ys[self.index]
+
+    @y.setter
+    def y(self, value):
+        self.group.ys[self.index] = value
+
+    @property
+    def dx(self):
+        return self.group.dxs[self.index]
+
+    @dx.setter
+    def dx(self, value):
+        self.group.dxs[self.index] = value
+
+    @property
+    def dy(self):
+        return self.group.dys[self.index]
+
+    @dy.setter
+    def dy(self, value):
+        self.group.dys[self.index] = value
+
+    @property
+    def type(self):
+        return ENEMY_TYPES[self.group.types[self.index]]
+
+    def move(self, game_field):
+        self.group.move_one(self.index, game_field)
+
+class EnemyGroup:
+    def __init__(self, config):
+        self.config = config
+        self.xs = array('i')
+        self.ys = array('i')
+        self.dxs = array('i')
+        self.dys = array('i')
+        self.types = array('B')
+
+    def __len__(self):
+        return len(self.xs)
+
+    def __iter__(self):
+        for index in range(len(self.xs)):
+            yield EnemyView(self, index)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self.xs)
+        if not 0 <= index < len(self.xs):
+            raise IndexError("enemy index out of range")
+        return EnemyView(self, index)
+
+    def append(self, enemy):
+        # Takes anything with x, y, dx, dy and type, e.g. a new xonix_logic.Enemy
+        self.xs.append(enemy.x)
+        self.ys.append(enemy.y)
+        self.dxs.append(enemy.dx)
+        self.dys.append(enemy.dy)
+        self.types.append(ENEMY_TYPES.index(enemy.type))
+
+    def clear(self):
+        del self.xs[:], self.ys[:], self.dxs[:], self.dys[:], self.types[:]
+
+    def copy(self):
+        group = EnemyGroup(self.config)
+        group.xs = array('i', self.xs)
+        group.ys = array('i', self.ys)
+        group.dxs = array('i', self.dxs)
+        group.dys = array('i', self.dys)
+        group.types = array('B', self.types)
+        return group
+
+    def cells(self, enemy_type=None):
+        # Grid cells of all enemies, or only those of one type
+        unit = self.config.UNIT_SIZE
+        code = None if enemy_type is None else ENEMY_TYPES.index(enemy_type)
+        return [(x // unit, y // unit) for x, y, kind in zip(self.xs, self.ys, self.types)
+                if code is None or kind == code]
+
+    def move_one(self, index, game_field):
+        # Same rules as Enemy.move, for a single enemy
+        self._move_scalar(index, index + 1, game_field, None, False, None)
+
+    def move_all(self, game_field):
+        self.move_until_collision(game_field, None, False, None)
+
+    def move_until_collision(self, game_field, player_cell, player_on_unfilled, line_cells):
+        # Move enemies in order and stop after the first one that hits the player or the
+        # trail, exactly like moving and checking them one by one. Returns (index, hit kind)
+        # for that enemy, or None when every enemy moved without a hit.
+        if len(self.xs) >= VECTORIZE_MIN_ENEMIES and xonix_field.is_array_field(game_field):
+            return self._move_vectorized(game_field, player_cell, player_on_unfilled, line_cells)
+        return self._move_scalar(0, len(self.xs), game_field, player_cell, player_on_unfilled, line_cells)
+
+    def _move_scalar(self, start, stop, game_field, player_cell, player_on_unfilled, line_cells):
+        config = self.config
+        unit = config.UNIT_SIZE
+        max_x = config.GAME_AREA_WIDTH - unit
+        max_y = config.GAME_AREA_HEIGHT - unit
+        filled = config.GAME_FIELD_FILLED
+        unfilled = config.GAME_FIELD_UNFILLED
+        xs, ys, dxs, dys, types = self.xs, self.ys, self.dxs, self.dys, self.types
+        # Bitboard fields are probed bit by bit instead of through their row views
+        boards = game_field.boards if xonix_field.is_bitboard_field(game_field) else None
+
+        for index in range(start, stop):
+            x = xs[index]
+            y = ys[index]
+            dx = dxs[index]
+            dy = dys[index]
+            is_unfilled = types[index] == UNFILLED
+
+            # Reflect off the map edges
+            new_x = x + dx
+            new_y = y + dy
+            if not (0 <= new_x <= max_x):
+                dx = -dx
+                new_x = x + dx
+            if not (0 <= new_y <= max_y):
+                dy = -dy
+                new_y = y + dy
+
+            # Predictive collision with the cell value this enemy type cannot enter
+            restricting_type = filled if is_unfilled else unfilled
+            check_x = new_x // unit if dx < 0 else (new_x + unit - 1) // unit
+            check_y = new_y // unit if dy < 0 else (new_y + unit - 1) // unit
+            if boards is not None:
+                board = boards[restricting_type]
+                stride = game_field.stride
+                will_collide_x = board >> (y // unit * stride + check_x) & 1
+                will_collide_y = board >> (check_y * stride + x // unit) & 1
+                if not will_collide_x and not will_collide_y:
+                    will_collide_y = will_collide_x = board >> (check_y * stride + check_x) & 1
+            else:
+                will_collide_x = game_field[y // unit][check_x] == restricting_type
+                will_collide_y = game_field[check_y][x // unit] == restricting_type
+                if not will_collide_x and not will_collide_y:
+                    will_collide_y = will_collide_x = game_field[check_y][check_x] == restricting_type
+
+            if will_collide_x:
+                dx = -dx
+            else:
+                x = new_x
+            if will_collide_y:
+                dy = -dy
+            else:
+                y = new_y
+            xs[index] = x
+            ys[index] = y
+            dxs[index] = dx
+            dys[index] = dy
+
+            if player_cell is None:
+                continue
+            enemy_cell = (x // unit, y // unit)
+            if enemy_cell == player_cell:
+                if not is_unfilled:
+                    return index, HIT_WOLF
+                if player_on_unfilled:
+                    return index, HIT_CROCODILE
+            elif is_unfilled and enemy_cell in line_cells:
+                return index, HIT_TRAIL
+        return None
+
+    def _move_vectorized(self, game_field, player_cell, player_on_unfilled, line_cells):
+        np = xonix_field.np
+        config = self.config
+        unit = config.UNIT_SIZE
+
+        # Zero-copy views of the arrays; released before returning so they can grow again
+        xs = np.frombuffer(self.xs, dtype=np.intc)
+        ys = np.frombuffer(self.ys, dtype=np.intc)
+        dxs = np.frombuffer(self.dxs, dtype=np.intc)
+        dys = np.frombuffer(self.dys, dtype=np.intc)
+        unfilled = np.frombuffer(self.types, dtype=np.uint8) == UNFILLED
+
+        # Reflect off the map edges
+        new_x = xs + dxs
+        outside = (new_x < 0) | (new_x > config.GAME_AREA_WIDTH - unit)
+        dx = np.where(outside, -dxs, dxs)
+        new_x = xs + dx
+        new_y = ys + dys
+        outside = (new_y < 0) | (new_y > config.GAME_AREA_HEIGHT - unit)
+        dy = np.where(outside, -dys, dys)
+        new_y = ys + dy
+
+        # Predict collisions with the restricting cell value of each enemy type
+        restricting = np.where(unfilled, config.GAME_FIELD_FILLED, config.GAME_FIELD_UNFILLED)
+        check_x = np.where(dx < 0, new_x // unit, (new_x + unit - 1) // unit)
+        check_y = np.where(dy < 0, new_y // unit, (new_y + unit - 1) // unit)
+        grid_x = xs // unit
+        grid_y = ys // unit
+        collide_x = game_field[grid_y, check_x] == restricting
+        collide_y = game_field[check_y, grid_x] == restricting
+        corner = ~collide_x & ~collide_y & (game_field[check_y, check_x] == restricting)
+        collide_x |= corner
+        collide_y |= corner
+
+        new_dx = np.where(collide_x, -dx, dx)
+        new_dy = np.where(collide_y, -dy, dy)
+        new_x = np.where(collide_x, xs, new_x)
+        new_y = np.where(collide_y, ys, new_y)
+
+        # First enemy whose new cell hits the player or the trail
+        hit = None
+        moved = len(self.xs)
+        if player_cell is not None:
+            cell_x = new_x // unit
+            cell_y = new_y // unit
+            on_player = (cell_x == player_cell[0]) & (cell_y == player_cell[1])
+            hits = on_player & ~unfilled
+            if player_on_unfilled:
+                hits |= on_player & unfilled
+            if line_cells:
+                width = config.GAME_LOGIC_AREA_WIDTH
+                trail = np.fromiter((y * width + x for x, y in line_cells), dtype=np.int64, count=len(line_cells))
+                hits |= ~on_player & unfilled & np.isin(cell_y.astype(np.int64) * width + cell_x, trail)
+            if hits.any():
+                index = int(np.argmax(hits))
+                moved = index + 1
+                if on_player[index]:
+                    hit = (index, HIT_CROCODILE if unfilled[index] else HIT_WOLF)
+                else:
+                    hit = (index, HIT_TRAIL)
+
+        # Enemies after the hit do not move this tick
+        xs[:moved] = new_x[:moved]
+        ys[:moved] = new_y[:moved]
+        dxs[:moved] = new_dx[:moved]
+        dys[:moved] = new_dy[:moved]
+        del xs, ys, dxs, dys
+        return hit
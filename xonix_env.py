@@ -0,0 +1,219 @@
+# xonix_env.py - Gym-style training environments for Xonix
+#
+# XonixEnv drives one game through the headless engine: reset(seed) starts a
+# game and step(action) advances it by one tick. VectorEnv steps many games
+# per call, either in this process or spread over worker processes so every
+# core is busy.
+#
+# Observations are the game field as a (height, width) grid of uint8 cell
+# values with the trail, the player and the enemies drawn over it using the
+# GAME_FIELD_* codes. They are NumPy arrays when NumPy is installed and flat
+# bytearrays otherwise.
+
+import multiprocessing
+import os
+import xonix_logic
+import xonix_field
+import xonix_headless
+
+# Action index -> keys_pressed tuple: no-op, left, right, up, down
+ACTIONS = xonix_headless.ALL_KEYS
+
+def field_bytes(game_field):
+    if xonix_field.is_array_field(game_field):
+        return bytearray(game_field.tobytes())
+    return bytearray(b''.join(bytes(row) for row in xonix_field.field_rows(game_field)))
+
+def observe(game_state):
+    # Flat row-major cell values with the entities drawn on top
+    config = game_state.config
+    width = config.GAME_LOGIC_AREA_WIDTH
+    unit = config.UNIT_SIZE
+    cells = field_bytes(game_state.game_field)
+
+    for x, y in game_state.player.line:
+        cells[y * width + x] = config.GAME_FIELD_LINE
+    for enemy in game_state.enemies:
+        value = config.GAME_FIELD_ENEMY_F if enemy.type == 'filled' else config.GAME_FIELD_ENEMY_U
+        cells[(enemy.y // unit) * width + enemy.x // unit] = value
+    player = game_state.player
+    cells[(player.y // unit) * width + player.x // unit] = config.GAME_FIELD_PLAYER
+    return cells
+
+def as_observation(cells, config):
+    if not xonix_field.numpy_available():
+        return cells
+    np = xonix_field.np
+    return np.frombuffer(cells, dtype=np.uint8).reshape((config.GAME_LOGIC_AREA_HEIGHT, config.GAME_LOGIC_AREA_WIDTH))
+
+class XonixEnv:
+    def __init__(self, config=None):
+        self.config = config or xonix_logic.GameConfig('classic', 'small')
+        self.engine = None
+        self.observation_shape = (self.config.GAME_LOGIC_AREA_HEIGHT, self.config.GAME_LOGIC_AREA_WIDTH)
+        self.action_count = len(ACTIONS)
+
+    def reset(self, seed=None):
+        self.engine = xonix_headless.HeadlessEngine(self.config, seed)
+        return as_observation(observe(self.engine.game_state), self.config)
+
+    def step(self, action):
+        # Returns (observation, reward, done, info); reward is the score gained this tick
+        reward, done, info = self.advance(action)
+        return as_observation(observe(self.engine.game_state), self.config), reward, done, info
+
+    def advance(self, action):
+        # One tick without building an observation: (reward, done, info)
+        if self.engine is None:
+            raise RuntimeError("Call reset() before step()")
+        game_state = self.engine.game_state
+        if game_state.lives <= 0:
+            raise RuntimeError("Game is over; call reset()")
+
+        score = game_state.score
+        result = self.engine.step(ACTIONS[action])
+        info = {
+            'lives': game_state.lives,
+            'level': game_state.level,
+            'score': game_state.score,
+            'collision': result.collision,
+            'level_up': result.level_up,
+        }
+        return game_state.score - score, game_state.lives <= 0, info
+
+def _env_seed(seed, index):
+    return None if seed is None else seed + index
+
+def _reset_envs(envs, seed, first_index):
+    cells_list = []
+    for index, env in enumerate(envs):
+        env.reset(_env_seed(seed, first_index + index))
+        cells_list.append(observe(env.engine.game_state))
+    return cells_list
+
+def _step_envs(envs, actions, seed, first_index, episodes):
+    # Step each env once; finished games restart at once with the next seed
+    results = []
+    for index, (env, action) in enumerate(zip(envs, actions)):
+        reward, done, info = env.advance(action)
+        cells = observe(env.engine.game_state)
+        if done:
+            info['final_observation'] = cells
+            episodes[index] += 1
+            episode_seed = None if seed is None else seed + (first_index + index) * 1000003 + episodes[index]
+            env.reset(episode_seed)
+            cells = observe(env.engine.game_state)
+        results.append((cells, reward, done, info))
+    return results
+
+def _worker(connection, config, count, first_index):
+    # Owns envs [first_index, first_index + count) and serves reset/step/close commands
+    envs = [XonixEnv(config) for _ in range(count)]
+    episodes = [0] * count
+    seed = None
+    while True:
+        command, argument = connection.recv()
+        if command == 'reset':
+            seed = argument
+            episodes = [0] * count
+            connection.send(_reset_envs(envs, seed, first_index))
+        elif command == 'step':
+            connection.send(_step_envs(envs, argument, seed, first_index, episodes))
+        else:
+            connection.close()
+            return
+
+class VectorEnv:
+    # N games stepped together. processes=0 keeps every game in this process;
+    # processes=None uses one worker per core, each owning a slice of the games.
+    def __init__(self, num_envs, config=None, processes=0):
+        self.config = config or xonix_logic.GameConfig('classic', 'small')
+        self.num_envs = num_envs
+        self.observation_shape = (self.config.GAME_LOGIC_AREA_HEIGHT, self.config.GAME_LOGIC_AREA_WIDTH)
+        self.action_count = len(ACTIONS)
+        self.seed = None
+
+        if processes is None:
+            processes = os.cpu_count() or 1
+        processes = min(processes, num_envs)
+        self.envs = []
+        self.episodes = [0] * num_envs
+        self.workers = []  # (connection, process, first_index, count)
+
+        if processes <= 0:
+            self.envs = [XonixEnv(self.config) for _ in range(num_envs)]
+            return
+
+        context = multiprocessing.get_context()
+        first_index = 0
+        for worker_index in range(processes):
+            count = num_envs // processes + (1 if worker_index < num_envs % processes else 0)
+            parent_connection, child_connection = context.Pipe()
+            process = context.Process(target=_worker, args=(child_connection, self.config, count, first_index),
+                                      daemon=True)
+            process.start()
+            child_connection.close()
+            self.workers.append((parent_connection, process, first_index, count))
+            first_index += count
+
+    def _batch(self, cells_list):
+        if not xonix_field.numpy_available():
+            return cells_list
+        np = xonix_field.np
+        batch = np.frombuffer(b''.join(cells_list), dtype=np.uint8)
+        return batch.reshape((len(cells_list),) + self.observation_shape)
+
+    def reset(self, seed=None):
+        # Game i starts from seed + i
+        self.seed = seed
+        if not self.workers:
+            self.episodes = [0] * self.num_envs
+            return self._batch(_reset_envs(self.envs, seed, 0))
+
+        for connection, _, _, _ in self.workers:
+            connection.send(('reset', seed))
+        cells_list = []
+        for connection, _, _, _ in self.workers:
+            cells_list.extend(connection.recv())
+        return self._batch(cells_list)
+
+    def step(self, actions):
+        # Returns (observations, rewards, dones, infos) for all games
+        if not self.workers:
+            results = _step_envs(self.envs, actions, self.seed, 0, self.episodes)
+        else:
+            for connection, _, first_index, count in self.workers:
+                connection.send(('step', list(actions[first_index:first_index + count])))
+            results = []
+            for connection, _, _, _ in self.workers:
+                results.extend(connection.recv())
+
+        cells_list = []
+        rewards = []
+        dones = []
+        infos = []
+        for cells, reward, done, info in results:
+            if done:
+                info['final_observation'] = as_observation(info['final_observation'], self.config)
+            cells_list.append(cells)
+            rewards.append(reward)
+            dones.append(done)
+            infos.append(info)
+        return self._batch(cells_list), rewards, dones, infos
+
+    def close(self):
+        for connection, process, _, _ in self.workers:
+            try:
+                connection.send(('close', None))
+            except (BrokenPipeError, OSError):
+                pass
+            process.join(timeout=1)
+            if process.is_alive():
+                process.terminate()
+        self.workers = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,1042 @@
+# xonix_field.py - Game field storage backends for Xonix
+#
+# The game field is indexed as game_field[y][x] everywhere in the game. All
+# backends below support that access pattern: the 'list' backend is a plain
+# list of lists, the 'numpy' backend is a contiguous uint8 array, the
+# 'chunked' backend allocates fixed-size tiles only where cells are written,
+# for maps far larger than the screen, and the 'bitboard' backend keeps one
+# int per cell value, for lookahead and running many games at once.
+
+import sys
+from collections import deque
+
+# NumPy is imported on first use; it is most of the import time of the logic modules
+np = None
+_numpy_loaded = False
+
+# Border width in cells, matching the original layout
+BORDER_ROWS = 2
+BORDER_COLUMNS = 3
+
+# Side length of a ChunkedField tile, in cells
+CHUNK_SIZE = 64
+
+# Fills cells of partial edge tiles that lie outside the map; never a game value
+OUTSIDE_MAP = 255
+
+# Prebuilt read-only border templates keyed by (width, height, unfilled, filled)
+_border_templates = {}
+
+def load_numpy():
+    # The numpy module, or None when it is not installed
+    global np, _numpy_loaded
+    if not _numpy_loaded:
+        _numpy_loaded = True
+        try:
+            import numpy
+            np = numpy
+        except ImportError:
+            np = None
+    return np
+
+def numpy_available():
+    return load_numpy() is not None
+
+def is_array_field(field):
+    if np is None:
+        # Arrays can only exist once something has imported numpy
+        if 'numpy' not in sys.modules or load_numpy() is None:
+            return False
+    return isinstance(field, np.ndarray)
+
+def is_chunked_field(field):
+    return isinstance(field, ChunkedField)
+
+def is_bitboard_field(field):
+    return isinstance(field, BitboardField)
+
+def _overlap(start, end, low, high):
+    return max(0, min(end, high) - max(start, low))
+
+class _ChunkedRow:
+    # Row view so ChunkedField supports game_field[y][x] reads and writes
+    def __init__(self, field, y):
+        self.field = field
+        self.y = y
+
+    def __getitem__(self, x):
+        return self.field.get(self.y, x)
+
+    def __setitem__(self, x, value):
+        self.field.set(self.y, x, value)
+
+    def __len__(self):
+        return self.field.width
+
+class ChunkedField:
+    # Sparse field made of CHUNK_SIZE x CHUNK_SIZE tiles. A tile is allocated
+    # the first time one of its cells is written; untouched tiles read as the
+    # initial layout (filled border, unfilled interior). Memory therefore
+    # grows with the area the player has actually changed.
+    def __init__(self, width, height, unfilled, filled, chunk_size=CHUNK_SIZE):
+        self.width = width
+        self.height = height
+        self.unfilled = unfilled
+        self.filled = filled
+        self.chunk_size = chunk_size
+        self.chunks = {}
+
+    def __len__(self):
+        return self.height
+
+    def __getitem__(self, y):
+        return _ChunkedRow(self, y)
+
+    def __iter__(self):
+        for y in range(self.height):
+            yield self.row(y)
+
+    def default_value(self, y, x):
+        if BORDER_COLUMNS <= x < self.width - BORDER_COLUMNS and BORDER_ROWS <= y < self.height - BORDER_ROWS:
+            return self.unfilled
+        return self.filled
+
+    def get(self, y, x):
+        size = self.chunk_size
+        chunk = self.chunks.get((y // size, x // size))
+        if chunk is None:
+            return self.default_value(y, x)
+        return chunk[(y % size) * size + x % size]
+
+    def set(self, y, x, value):
+        size = self.chunk_size
+        key = (y // size, x // size)
+        chunk = self.chunks.get(key)
+        if chunk is None:
+            chunk = self._allocate(key)
+        chunk[(y % size) * size + x % size] = value
+
+    def _default_chunk(self, key):
+        size = self.chunk_size
+        chunk_y, chunk_x = key
+        chunk = bytearray([OUTSIDE_MAP]) * (size * size)
+        for y in range(chunk_y * size, min((chunk_y + 1) * size, self.height)):
+            offset = (y % size) * size
+            for x in range(chunk_x * size, min((chunk_x + 1) * size, self.width)):
+                chunk[offset + x % size] = self.default_value(y, x)
+        return chunk
+
+    def _allocate(self, key):
+        chunk = self._default_chunk(key)
+        self.chunks[key] = chunk
+        return chunk
+
+    def chunk_bounds(self, key):
+        # (x0, y0, x1, y1) of the tile, clipped to the map
+        size = self.chunk_size
+        chunk_y, chunk_x = key
+        return (chunk_x * size, chunk_y * size,
+                min((chunk_x + 1) * size, self.width), min((chunk_y + 1) * size, self.height))
+
+    def all_chunk_keys(self):
+        size = self.chunk_size
+        return [(chunk_y, chunk_x) for chunk_y in range((self.height + size - 1) // size)
+                for chunk_x in range((self.width + size - 1) // size)]
+
+    def row(self, y):
+        return [self.get(y, x) for x in range(self.width)]
+
+    def default_row_bytes(self, y, x0, x1):
+        # Initial layout of cells x0..x1-1 in row y: unfilled inside the border
+        filled = bytes([self.filled])
+        if not BORDER_ROWS <= y < self.height - BORDER_ROWS:
+            return filled * (x1 - x0)
+        left = max(x0, min(x1, BORDER_COLUMNS))
+        right = max(x0, min(x1, self.width - BORDER_COLUMNS))
+        return filled * (left - x0) + bytes([self.unfilled]) * (right - left) + filled * (x1 - right)
+
+    def row_bytes(self, y, x0, x1):
+        # Cells x0..x1-1 of row y, sliced tile by tile
+        size = self.chunk_size
+        parts = []
+        x = x0
+        while x < x1:
+            end = min(x1, (x // size + 1) * size)
+            chunk = self.chunks.get((y // size, x // size))
+            if chunk is None:
+                parts.append(self.default_row_bytes(y, x, end))
+            else:
+                start = (y % size) * size + x % size
+                parts.append(bytes(chunk[start:start + end - x]))
+            x = end
+        return b''.join(parts)
+
+    def count(self, value):
+        total = 0
+        for key in self.all_chunk_keys():
+            chunk = self.chunks.get(key)
+            if chunk is not None:
+                total += chunk.count(value)
+                continue
+
+            # Untouched tiles hold the initial layout, so their counts follow from geometry
+            x0, y0, x1, y1 = self.chunk_bounds(key)
+            interior = (_overlap(x0, x1, BORDER_COLUMNS, self.width - BORDER_COLUMNS) *
+                        _overlap(y0, y1, BORDER_ROWS, self.height - BORDER_ROWS))
+            if value == self.unfilled:
+                total += interior
+            elif value == self.filled:
+                total += (x1 - x0) * (y1 - y0) - interior
+        return total
+
+    def copy(self):
+        field = ChunkedField(self.width, self.height, self.unfilled, self.filled, self.chunk_size)
+        field.chunks = {key: bytearray(chunk) for key, chunk in self.chunks.items()}
+        return field
+
+class _BitboardRow:
+    # Row view so BitboardField supports game_field[y][x]; reads are bit probes
+    def __init__(self, field, y):
+        self.field = field
+        self.offset = y * field.stride
+
+    def __getitem__(self, x):
+        # value_at, inlined for the filled board; this is the hottest read in the game
+        field = self.field
+        index = self.offset + x
+        if field.boards[field.filled] >> index & 1:
+            return field.filled
+        return field.value_at(index)
+
+    def __setitem__(self, x, value):
+        self.field.set_bit(self.offset + x, value)
+
+    def __len__(self):
+        return self.field.width
+
+class BitboardField:
+    # The field as bitboards: one int per cell value, with bit y * stride + x set
+    # where the cell holds that value. Rows are width + 1 bits long; the spare
+    # bit is never set, so shifting a board by one never carries a cell into the
+    # next row. Copying is a dict of ints and comparing is a few int compares,
+    # which suits lookahead and many games at once. Large maps make every probe
+    # and shift proportionally slower, so this backend is for the built-in sizes.
+    def __init__(self, width, height, unfilled, filled):
+        self.width = width
+        self.height = height
+        self.unfilled = unfilled
+        self.filled = filled
+        self.stride = width + 1
+        self.row_mask = (1 << width) - 1
+        # Every cell of the map: each row's width bits, without the spare bit
+        self.cells = sum(self.row_mask << (y * self.stride) for y in range(height))
+        interior_row = sum(1 << x for x in range(BORDER_COLUMNS, width - BORDER_COLUMNS))
+        interior = sum(interior_row << (y * self.stride) for y in range(BORDER_ROWS, height - BORDER_ROWS))
+        self.boards = {filled: self.cells & ~interior, unfilled: interior}
+
+    def __len__(self):
+        return self.height
+
+    def __getitem__(self, y):
+        return _BitboardRow(self, y)
+
+    def __iter__(self):
+        return iter(self.rows())
+
+    def __eq__(self, other):
+        if not isinstance(other, BitboardField):
+            return NotImplemented
+        return self.stride == other.stride and self.occupied_boards() == other.occupied_boards()
+
+    def occupied_boards(self):
+        return {value: board for value, board in self.boards.items() if board}
+
+    def board(self, value):
+        return self.boards.get(value, 0)
+
+    def value_at(self, index):
+        # The filled board is probed first; it is the answer for most reads
+        boards = self.boards
+        if boards[self.filled] >> index & 1:
+            return self.filled
+        if boards[self.unfilled] >> index & 1:
+            return self.unfilled
+        for value, board in boards.items():
+            if board >> index & 1:
+                return value
+        return OUTSIDE_MAP
+
+    def get(self, y, x):
+        return self.value_at(y * self.stride + x)
+
+    def set_bit(self, index, value):
+        self.move_bits(1 << index, value)
+
+    def set(self, y, x, value):
+        self.move_bits(1 << (y * self.stride + x), value)
+
+    def move_bits(self, bits, value):
+        # Give every cell in bits the value, taking the bits off whichever boards had them
+        boards = self.boards
+        for other, board in boards.items():
+            if board & bits:
+                boards[other] = board & ~bits
+        boards[value] = boards.get(value, 0) | bits
+
+    def positions_mask(self, positions):
+        # Bits of the (x, y) positions that lie on the map
+        stride = self.stride
+        bits = 0
+        for x, y in positions:
+            if 0 <= x < self.width and 0 <= y < self.height:
+                bits |= 1 << (y * stride + x)
+        return bits
+
+    def cells_mask(self, cells):
+        # Bits of the (y, x) cells
+        stride = self.stride
+        bits = 0
+        for y, x in cells:
+            bits |= 1 << (y * stride + x)
+        return bits
+
+    def dilate(self, bits, within):
+        # Grow bits through 4-connected neighbours that are in within, until nothing changes
+        stride = self.stride
+        bits &= within
+        while True:
+            grown = (bits | bits << 1 | bits >> 1 | bits << stride | bits >> stride) & within
+            if grown == bits:
+                return bits
+            bits = grown
+
+    def row_counts(self, bits):
+        # {y: set bits in row y}
+        counts = {}
+        stride = self.stride
+        row_mask = self.row_mask
+        for y in range(self.height):
+            count = (bits >> (y * stride) & row_mask).bit_count()
+            if count:
+                counts[y] = count
+        return counts
+
+    def bit_cells(self, bits):
+        # (y, x) of every set bit, in row-major order
+        cells = []
+        stride = self.stride
+        for y in range(self.height):
+            row_bits = bits >> (y * stride) & self.row_mask
+            if row_bits:
+                # bin() lists the highest bit first; reversed, character x is bit x
+                cells.extend((y, x) for x, bit in enumerate(bin(row_bits)[:1:-1]) if bit == '1')
+        return cells
+
+    def row(self, y):
+        row = [OUTSIDE_MAP] * self.width
+        offset = y * self.stride
+        for value, board in self.boards.items():
+            row_bits = board >> offset & self.row_mask
+            if row_bits:
+                for x, bit in enumerate(bin(row_bits)[:1:-1]):
+                    if bit == '1':
+                        row[x] = value
+        return row
+
+    def rows(self):
+        return [self.row(y) for y in range(self.height)]
+
+    def count(self, value):
+        return self.boards.get(value, 0).bit_count()
+
+    def copy(self):
+        field = BitboardField.__new__(BitboardField)
+        field.__dict__.update(self.__dict__)
+        field.boards = dict(self.boards)
+        return field
+
+    @classmethod
+    def from_rows(cls, rows, unfilled, filled):
+        height = len(rows)
+        width = len(rows[0])
+        field = cls(width, height, unfilled, filled)
+        boards = {filled: 0, unfilled: 0}
+        for value in set().union(*rows):
+            board = 0
+            for y, row in enumerate(rows):
+                # One int per row from a string of its bits, highest x first
+                row_bits = int(''.join('1' if cell == value else '0' for cell in reversed(row)), 2)
+                board |= row_bits << (y * field.stride)
+            boards[value] = board
+        field.boards = boards
+        return field
+
+def _border_template(width, height, unfilled, filled):
+    key = (width, height, unfilled, filled)
+    template = _border_templates.get(key)
+    if template is None:
+        load_numpy()
+        template = np.full((height, width), unfilled, dtype=np.uint8)
+        template[:BORDER_ROWS, :] = filled  # Top two rows
+        template[height - BORDER_ROWS:, :] = filled  # Bottom two rows
+        template[:, :BORDER_COLUMNS] = filled  # Left three columns
+        template[:, width - BORDER_COLUMNS:] = filled  # Right three columns
+        template.setflags(write=False)
+        _border_templates[key] = template
+    return template
+
+def _border_rows(width, height, unfilled, filled):
+    game_field = [[unfilled for _ in range(width)] for _ in range(height)]
+
+    # Fill borders
+    for x in range(width):
+        for y in range(BORDER_ROWS):  # Top two rows
+            game_field[y][x] = filled
+        for y in range(height - BORDER_ROWS, height):  # Bottom two rows
+            game_field[y][x] = filled
+
+    for y in range(height):
+        for x in range(BORDER_COLUMNS):  # Left three columns
+            game_field[y][x] = filled
+        for x in range(width - BORDER_COLUMNS, width):  # Right three columns
+            game_field[y][x] = filled
+
+    return game_field
+
+def create_game_field(config):
+    width = config.GAME_LOGIC_AREA_WIDTH
+    height = config.GAME_LOGIC_AREA_HEIGHT
+    unfilled = config.GAME_FIELD_UNFILLED
+    filled = config.GAME_FIELD_FILLED
+
+    if config.FIELD_BACKEND == 'chunked':
+        # Nothing is allocated until cells change
+        return ChunkedField(width, height, unfilled, filled)
+    if config.FIELD_BACKEND == 'bitboard':
+        return BitboardField(width, height, unfilled, filled)
+    if config.FIELD_BACKEND == 'numpy':
+        # Copying the template is a single memcpy instead of a per-cell rebuild
+        return _border_template(width, height, unfilled, filled).copy()
+    return _border_rows(width, height, unfilled, filled)
+
+def fill_cells(game_field, cells, value, changes=None):
+    # cells is a sequence of (y, x) tuples. changes, if given, is a set that
+    # receives every (y, x) written; the other writers below take it as well.
+    if not cells:
+        return
+    if changes is not None:
+        changes.update(cells)
+    if is_array_field(game_field):
+        positions = np.asarray(cells, dtype=np.intp)
+        game_field[positions[:, 0], positions[:, 1]] = value
+    elif is_bitboard_field(game_field):
+        game_field.move_bits(game_field.cells_mask(cells), value)
+    else:
+        for y, x in cells:
+            game_field[y][x] = value
+
+def fill_mask(game_field, mask, value, changes=None):
+    # mask has the same shape as the field; truthy cells receive value
+    if is_array_field(game_field):
+        game_field[mask] = value
+        if changes is not None:
+            ys, xs = np.nonzero(mask)
+            changes.update(zip(ys.tolist(), xs.tolist()))
+    else:
+        for y, row in enumerate(mask):
+            field_row = game_field[y]
+            for x, selected in enumerate(row):
+                if selected:
+                    field_row[x] = value
+                    if changes is not None:
+                        changes.add((y, x))
+
+def value_mask(game_field, value):
+    if is_array_field(game_field):
+        return game_field == value
+    return [[cell == value for cell in row] for row in game_field]
+
+def revert_mask(game_field, from_value, to_value, changes=None):
+    # Turn every cell holding from_value back into to_value
+    if changes is not None:
+        changes.update(cells_with_value(game_field, from_value))
+    if is_array_field(game_field):
+        game_field[game_field == from_value] = to_value
+    elif is_bitboard_field(game_field):
+        game_field.move_bits(game_field.board(from_value), to_value)
+    elif is_chunked_field(game_field):
+        for y, x in cells_with_value(game_field, from_value):
+            game_field.set(y, x, to_value)
+    else:
+        for row in game_field:
+            for x, cell in enumerate(row):
+                if cell == from_value:
+                    row[x] = to_value
+
+def count_cells(game_field, value):
+    if is_array_field(game_field):
+        return int(np.count_nonzero(game_field == value))
+    if is_chunked_field(game_field) or is_bitboard_field(game_field):
+        return game_field.count(value)
+    return sum(row.count(value) for row in game_field)
+
+def cells_with_value(game_field, value):
+    # (y, x) positions of every cell holding value, in row-major order
+    if is_array_field(game_field):
+        ys, xs = np.nonzero(game_field == value)
+        return list(zip(ys.tolist(), xs.tolist()))
+    if is_bitboard_field(game_field):
+        return game_field.bit_cells(game_field.board(value))
+    return [(y, x) for y, row in enumerate(game_field) for x, cell in enumerate(row) if cell == value]
+
+class FillCounter:
+    # Filled cells per row and in total, kept up to date by whoever fills cells, so
+    # the fill ratio never needs a rescan. The border counts as filled in the rows
+    # but is left out of the interior figures.
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.interior_cells = (width - 2 * BORDER_COLUMNS) * (height - 2 * BORDER_ROWS)
+        self.reset()
+
+    def reset(self):
+        # Counts for a fresh field: only the border is filled
+        self.row_filled = [self.width if y < BORDER_ROWS or y >= self.height - BORDER_ROWS else 2 * BORDER_COLUMNS
+                           for y in range(self.height)]
+        self.border_cells = sum(self.row_filled)
+        self.total_filled = self.border_cells
+
+    def add(self, y, count=1):
+        self.row_filled[y] += count
+        self.total_filled += count
+
+    def add_rows(self, row_counts):
+        # row_counts: {y: cells filled in row y}
+        for y, count in row_counts.items():
+            self.row_filled[y] += count
+            self.total_filled += count
+
+    def filled_cells(self):
+        return self.total_filled - self.border_cells
+
+    def unfilled_cells(self):
+        return self.interior_cells - self.filled_cells()
+
+    def fill_ratio(self):
+        return self.filled_cells() / self.interior_cells
+
+    def row_ratio(self, y):
+        return self.row_filled[y] / self.width
+
+    def copy(self):
+        counter = FillCounter.__new__(FillCounter)
+        counter.__dict__.update(self.__dict__)
+        counter.row_filled = self.row_filled[:]
+        return counter
+
+    @classmethod
+    def from_field(cls, game_field, filled):
+        # Full recount, for fields that were loaded or edited directly
+        counter = cls(len(game_field[0]), len(game_field))
+        if is_array_field(game_field):
+            counter.row_filled = np.count_nonzero(game_field == filled, axis=1).tolist()
+        elif is_bitboard_field(game_field):
+            row_counts = game_field.row_counts(game_field.board(filled))
+            counter.row_filled = [row_counts.get(y, 0) for y in range(len(game_field))]
+        elif is_chunked_field(game_field):
+            # Untouched tiles still hold the initial layout; only allocated ones can differ
+            size = game_field.chunk_size
+            for key, chunk in game_field.chunks.items():
+                x0, y0, x1, y1 = game_field.chunk_bounds(key)
+                default_chunk = game_field._default_chunk(key)
+                for y in range(y0, y1):
+                    offset = (y % size) * size
+                    counter.row_filled[y] += (chunk[offset:offset + x1 - x0].count(filled) -
+                                              default_chunk[offset:offset + x1 - x0].count(filled))
+        else:
+            counter.row_filled = [row.count(filled) for row in field_rows(game_field)]
+        counter.total_filled = sum(counter.row_filled)
+        return counter
+
+def copy_field(game_field):
+    if is_array_field(game_field):
+        return game_field.copy()
+    if is_chunked_field(game_field) or is_bitboard_field(game_field):
+        return game_field.copy()
+    return [row[:] for row in game_field]
+
+def window_bytes(game_field, x0, y0, x1, y1):
+    # The cells in columns x0..x1-1 of rows y0..y1-1, one byte each, row by row
+    if is_array_field(game_field):
+        return game_field[y0:y1, x0:x1].tobytes()
+    if is_chunked_field(game_field):
+        return b''.join(game_field.row_bytes(y, x0, x1) for y in range(y0, y1))
+    rows = field_rows(game_field)
+    return b''.join(bytes(row[x0:x1]) for row in rows[y0:y1])
+
+def field_rows(game_field):
+    # Plain Python rows for tight scalar loops, which are faster on lists than on arrays
+    if is_array_field(game_field):
+        return game_field.tolist()
+    if is_bitboard_field(game_field):
+        return game_field.rows()
+    if is_chunked_field(game_field):
+        return list(game_field)
+    return game_field
+
+def _find_root(parent, label):
+    root = label
+    while parent[root] != root:
+        root = parent[root]
+    # Path compression keeps later lookups flat
+    while parent[label] != root:
+        parent[label], label = root, parent[label]
+    return root
+
+def label_regions(game_field, value):
+    # Label every 4-connected region of cells holding value in one scanline pass.
+    # Returns (labels, sizes): labels[y][x] is 0 outside the regions and a label
+    # in 1..len(sizes)-1 inside; sizes[label] is the cell count of that region.
+    rows = field_rows(game_field)
+    height = len(rows)
+    width = len(rows[0]) if height else 0
+    labels = [[0] * width for _ in range(height)]
+    parent = [0]
+
+    for y in range(height):
+        row = rows[y]
+        label_row = labels[y]
+        above = labels[y - 1] if y else None
+        x = 0
+        while x < width:
+            if row[x] != value:
+                x += 1
+                continue
+
+            # Find the horizontal run [start, x) of matching cells
+            start = x
+            while x < width and row[x] == value:
+                x += 1
+
+            # Merge with every labelled run touching it from the row above
+            label = 0
+            if above is not None:
+                for above_label in above[start:x]:
+                    if above_label:
+                        above_root = _find_root(parent, above_label)
+                        if label == 0:
+                            label = above_root
+                        elif above_root != label:
+                            parent[above_root] = label
+            if label == 0:
+                label = len(parent)
+                parent.append(label)
+            label_row[start:x] = [label] * (x - start)
+
+    # Resolve provisional labels to compact final labels
+    final = [0] * len(parent)
+    sizes = [0]
+    for label in range(1, len(parent)):
+        root = _find_root(parent, label)
+        if final[root] == 0:
+            final[root] = len(sizes)
+            sizes.append(0)
+        final[label] = final[root]
+
+    for label_row in labels:
+        for x, label in enumerate(label_row):
+            if label:
+                label = final[label]
+                label_row[x] = label
+                sizes[label] += 1
+
+    return labels, sizes
+
+def fill_labels(game_field, labels, selected, value, row_counts=None, changes=None):
+    # Bulk write value into every cell whose region label is in selected;
+    # row_counts, if given, receives {y: cells written in row y}
+    if not selected:
+        return
+    if is_array_field(game_field):
+        mask = np.isin(np.asarray(labels), list(selected))
+        fill_mask(game_field, mask, value, changes)
+        if row_counts is not None:
+            for y, count in enumerate(np.count_nonzero(mask, axis=1).tolist()):
+                if count:
+                    row_counts[y] = row_counts.get(y, 0) + count
+    else:
+        for y, label_row in enumerate(labels):
+            field_row = game_field[y]
+            written = 0
+            for x, label in enumerate(label_row):
+                if label in selected:
+                    field_row[x] = value
+                    written += 1
+                    if changes is not None:
+                        changes.add((y, x))
+            if written and row_counts is not None:
+                row_counts[y] = row_counts.get(y, 0) + written
+
+class RegionIndex:
+    # Persistent labels of the 4-connected regions of one cell value, updated as
+    # cells leave them instead of relabelling the whole field on every fill.
+    # Labels live in one flat list with a margin of zeros around the map, so
+    # neighbours need no bounds checks. Each region keeps its cell count and a
+    # bounding box (x0, y0, x1, y1); a region that kept its label through a split
+    # keeps its old box, which may then be larger than the region.
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.stride = width + 2
+        self.labels = [0] * (self.stride * (height + 2))
+        self.counts = {}
+        self.bounds = {}
+        self.next_label = 1
+
+    @classmethod
+    def from_field(cls, game_field, value):
+        labels, sizes = label_regions(game_field, value)
+        height = len(labels)
+        width = len(labels[0]) if height else 0
+        index = cls(width, height)
+        bounds = {}
+        for y, label_row in enumerate(labels):
+            offset = (y + 1) * index.stride + 1
+            index.labels[offset:offset + width] = label_row
+            for label in set(label_row):
+                if not label:
+                    continue
+                x0 = label_row.index(label)
+                x1 = width - 1 - label_row[::-1].index(label)
+                box = bounds.get(label)
+                if box is None:
+                    bounds[label] = (x0, y, x1, y)
+                else:
+                    bounds[label] = (min(box[0], x0), box[1], max(box[2], x1), y)
+        index.counts = {label: sizes[label] for label in range(1, len(sizes))}
+        index.bounds = bounds
+        index.next_label = len(sizes)
+        return index
+
+    def copy(self):
+        index = RegionIndex.__new__(RegionIndex)
+        index.__dict__.update(self.__dict__)
+        index.labels = self.labels[:]
+        index.counts = dict(self.counts)
+        index.bounds = dict(self.bounds)
+        return index
+
+    def label_at(self, x, y):
+        # 0 when the cell is in no region
+        return self.labels[(y + 1) * self.stride + x + 1]
+
+    def labels_at(self, positions):
+        # Labels of the regions holding any of the (x, y) positions
+        labels = self.labels
+        stride = self.stride
+        found = {labels[(y + 1) * stride + x + 1] for x, y in positions
+                 if 0 <= x < self.width and 0 <= y < self.height}
+        found.discard(0)
+        return found
+
+    def labels_next_to(self, positions):
+        # Labels of the regions 4-adjacent to any of the (x, y) positions
+        labels = self.labels
+        stride = self.stride
+        found = set()
+        for x, y in positions:
+            cell = (y + 1) * stride + x + 1
+            found.update((labels[cell - 1], labels[cell + 1], labels[cell - stride], labels[cell + stride]))
+        found.discard(0)
+        return found
+
+    def cell_bounds(self, cells):
+        # Bounding box of flat cell indices sorted in ascending order
+        stride = self.stride
+        xs = [cell % stride for cell in cells]
+        return (min(xs) - 1, cells[0] // stride - 1, max(xs) - 1, cells[-1] // stride - 1)
+
+    def remove_cells(self, positions):
+        # Take (x, y) positions out of their regions, splitting any region they cut apart
+        labels = self.labels
+        stride = self.stride
+        counts = self.counts
+        removed = []
+        for x, y in positions:
+            cell = (y + 1) * stride + x + 1
+            label = labels[cell]
+            if label:
+                labels[cell] = 0
+                counts[label] -= 1
+                removed.append(cell)
+
+        # Cells left next to the removed ones, grouped by region
+        seeds = {}
+        for cell in removed:
+            for neighbour in (cell - 1, cell + 1, cell - stride, cell + stride):
+                label = labels[neighbour]
+                if label:
+                    seeds.setdefault(label, {})[neighbour] = None
+        for label, label_seeds in seeds.items():
+            if len(label_seeds) > 1:
+                self.split(label, list(label_seeds))
+
+        for label in [label for label, count in counts.items() if count == 0]:
+            del counts[label]
+            del self.bounds[label]
+
+    def split(self, label, seeds):
+        # Grow one search per seed in lockstep. Searches that meet are merged, and
+        # a search that runs out of cells has found a whole region. Once a single
+        # search is left it keeps the old label unexplored, so the work follows
+        # the smaller sides of the split, not the largest one.
+        labels = self.labels
+        stride = self.stride
+        owner = {}
+        parent = list(range(len(seeds)))
+        queues = []
+        members = []
+        for search, seed in enumerate(seeds):
+            owner[seed] = search
+            queues.append(deque([seed]))
+            members.append([seed])
+        active = set(parent)
+        closed = []
+
+        while len(active) > 1:
+            for search in list(active):
+                if search not in active:
+                    continue
+                queue = queues[search]
+                if not queue:
+                    active.discard(search)
+                    closed.append(search)
+                    if len(active) <= 1:
+                        break
+                    continue
+                cell = queue.popleft()
+                for neighbour in (cell - 1, cell + 1, cell - stride, cell + stride):
+                    if labels[neighbour] != label:
+                        continue
+                    other = owner.get(neighbour)
+                    if other is None:
+                        owner[neighbour] = search
+                        queue.append(neighbour)
+                        members[search].append(neighbour)
+                        continue
+                    other = _find_root(parent, other)
+                    if other == search:
+                        continue
+                    # Both searches are in the same region: keep the larger one
+                    if len(members[other]) > len(members[search]):
+                        search, other = other, search
+                    parent[other] = search
+                    queues[search].extend(queues[other])
+                    members[search].extend(members[other])
+                    queues[other] = members[other] = None
+                    active.discard(other)
+                    queue = queues[search]
+
+        if active:
+            kept = active.pop()
+        else:
+            kept = max(closed, key=lambda search: len(members[search]))
+            closed.remove(kept)
+            self.bounds[label] = self.cell_bounds(sorted(members[kept]))
+
+        for search in closed:
+            cells = sorted(members[search])
+            new_label = self.next_label
+            self.next_label += 1
+            for cell in cells:
+                labels[cell] = new_label
+            self.counts[new_label] = len(cells)
+            self.counts[label] -= len(cells)
+            self.bounds[new_label] = self.cell_bounds(cells)
+
+    def take_region(self, label):
+        # Remove a whole region; returns its cells as (y, [x, ...]) rows, top to bottom
+        labels = self.labels
+        stride = self.stride
+        x0, y0, x1, y1 = self.bounds.pop(label)
+        del self.counts[label]
+        rows = []
+        for y in range(y0, y1 + 1):
+            start = (y + 1) * stride + 1 + x0
+            end = start + x1 - x0 + 1
+            row = labels[start:end]
+            count = row.count(label)
+            if not count:
+                continue
+            if count == len(row):
+                labels[start:end] = [0] * count
+                rows.append((y, list(range(x0, x1 + 1))))
+                continue
+            xs = [x for x, cell_label in enumerate(row, x0) if cell_label == label]
+            for x in xs:
+                labels[start - x0 + x] = 0
+            rows.append((y, xs))
+        return rows
+
+def _fill_enclosed_regions_by_flood(game_field, seeds, value, blocked, fill_value, row_counts, changes):
+    # Grow one search per seed in lockstep, as RegionIndex.split does. A search
+    # that reaches a blocked cell stops and its region stays; one that runs out of
+    # cells has found an enclosed region. Searches that meet are merged. Once a
+    # single search is still growing, it is only followed further when the other
+    # regions leave it in doubt, so the cost follows the enclosed area and not
+    # the open region the trail was drawn from.
+    width = game_field.width
+    height = game_field.height
+    blocked = set(blocked)
+    owner = {}
+    parent = []
+    queues = []
+    members = []  # (y, x) cells of each search
+    active = set()
+    blocked_searches = set()
+    closed = []
+
+    for seed in seeds:
+        if seed in owner:
+            continue
+        search = len(parent)
+        owner[seed] = search
+        parent.append(search)
+        queues.append(deque([seed]))
+        members.append([(seed[1], seed[0])])
+        active.add(search)
+
+    def grow(search):
+        # Take one cell of search; returns the search that now holds it, or None once it stopped
+        queue = queues[search]
+        if not queue:
+            active.discard(search)
+            closed.append(search)
+            return None
+        cell = queue.popleft()
+        if cell in blocked:
+            active.discard(search)
+            blocked_searches.add(search)
+            return None
+        x, y = cell
+        for neighbour in ((x - 1, y), (x + 1, y), (x, y - 1), (x, y + 1)):
+            other = owner.get(neighbour)
+            if other is None:
+                neighbour_x, neighbour_y = neighbour
+                if 0 <= neighbour_x < width and 0 <= neighbour_y < height and game_field.get(neighbour_y, neighbour_x) == value:
+                    owner[neighbour] = search
+                    queue.append(neighbour)
+                    members[search].append((neighbour_y, neighbour_x))
+                continue
+            other = _find_root(parent, other)
+            if other == search:
+                continue
+            if other in blocked_searches:
+                # Touching a region that already reached a blocked cell means this is that region
+                active.discard(search)
+                blocked_searches.add(search)
+                return None
+            # Both searches are in the same region: keep the larger one
+            if len(members[other]) > len(members[search]):
+                search, other = other, search
+            parent[other] = search
+            queues[search].extend(queues[other])
+            members[search].extend(members[other])
+            queues[other] = members[other] = None
+            active.discard(other)
+            queue = queues[search]
+        return search
+
+    while len(active) > 1:
+        for search in list(active):
+            if search in active:
+                grow(search)
+
+    filled = list(closed)
+    if active:
+        last = next(iter(active))
+        # Blocked cells no finished search reached are in the last region or away from
+        # the trail. Unfilled regions away from the trail already held a blocked cell
+        # before it was drawn, and so did the region it was drawn in; if no finished
+        # region held one, the last region must.
+        unreached = [position for position in blocked if position not in owner and
+                     0 <= position[0] < width and 0 <= position[1] < height and
+                     game_field.get(position[1], position[0]) == value]
+        in_last = any(_find_root(parent, owner[position]) == last for position in blocked if position in owner)
+        if not in_last and (not unreached or blocked_searches):
+            # Follow the last region until it meets a blocked cell or turns out to be enclosed
+            while last is not None:
+                last = grow(last)
+            filled.extend(closed[len(filled):])
+
+    filled_count = 0
+    for search in filled:
+        region = members[search]
+        fill_cells(game_field, region, fill_value, changes)
+        filled_count += len(region)
+        if row_counts is not None:
+            for y, _ in region:
+                row_counts[y] = row_counts.get(y, 0) + 1
+    return filled_count
+
+def _fill_enclosed_regions_by_dilation(game_field, seeds, value, blocked, fill_value, row_counts, changes):
+    # Two dilations instead of one flood per region: first everything connected to a
+    # blocked cell, then everything connected to a seed outside of that
+    open_cells = game_field.board(value)
+    occupied = game_field.dilate(game_field.positions_mask(blocked), open_cells)
+    enclosed = game_field.dilate(game_field.positions_mask(seeds) & ~occupied, open_cells & ~occupied)
+    if not enclosed:
+        return 0
+    game_field.move_bits(enclosed, fill_value)
+    if changes is not None:
+        changes.update(game_field.bit_cells(enclosed))
+    if row_counts is not None:
+        for y, count in game_field.row_counts(enclosed).items():
+            row_counts[y] = row_counts.get(y, 0) + count
+    return enclosed.bit_count()
+
+def fill_enclosed_regions(game_field, seeds, value, blocked, fill_value, row_counts=None, changes=None):
+    # Fill every region of value cells that contains a seed but no blocked cell.
+    # seeds and blocked are (x, y) positions; returns the number of cells filled.
+    # row_counts, if given, receives {y: cells filled in row y}.
+    if not seeds:
+        return 0
+    if is_chunked_field(game_field):
+        return _fill_enclosed_regions_by_flood(game_field, seeds, value, blocked, fill_value, row_counts, changes)
+    if is_bitboard_field(game_field):
+        return _fill_enclosed_regions_by_dilation(game_field, seeds, value, blocked, fill_value, row_counts, changes)
+
+    # Label every region at once instead of flooding from each seed
+    labels, sizes = label_regions(game_field, value)
+    candidate_labels = {labels[y][x] for x, y in seeds}
+
+    # Each blocked cell maps straight to the region it is in
+    occupied_labels = {labels[y][x] for x, y in blocked}
+
+    # Regions without blocked cells are filled in one bulk write
+    selected = candidate_labels - occupied_labels
+    selected.discard(0)
+    fill_labels(game_field, labels, selected, fill_value, row_counts, changes)
+    return sum(sizes[label] for label in selected)
+
+def fill_indexed_regions(game_field, regions, trail, blocked, fill_value, row_counts=None, changes=None):
+    # fill_enclosed_regions for a field with a RegionIndex whose regions already
+    # exclude the trail cells: every region next to the trail that holds no
+    # blocked (x, y) position is filled and dropped from the index
+    selected = regions.labels_next_to(trail) - regions.labels_at(blocked)
+    array_field = is_array_field(game_field)
+    filled_count = 0
+    for label in selected:
+        for y, xs in regions.take_region(label):
+            if array_field:
+                game_field[y, xs] = fill_value
+            else:
+                field_row = game_field[y]
+                for x in xs:
+                    field_row[x] = fill_value
+            filled_count += len(xs)
+            if row_counts is not None:
+                row_counts[y] = row_counts.get(y, 0) + len(xs)
+            if changes is not None:
+                changes.update((y, x) for x in xs)
+    return filled_count
@@ -1,28 +1,27 @@
 # xonix_gui.py - GUI and main game loop for Xonix
+#
+# Importing this module has no side effects. XonixApp owns the window, the
+# sprites, the HUD and the game state; setup() initialises pygame and opens
+# the window on demand, and later calls reuse the display and cached assets.
 
 import pygame
 import sys
 import xonix_logic
+import xonix_field
+import xonix_assets
+import xonix_hud
+import xonix_profiler
+import xonix_capture
+import xonix_net
+import xonix_replay
+import xonix_snapshot
 
-# Initialize Pygame
-pygame.init()
-pygame.font.init()
-
-# Game configuration
+# Game configuration used when this module is run directly
 GAME_MODE = {
     'view': 'modern',  # 'classic' or 'modern'
     'size': 'big'    # 'small' or 'big'
 }
 
-# Create game config and state
-config = xonix_logic.GameConfig(GAME_MODE['view'], GAME_MODE['size'])
-game_state = xonix_logic.GameState(config)
-
-# Setup the screen
-screen = pygame.display.set_mode((config.SCREEN_WIDTH, config.SCREEN_HEIGHT))
-pygame.display.set_caption("Xonix Game - " + GAME_MODE['view'].capitalize() + " " + GAME_MODE['size'].capitalize())
-game_area = pygame.Surface((config.GAME_AREA_WIDTH, config.GAME_AREA_HEIGHT))
-
 # Colors
 GRAY = (128, 128, 128)
 WATER_BLUE = (64, 164, 223)
@@ -33,278 +32,860 @@ RED = (255, 0, 0)
 BLUE = (0, 0, 255)
 GREEN = (0, 255, 0)
 
-# Load images for modern mode
-RABBIT_IMG = None
-CROCODILE_IMG = None
-WOLF_IMG = None
-WATER_IMG = None
-SAND_IMG = None
-
-if GAME_MODE['view'] == 'modern':
-    try:
-        # Load images with error handling
-        RABBIT_IMG = pygame.image.load('rabbit.png')
-        RABBIT_IMG = pygame.transform.scale(RABBIT_IMG, (config.UNIT_SIZE, config.UNIT_SIZE))
-        
-        CROCODILE_IMG = pygame.image.load('crocodile.png')
-        CROCODILE_IMG = pygame.transform.scale(CROCODILE_IMG, (config.UNIT_SIZE, config.UNIT_SIZE))
-        
-        WOLF_IMG = pygame.image.load('wolf.png')
-        WOLF_IMG = pygame.transform.scale(WOLF_IMG, (config.UNIT_SIZE, config.UNIT_SIZE))
-
-        WATER_IMG = pygame.image.load('water.png')
-        WATER_IMG = pygame.transform.scale(WATER_IMG, (config.UNIT_SIZE, config.UNIT_SIZE))
-        
-        SAND_IMG = pygame.image.load('sand.png')
-        SAND_IMG = pygame.transform.scale(SAND_IMG, (config.UNIT_SIZE, config.UNIT_SIZE))
-    except Exception as e:
-        print(f"Image loading error: {e}")
-        print("Using fallback geometric shapes")
-        # If images fail to load, fall back to classic mode
-        GAME_MODE['view'] = 'classic'
-
-# Font setup
-font = pygame.font.SysFont(None, config.SCORE_FONT_SIZE)
-
-# Initialize game state
-game_state.player = xonix_logic.Player(config)
-game_state.initialize_enemies()
-
-# GUI Helper Functions
-def clear_score_area():
-    clear_rect = pygame.Rect(0, 0, config.GAME_AREA_WIDTH, config.UNIT_SIZE*2)
-    screen.fill(BLACK, clear_rect)
-
-def display_debug_info():
-    # Clear debug area
-    debug_area_rect = pygame.Rect(0, config.SCREEN_HEIGHT - config.DEBUG_SPACE, config.SCREEN_WIDTH, config.DEBUG_SPACE)
-    screen.fill(BLACK, debug_area_rect)
-
-    # Define debug variables
-    debug_info = {
-        'start X': game_state.player.start_x,
-        'start Y': game_state.player.start_y,
-        'Player Moving': game_state.player.moving,
-        'movement_direction': game_state.player.movement_direction,
-        'Line Size': len(game_state.player.line),
-        'Line ': game_state.player.line,
-    }
-
-    # Calculate starting Y position
-    start_y = config.SCREEN_HEIGHT - config.DEBUG_SPACE + 5
-
-    # Display debug information
-    for i, (name, value) in enumerate(debug_info.items()):
-        name_surface = font.render(f'{name}:', True, WHITE)
-        name_x = 10
-        screen.blit(name_surface, (name_x, start_y + i * 30))
-
-        value_surface = font.render(f'{value}', True, WHITE)
-        value_x = config.SCREEN_WIDTH // 2 - value_surface.get_width() // 2
-        screen.blit(value_surface, (value_x, start_y + i * 30))
-
-def display_game_score_level_lives_etc():
-    # Draw game area on screen
-    screen.blit(game_area, (0, config.SCORE_SPACE))
-    
-    # Show debug info if enabled
-    if config.DEBUG:
-        display_debug_info()
-    
-    # Clear score area with black background
-    pygame.draw.rect(screen, BLACK, (0, 0, config.SCREEN_WIDTH, config.SCORE_SPACE))
-        
-    # Display game stats with appropriate vertical positioning
-    vertical_position = config.SCORE_SPACE // 2 - font.get_height() // 2
-    
-    # Create text surfaces with appropriate font size
-    level_text = font.render(f'Level: {game_state.level}', True, WHITE)
-    lives_text = font.render(f'Lives: {game_state.lives}', True, WHITE)
-    score_text = font.render(f'Score: {game_state.score}', True, WHITE)
-    filled_units_text = font.render(f'Filled: {game_state.filled_units}/{config.UNITS_TO_WIN}', True, WHITE)
-    
-    # Position text according to game size - calculate dynamically
-    # to ensure proper spacing regardless of font size
-    if GAME_MODE['size'] == 'small':
-        total_width = level_text.get_width() + lives_text.get_width() + score_text.get_width() + filled_units_text.get_width()
-        spacing = (config.SCREEN_WIDTH - total_width) // 5  # Divide remaining space by 5 (4 gaps + extra padding)
-        
-        x_position = spacing
-        screen.blit(level_text, (x_position, vertical_position))
-        
-        x_position += level_text.get_width() + spacing
-        screen.blit(lives_text, (x_position, vertical_position))
-        
-        x_position += lives_text.get_width() + spacing
-        screen.blit(score_text, (x_position, vertical_position))
-        
-        x_position += score_text.get_width() + spacing
-        screen.blit(filled_units_text, (x_position, vertical_position))
-    else:  # 'big'
-        # For big mode, similar approach but with different proportions
-        total_width = level_text.get_width() + lives_text.get_width() + score_text.get_width() + filled_units_text.get_width()
-        spacing = (config.SCREEN_WIDTH - total_width) // 5
-        
-        x_position = spacing
-        screen.blit(level_text, (x_position, vertical_position))
-        
-        x_position += level_text.get_width() + spacing
-        screen.blit(lives_text, (x_position, vertical_position))
-        
-        x_position += lives_text.get_width() + spacing
-        screen.blit(score_text, (x_position, vertical_position))
-        
-        x_position += score_text.get_width() + spacing
-        screen.blit(filled_units_text, (x_position, vertical_position))
-
-def draw_game_field():
-    # Fill background
-    if GAME_MODE['view'] == 'modern':
-        # Use water image tiles if available
-        if WATER_IMG:
-            for y in range(0, config.GAME_AREA_HEIGHT, config.UNIT_SIZE):
-                for x in range(0, config.GAME_AREA_WIDTH, config.UNIT_SIZE):
-                    game_area.blit(WATER_IMG, (x, y))
+# Fonts and rendered text are reused across games
+_fonts = {}
+text_cache = xonix_hud.TextCache()
+
+def get_font(size):
+    if size not in _fonts:
+        _fonts[size] = pygame.font.SysFont(None, size)
+    return _fonts[size]
+
+class Camera:
+    # Scrolls the view over maps larger than the window, keeping the player centred.
+    # The offset stays on cell boundaries so cells map onto whole screen rects.
+    def __init__(self, config):
+        self.config = config
+        self.x = 0
+        self.y = 0
+
+    def scrolls(self):
+        config = self.config
+        return config.VIEW_WIDTH < config.GAME_AREA_WIDTH or config.VIEW_HEIGHT < config.GAME_AREA_HEIGHT
+
+    def follow(self, x, y):
+        config = self.config
+        target_x = x + config.UNIT_SIZE // 2 - config.VIEW_WIDTH // 2
+        target_y = y + config.UNIT_SIZE // 2 - config.VIEW_HEIGHT // 2
+        target_x = max(0, min(target_x, config.GAME_AREA_WIDTH - config.VIEW_WIDTH))
+        target_y = max(0, min(target_y, config.GAME_AREA_HEIGHT - config.VIEW_HEIGHT))
+        self.x = target_x - target_x % config.UNIT_SIZE
+        self.y = target_y - target_y % config.UNIT_SIZE
+
+    def visible_cells(self):
+        # (x0, y0, x1, y1) range of grid cells inside the view
+        config = self.config
+        x0 = self.x // config.UNIT_SIZE
+        y0 = self.y // config.UNIT_SIZE
+        x1 = min(config.GAME_LOGIC_AREA_WIDTH, (self.x + config.VIEW_WIDTH + config.UNIT_SIZE - 1) // config.UNIT_SIZE)
+        y1 = min(config.GAME_LOGIC_AREA_HEIGHT, (self.y + config.VIEW_HEIGHT + config.UNIT_SIZE - 1) // config.UNIT_SIZE)
+        return x0, y0, x1, y1
+
+def field_value_reader(field):
+    # Fast per-cell reads: plain rows for dense fields, direct tile lookups for chunked ones
+    if xonix_field.is_chunked_field(field):
+        return field.get
+    rows = xonix_field.field_rows(field)
+    return lambda y, x: rows[y][x]
+
+def from_bytes(data, size, format):
+    # pygame 2.1.3 renamed fromstring to frombytes
+    from_bytes_function = getattr(pygame.image, 'frombytes', None) or pygame.image.fromstring
+    return from_bytes_function(data, size, format)
+
+def classic_palette(config):
+    # 256 colours indexed by GAME_FIELD_* value, as the classic view draws them
+    palette = [BLACK] * 256
+    palette[config.GAME_FIELD_FILLED] = GRAY
+    palette[config.GAME_FIELD_LINE] = GREEN
+    palette[config.GAME_FIELD_PLAYER] = WHITE
+    return palette
+
+class PaletteFieldRenderer:
+    # Classic view of the visible field in a fixed number of pygame calls, however much
+    # is filled: one 8-bit pixel per cell, coloured by a palette of GAME_FIELD_* values,
+    # scaled up to UNIT_SIZE in one transform. Trails and sprites are drawn over it.
+    def __init__(self, config):
+        self.config = config
+        self.palette = classic_palette(config)
+        self.cells = None
+        self.scaled = None
+
+    def cell_surface(self, size):
+        # 8-bit surface for a size window of cells, kept until the window size changes
+        if self.cells is None or self.cells.get_size() != size:
+            self.cells = pygame.Surface(size, 0, 8)
+            self.cells.set_palette(self.palette)
+        return self.cells
+
+    def draw(self, surface, field, camera):
+        unit = self.config.UNIT_SIZE
+        x0, y0, x1, y1 = camera.visible_cells()
+        size = (x1 - x0, y1 - y0)
+        if xonix_field.is_array_field(field):
+            # Surface pixels are indexed [x][y], so the window goes in transposed
+            cells = self.cell_surface(size)
+            pygame.surfarray.blit_array(cells, field[y0:y1, x0:x1].T)
         else:
-            game_area.fill(WATER_BLUE)
-    else:  # classic
-        game_area.fill(BLACK)
-        
-    # Draw borders
-    color = GRAY
-    pygame.draw.rect(game_area, color, (0, 0, config.GAME_AREA_WIDTH, 2 * config.UNIT_SIZE))  # Top
-    pygame.draw.rect(game_area, color, (0, config.GAME_AREA_HEIGHT - 2 * config.UNIT_SIZE, config.GAME_AREA_WIDTH, 2 * config.UNIT_SIZE))  # Bottom
-    pygame.draw.rect(game_area, color, (0, 0, 3 * config.UNIT_SIZE, config.GAME_AREA_HEIGHT))  # Left
-    pygame.draw.rect(game_area, color, (config.GAME_AREA_WIDTH - 3 * config.UNIT_SIZE, 0, 3 * config.UNIT_SIZE, config.GAME_AREA_HEIGHT))  # Right
-    
-    # Draw filled areas
-    for y in range(config.GAME_LOGIC_AREA_HEIGHT):
-        for x in range(config.GAME_LOGIC_AREA_WIDTH):
-            if game_state.game_field[y][x] == config.GAME_FIELD_FILLED:
-                if GAME_MODE['view'] == 'modern' and SAND_IMG:
-                    game_area.blit(SAND_IMG, (x * config.UNIT_SIZE, y * config.UNIT_SIZE))
+            cells = from_bytes(xonix_field.window_bytes(field, x0, y0, x1, y1), size, 'P')
+            cells.set_palette(self.palette)
+
+        # Colours are resolved at one pixel per cell, which makes the scale a plain pixel copy
+        cells = cells.convert(surface)
+        scaled_size = (size[0] * unit, size[1] * unit)
+        offset = (x0 * unit - camera.x, y0 * unit - camera.y)
+        if offset == (0, 0) and scaled_size == surface.get_size():
+            pygame.transform.scale(cells, scaled_size, surface)
+            return
+        # Partly visible edge cells: scale into a spare surface and blit the visible part
+        if self.scaled is None or self.scaled.get_size() != scaled_size:
+            self.scaled = pygame.Surface(scaled_size, 0, surface)
+        pygame.transform.scale(cells, scaled_size, self.scaled)
+        surface.blit(self.scaled, offset)
+
+class DirtyRectRenderer:
+    # Keeps a persistent background of the visible field cells and only redraws what changed
+    def __init__(self, app):
+        self.app = app
+        self.background = pygame.Surface((app.config.VIEW_WIDTH, app.config.VIEW_HEIGHT))
+        self.last_game_state = None
+        self.last_camera = None
+        self.last_line_cells = set()
+        self.last_sprite_cells = set()
+        self.full_redraw = True
+
+    def invalidate(self):
+        # Force a full redraw, e.g. after an overlay covered the screen
+        self.full_redraw = True
+
+    def sprite_cells(self, positions):
+        # Grid cells covered by the player and enemies, including off-grid positions
+        config = self.app.config
+        cells = set()
+        for x, y in positions:
+            for grid_y in range(y // config.UNIT_SIZE, (y + config.UNIT_SIZE - 1) // config.UNIT_SIZE + 1):
+                for grid_x in range(x // config.UNIT_SIZE, (x + config.UNIT_SIZE - 1) // config.UNIT_SIZE + 1):
+                    if 0 <= grid_x < config.GAME_LOGIC_AREA_WIDTH and 0 <= grid_y < config.GAME_LOGIC_AREA_HEIGHT:
+                        cells.add((grid_x, grid_y))
+        return cells
+
+    def field_changes(self, game_state):
+        # Changed (y, x) cells since the last frame, from the game state's write journal,
+        # or None when everything must be redrawn
+        if game_state is not self.last_game_state:
+            game_state.track_field_changes()
+        return game_state.take_field_changes()
+
+    def scroll_background(self, read_value):
+        # Shift what is already drawn and paint only the cells the camera uncovered
+        app = self.app
+        camera = app.camera
+        last_x, last_y = self.last_camera
+        self.background.scroll(last_x - camera.x, last_y - camera.y)
+        x0, y0, x1, y1 = camera.visible_cells()
+        last_x0 = last_x // app.config.UNIT_SIZE
+        last_y0 = last_y // app.config.UNIT_SIZE
+        last_x1 = last_x0 + (x1 - x0)
+        last_y1 = last_y0 + (y1 - y0)
+        for y in range(y0, y1):
+            for x in range(x0, x1):
+                if not (last_x0 <= x < last_x1 and last_y0 <= y < last_y1):
+                    app.draw_field_cell(self.background, x, y, read_value(y, x))
+
+    def compose_view(self, positions, line_cells):
+        # Rebuild the whole view from the background and present all of it
+        app = self.app
+        config = app.config
+        x0, y0, x1, y1 = app.camera.visible_cells()
+        app.game_area.blit(self.background, (0, 0))
+        for x, y in line_cells:
+            if x0 <= x < x1 and y0 <= y < y1:
+                app.draw_line_cell(app.game_area, (x, y))
+        app.draw_sprites(app.game_area, positions)
+        app.screen.blit(app.game_area, (0, config.SCORE_SPACE))
+        return [pygame.Rect(0, config.SCORE_SPACE, config.VIEW_WIDTH, config.VIEW_HEIGHT)]
+
+    def draw(self, positions=None):
+        # Update game_area and blit the changed parts to the screen; returns screen rects to present
+        app = self.app
+        config = app.config
+        camera = app.camera
+        game_area = app.game_area
+        if positions is None:
+            positions = app.sprite_positions()
+        field = app.game_state.game_field
+        line_cells = app.trail_cells()
+        sprite_cells = self.sprite_cells(positions)
+        camera.follow(*positions[0])
+        camera_position = (camera.x, camera.y)
+        x0, y0, x1, y1 = camera.visible_cells()
+        read_value = field_value_reader(field)
+
+        changes = self.field_changes(app.game_state)
+        if self.full_redraw or changes is None:
+            self.background.fill(BLACK)
+            app.draw_visible_cells(self.background)
+            dirty_rects = self.compose_view(positions, line_cells)
+            self.full_redraw = False
+        else:
+            if camera_position != self.last_camera:
+                self.scroll_background(read_value)
+
+            # Cells whose field value changed are redrawn on the background
+            dirty_cells = set()
+            for y, x in changes:
+                if x0 <= x < x1 and y0 <= y < y1:
+                    app.draw_field_cell(self.background, x, y, read_value(y, x))
+                    dirty_cells.add((x, y))
+
+            if camera_position != self.last_camera:
+                dirty_rects = self.compose_view(positions, line_cells)
+            else:
+                # Trail cells that appeared or vanished, and cells sprites left or entered
+                dirty_cells |= line_cells ^ self.last_line_cells
+                dirty_cells |= sprite_cells | self.last_sprite_cells
+
+                dirty_rects = []
+                for x, y in dirty_cells:
+                    if not (x0 <= x < x1 and y0 <= y < y1):
+                        continue
+                    cell_rect = pygame.Rect(x * config.UNIT_SIZE - camera.x, y * config.UNIT_SIZE - camera.y, config.UNIT_SIZE, config.UNIT_SIZE)
+                    game_area.blit(self.background, cell_rect, cell_rect)
+                    if (x, y) in line_cells:
+                        app.draw_line_cell(game_area, (x, y))
+                    dirty_rects.append(cell_rect)
+
+                # Sprites are few, so they are drawn every frame over the restored cells
+                app.draw_sprites(game_area, positions)
+
+                for index, cell_rect in enumerate(dirty_rects):
+                    app.screen.blit(game_area, (cell_rect.x, cell_rect.y + config.SCORE_SPACE), cell_rect)
+                    dirty_rects[index] = cell_rect.move(0, config.SCORE_SPACE)
+
+        self.last_game_state = app.game_state
+        self.last_camera = camera_position
+        self.last_line_cells = line_cells
+        self.last_sprite_cells = sprite_cells
+        return dirty_rects
+
+class TimedOverlay:
+    # A pause screen that keeps the loop pumping events and rendering until it expires
+    def __init__(self, kind, duration, draw=None, on_finish=None):
+        self.kind = kind
+        self.remaining = duration
+        self.draw = draw
+        self.on_finish = on_finish
+
+    def update(self, frame_time):
+        self.remaining -= frame_time
+        return self.remaining <= 0
+
+def read_keys_pressed():
+    # Get key states for player movement
+    keys = pygame.key.get_pressed()
+    return [
+        keys[pygame.K_LEFT],
+        keys[pygame.K_RIGHT],
+        keys[pygame.K_UP],
+        keys[pygame.K_DOWN]
+    ]
+
+class XonixApp:
+    # The window, assets, HUD and game state of one player's view of the game
+    def __init__(self):
+        self.config = None
+        self.view = None
+        self.game_state = None
+        self.screen = None
+        self.game_area = None
+        self.font = None
+        self.score_bar = None
+        self.dim_overlay = None
+        self.camera = None
+        self.frame_graph = None
+        # Opponents in a networked game, drawn after the local player
+        self.other_players = []
+        # Images for modern mode
+        self.rabbit_img = None
+        self.crocodile_img = None
+        self.wolf_img = None
+        self.water_img = None
+        self.sand_img = None
+
+    def load_images(self):
+        self.rabbit_img = self.crocodile_img = self.wolf_img = self.water_img = self.sand_img = None
+
+        if self.view == 'modern':
+            unit_size = self.config.UNIT_SIZE
+            try:
+                # Load scaled tiles from the asset cache, already in the display format
+                self.rabbit_img = xonix_assets.load_tile('rabbit.png', unit_size)
+                self.crocodile_img = xonix_assets.load_tile('crocodile.png', unit_size)
+                self.wolf_img = xonix_assets.load_tile('wolf.png', unit_size)
+                self.water_img = xonix_assets.load_tile('water.png', unit_size)
+                self.sand_img = xonix_assets.load_tile('sand.png', unit_size)
+            except Exception as e:
+                print(f"Image loading error: {e}")
+                print("Using fallback geometric shapes")
+                # If images fail to load, fall back to classic mode
+                self.view = 'classic'
+
+    def setup(self, game_config, seed=None):
+        # Prepare the screen, assets and a fresh game for game_config. The display
+        # and cached assets are reused, so calling this again for another game is cheap.
+        if not pygame.get_init():
+            pygame.init()
+        pygame.font.init()
+        self.config = config = game_config
+        self.view = config.view
+        self.other_players = []
+
+        # Create game state; a seed makes the run reproducible
+        self.game_state = xonix_logic.GameState(config, seed)
+
+        # Setup the screen; set_mode reuses the existing window when there is one
+        self.screen = pygame.display.set_mode((config.SCREEN_WIDTH, config.SCREEN_HEIGHT))
+        pygame.display.set_caption("Xonix Game - " + self.view.capitalize() + " " + config.size.capitalize())
+        self.game_area = pygame.Surface((config.VIEW_WIDTH, config.VIEW_HEIGHT))
+        self.camera = Camera(config)
+        self.field_palette = PaletteFieldRenderer(config) if config.PALETTE_FIELD_RENDERING else None
+
+        self.load_images()
+
+        # Font and HUD setup
+        self.font = get_font(config.SCORE_FONT_SIZE)
+        self.score_bar = xonix_hud.ScoreBar(self.font, config.SCREEN_WIDTH, config.SCORE_SPACE, text_cache, WHITE, BLACK)
+
+        # Semi-transparent overlay shared by the level-up and game-over messages
+        self.dim_overlay = pygame.Surface((config.SCREEN_WIDTH, config.SCREEN_HEIGHT), pygame.SRCALPHA)
+        self.dim_overlay.fill((0, 0, 0, 180))  # Black with alpha (transparency)
+
+        # Frame-time graph drawn in the top right corner of the game area
+        self.frame_graph = xonix_hud.FrameTimeGraph(min(config.SCREEN_WIDTH, 360), min(config.VIEW_HEIGHT, 120), get_font(18),
+                                                    text_cache, 1.0 / config.FRAME_RATE, xonix_profiler.PHASES)
+
+        # Initialize game state
+        self.game_state.player = xonix_logic.Player(config)
+        self.game_state.initialize_enemies()
+
+    # GUI Helper Functions
+    def clear_score_area(self):
+        clear_rect = pygame.Rect(0, 0, self.config.SCREEN_WIDTH, self.config.SCORE_SPACE)
+        self.screen.fill(BLACK, clear_rect)
+        self.score_bar.invalidate()
+
+    def display_debug_info(self):
+        config = self.config
+        player = self.game_state.player
+        # Clear debug area
+        debug_area_rect = pygame.Rect(0, config.SCREEN_HEIGHT - config.DEBUG_SPACE, config.SCREEN_WIDTH, config.DEBUG_SPACE)
+        self.screen.fill(BLACK, debug_area_rect)
+
+        # Define debug variables
+        debug_info = {
+            'start X': player.start_x,
+            'start Y': player.start_y,
+            'Player Moving': player.moving,
+            'movement_direction': player.movement_direction,
+            'Line Size': len(player.line),
+            'Line ': player.line,
+        }
+
+        # Calculate starting Y position
+        start_y = config.SCREEN_HEIGHT - config.DEBUG_SPACE + 5
+
+        # Display debug information
+        for i, (name, value) in enumerate(debug_info.items()):
+            name_surface = self.font.render(f'{name}:', True, WHITE)
+            name_x = 10
+            self.screen.blit(name_surface, (name_x, start_y + i * 30))
+
+            value_surface = self.font.render(f'{value}', True, WHITE)
+            value_x = config.SCREEN_WIDTH // 2 - value_surface.get_width() // 2
+            self.screen.blit(value_surface, (value_x, start_y + i * 30))
+
+    def display_game_score_level_lives_etc(self, blit_game_area=True, force=True):
+        config = self.config
+        game_state = self.game_state
+        # Draw game area on screen; the dirty-rect renderer has already blitted its changes
+        if blit_game_area:
+            self.screen.blit(self.game_area, (0, config.SCORE_SPACE))
+
+        # Show debug info if enabled
+        if config.DEBUG:
+            self.display_debug_info()
+
+        # The score bar is only re-rendered when level, lives, score or filled units change
+        if config.WIN_MODE == 'percent':
+            changed = self.score_bar.update(game_state.level, game_state.lives, game_state.score,
+                                            f'{int(game_state.fill_percent())}%', f'{config.WIN_PERCENT:g}%')
+        else:
+            changed = self.score_bar.update(game_state.level, game_state.lives, game_state.score, game_state.filled_units, config.UNITS_TO_WIN)
+        if changed or force:
+            self.screen.blit(self.score_bar.surface, (0, 0))
+        return changed
+
+    def draw_visible_cells(self, surface):
+        # Draw every field cell inside the camera view
+        if self.view == 'classic' and self.field_palette:
+            self.field_palette.draw(surface, self.game_state.game_field, self.camera)
+            return
+        read_value = field_value_reader(self.game_state.game_field)
+        x0, y0, x1, y1 = self.camera.visible_cells()
+        for y in range(y0, y1):
+            for x in range(x0, x1):
+                self.draw_field_cell(surface, x, y, read_value(y, x))
+
+    def draw_game_field(self, positions=None):
+        config = self.config
+        game_area = self.game_area
+        if positions is None:
+            positions = self.sprite_positions()
+        self.camera.follow(*positions[0])
+        if self.camera.scrolls():
+            # Large maps only draw the cells the camera can see
+            self.draw_visible_cells(game_area)
+            x0, y0, x1, y1 = self.camera.visible_cells()
+            for position in self.trail_cells():
+                if x0 <= position[0] < x1 and y0 <= position[1] < y1:
+                    self.draw_line_cell(game_area, position)
+            self.draw_sprites(game_area, positions)
+            return
+
+        if self.view == 'classic' and self.field_palette:
+            # Background, borders and filled cells all come from the palette surface
+            self.field_palette.draw(game_area, self.game_state.game_field, self.camera)
+        else:
+            # Fill background
+            if self.view == 'modern':
+                # Use water image tiles if available
+                if self.water_img:
+                    for y in range(0, config.GAME_AREA_HEIGHT, config.UNIT_SIZE):
+                        for x in range(0, config.GAME_AREA_WIDTH, config.UNIT_SIZE):
+                            game_area.blit(self.water_img, (x, y))
+                else:
+                    game_area.fill(WATER_BLUE)
+            else:  # classic
+                game_area.fill(BLACK)
+
+            # Draw borders
+            color = GRAY
+            pygame.draw.rect(game_area, color, (0, 0, config.GAME_AREA_WIDTH, 2 * config.UNIT_SIZE))  # Top
+            pygame.draw.rect(game_area, color, (0, config.GAME_AREA_HEIGHT - 2 * config.UNIT_SIZE, config.GAME_AREA_WIDTH, 2 * config.UNIT_SIZE))  # Bottom
+            pygame.draw.rect(game_area, color, (0, 0, 3 * config.UNIT_SIZE, config.GAME_AREA_HEIGHT))  # Left
+            pygame.draw.rect(game_area, color, (config.GAME_AREA_WIDTH - 3 * config.UNIT_SIZE, 0, 3 * config.UNIT_SIZE, config.GAME_AREA_HEIGHT))  # Right
+
+            # Draw filled areas
+            for y, x in xonix_field.cells_with_value(self.game_state.game_field, config.GAME_FIELD_FILLED):
+                if self.view == 'modern' and self.sand_img:
+                    game_area.blit(self.sand_img, (x * config.UNIT_SIZE, y * config.UNIT_SIZE))
                 else:
-                    fill_color = GRASS_GREEN if GAME_MODE['view'] == 'modern' else GRAY
+                    fill_color = GRASS_GREEN if self.view == 'modern' else GRAY
                     pygame.draw.rect(game_area, fill_color, (x * config.UNIT_SIZE, y * config.UNIT_SIZE, config.UNIT_SIZE, config.UNIT_SIZE))
-    
-    # Draw player's line
-    for position in game_state.player.line:
-        pygame.draw.rect(game_area, GREEN, (position[0]*config.UNIT_SIZE+config.UNIT_SIZE/4, position[1]*config.UNIT_SIZE+config.UNIT_SIZE/4, config.UNIT_SIZE/2, config.UNIT_SIZE/2))
-    
-    # Draw player
-    if GAME_MODE['view'] == 'modern' and RABBIT_IMG:
-        game_area.blit(RABBIT_IMG, (game_state.player.x, game_state.player.y))
-    else:
-        pygame.draw.rect(game_area, WHITE, (game_state.player.x, game_state.player.y, game_state.player.width, game_state.player.height))
-    
-    # Draw enemies
-    for enemy in game_state.enemies:
-        if enemy.type == 'filled':
-            # Wolf in modern mode, black box in classic
-            if GAME_MODE['view'] == 'modern' and WOLF_IMG:
-                game_area.blit(WOLF_IMG, (enemy.x, enemy.y))
+
+        # Draw the players' lines
+        for position in self.trail_cells():
+            self.draw_line_cell(game_area, position)
+
+        self.draw_sprites(game_area, positions)
+
+    def draw_line_cell(self, surface, position):
+        unit = self.config.UNIT_SIZE
+        pygame.draw.rect(surface, GREEN, (position[0]*unit+unit/4 - self.camera.x, position[1]*unit+unit/4 - self.camera.y, unit/2, unit/2))
+
+    def trail_cells(self):
+        # Cells of every player's line
+        cells = set(self.game_state.player.line_cells)
+        for player in self.other_players:
+            cells.update(player.line_cells)
+        return cells
+
+    def sprite_positions(self):
+        # Pixel positions of the player, then any opponents, then every enemy
+        game_state = self.game_state
+        return ([(game_state.player.x, game_state.player.y)] + [(player.x, player.y) for player in self.other_players] +
+                [(enemy.x, enemy.y) for enemy in game_state.enemies])
+
+    def interpolated_positions(self, previous_positions, alpha):
+        # Blend between the last two logic ticks; jumps (resets, respawns) snap instead
+        config = self.config
+        current_positions = self.sprite_positions()
+        if not config.INTERPOLATE_MOVEMENT or previous_positions is None or len(previous_positions) != len(current_positions):
+            return current_positions
+
+        positions = []
+        for (previous_x, previous_y), (x, y) in zip(previous_positions, current_positions):
+            if abs(x - previous_x) > config.UNIT_SIZE or abs(y - previous_y) > config.UNIT_SIZE:
+                positions.append((x, y))
             else:
-                pygame.draw.rect(game_area, BLACK, (enemy.x, enemy.y, config.UNIT_SIZE, config.UNIT_SIZE))
+                positions.append((round(previous_x + (x - previous_x) * alpha), round(previous_y + (y - previous_y) * alpha)))
+        return positions
+
+    def draw_sprites(self, surface, positions=None):
+        config = self.config
+        modern = self.view == 'modern'
+        if positions is None:
+            positions = self.sprite_positions()
+
+        # Sprites are positioned in map pixels; shift them into the camera view
+        positions = [(x - self.camera.x, y - self.camera.y) for x, y in positions]
+
+        # Draw player
+        player = self.game_state.player
+        player_x, player_y = positions[0]
+        if modern and self.rabbit_img:
+            surface.blit(self.rabbit_img, (player_x, player_y))
         else:
-            # Crocodile in modern mode, white circle in classic
-            if GAME_MODE['view'] == 'modern' and CROCODILE_IMG:
-                game_area.blit(CROCODILE_IMG, (enemy.x, enemy.y))
+            pygame.draw.rect(surface, WHITE, (player_x, player_y, player.width, player.height))
+
+        # Draw opponents: a blue box in classic, a rabbit with a blue outline in modern
+        for other, (other_x, other_y) in zip(self.other_players, positions[1:]):
+            if modern and self.rabbit_img:
+                surface.blit(self.rabbit_img, (other_x, other_y))
+                pygame.draw.rect(surface, BLUE, (other_x, other_y, config.UNIT_SIZE, config.UNIT_SIZE), 2)
             else:
-                pygame.draw.circle(game_area, WHITE, (enemy.x + config.UNIT_SIZE // 2, enemy.y + config.UNIT_SIZE // 2), config.UNIT_SIZE // 2, 1)
-
-def display_game_over_message():
-    # Use predefined MESSAGE_FONT_SIZE that scales with game size
-    font_large = pygame.font.SysFont(None, config.MESSAGE_FONT_SIZE)
-    
-    # Create a semi-transparent overlay
-    overlay = pygame.Surface((config.SCREEN_WIDTH, config.SCREEN_HEIGHT), pygame.SRCALPHA)
-    overlay.fill((0, 0, 0, 180))  # Black with alpha (transparency)
-    screen.blit(overlay, (0, 0))
-    
-    # Main message
-    game_over_text = font_large.render("GAME OVER", True, RED)
-    text_rect = game_over_text.get_rect(center=(config.SCREEN_WIDTH // 2, config.SCREEN_HEIGHT // 2 - config.MESSAGE_FONT_SIZE // 2))
-    screen.blit(game_over_text, text_rect)
-    
-    # Secondary message with instruction
-    font_small = pygame.font.SysFont(None, config.MESSAGE_FONT_SIZE // 2)
-    continue_text = font_small.render("Starting New Game...", True, WHITE)
-    continue_rect = continue_text.get_rect(center=(config.SCREEN_WIDTH // 2, config.SCREEN_HEIGHT // 2 + config.MESSAGE_FONT_SIZE // 2))
-    screen.blit(continue_text, continue_rect)
-    
-    pygame.display.flip()
-    pygame.time.delay(2000)
-
-def display_level_up_message():
-    # Use predefined MESSAGE_FONT_SIZE that scales with game size
-    font_large = pygame.font.SysFont(None, config.MESSAGE_FONT_SIZE)
-    
-    # Create a semi-transparent overlay
-    overlay = pygame.Surface((config.SCREEN_WIDTH, config.SCREEN_HEIGHT), pygame.SRCALPHA)
-    overlay.fill((0, 0, 0, 180))  # Black with alpha (transparency)
-    screen.blit(overlay, (0, 0))
-    
-    # Main message
-    level_up_text = font_large.render(f"LEVEL {game_state.level-1} COMPLETED!", True, GREEN)
-    text_rect = level_up_text.get_rect(center=(config.SCREEN_WIDTH // 2, config.SCREEN_HEIGHT // 2 - config.MESSAGE_FONT_SIZE // 2))
-    screen.blit(level_up_text, text_rect)
-    
-    # Secondary message with next level information
-    font_small = pygame.font.SysFont(None, config.MESSAGE_FONT_SIZE // 2)
-    next_level_text = font_small.render(f"Starting Level {game_state.level}...", True, WHITE)
-    next_level_rect = next_level_text.get_rect(center=(config.SCREEN_WIDTH // 2, config.SCREEN_HEIGHT // 2 + config.MESSAGE_FONT_SIZE // 2))
-    screen.blit(next_level_text, next_level_rect)
-    
-    pygame.display.flip()
-    pygame.time.delay(2000)
-
-# Main game loop
-def main():
-    running = True
-    while running:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                running = False
-                
-        if game_state.lives <= 0:
-            display_game_over_message()
-            game_state.reset_game()
-        
-        # Get key states for player movement
-        keys = pygame.key.get_pressed()
-        keys_pressed = [
-            keys[pygame.K_LEFT],
-            keys[pygame.K_RIGHT],
-            keys[pygame.K_UP],
-            keys[pygame.K_DOWN]
-        ]
-        
+                pygame.draw.rect(surface, BLUE, (other_x, other_y, other.width, other.height))
+
+        # Draw enemies
+        for enemy, (enemy_x, enemy_y) in zip(self.game_state.enemies, positions[1 + len(self.other_players):]):
+            if enemy.type == 'filled':
+                # Wolf in modern mode, black box in classic
+                if modern and self.wolf_img:
+                    surface.blit(self.wolf_img, (enemy_x, enemy_y))
+                else:
+                    pygame.draw.rect(surface, BLACK, (enemy_x, enemy_y, config.UNIT_SIZE, config.UNIT_SIZE))
+            else:
+                # Crocodile in modern mode, white circle in classic
+                if modern and self.crocodile_img:
+                    surface.blit(self.crocodile_img, (enemy_x, enemy_y))
+                else:
+                    pygame.draw.circle(surface, WHITE, (enemy_x + config.UNIT_SIZE // 2, enemy_y + config.UNIT_SIZE // 2), config.UNIT_SIZE // 2, 1)
+
+    def draw_field_cell(self, surface, x, y, value):
+        # Draw a single field cell exactly as draw_game_field would
+        config = self.config
+        cell_rect = (x * config.UNIT_SIZE - self.camera.x, y * config.UNIT_SIZE - self.camera.y, config.UNIT_SIZE, config.UNIT_SIZE)
+        if self.view == 'modern':
+            if self.water_img:
+                surface.blit(self.water_img, cell_rect)
+            else:
+                surface.fill(WATER_BLUE, cell_rect)
+        else:  # classic
+            surface.fill(BLACK, cell_rect)
+
+        if value == config.GAME_FIELD_FILLED:
+            if self.view == 'modern' and self.sand_img:
+                surface.blit(self.sand_img, cell_rect)
+            else:
+                fill_color = GRASS_GREEN if self.view == 'modern' else GRAY
+                pygame.draw.rect(surface, fill_color, cell_rect)
+
+    def display_game_over_message(self):
+        config = self.config
+        # Use predefined MESSAGE_FONT_SIZE that scales with game size
+        font_large = get_font(config.MESSAGE_FONT_SIZE)
+
+        # Darken the frame with the prebuilt semi-transparent overlay
+        self.screen.blit(self.dim_overlay, (0, 0))
+
+        # Main message
+        game_over_text = text_cache.render(font_large, "GAME OVER", RED)
+        text_rect = game_over_text.get_rect(center=(config.SCREEN_WIDTH // 2, config.SCREEN_HEIGHT // 2 - config.MESSAGE_FONT_SIZE // 2))
+        self.screen.blit(game_over_text, text_rect)
+
+        # Secondary message with instruction
+        font_small = get_font(config.MESSAGE_FONT_SIZE // 2)
+        continue_text = text_cache.render(font_small, "Starting New Game...", WHITE)
+        continue_rect = continue_text.get_rect(center=(config.SCREEN_WIDTH // 2, config.SCREEN_HEIGHT // 2 + config.MESSAGE_FONT_SIZE // 2))
+        self.screen.blit(continue_text, continue_rect)
+
+    def display_level_up_message(self):
+        config = self.config
+        # Use predefined MESSAGE_FONT_SIZE that scales with game size
+        font_large = get_font(config.MESSAGE_FONT_SIZE)
+
+        # Darken the frame with the prebuilt semi-transparent overlay
+        self.screen.blit(self.dim_overlay, (0, 0))
+
+        # Main message
+        level_up_text = text_cache.render(font_large, f"LEVEL {self.game_state.level-1} COMPLETED!", GREEN)
+        text_rect = level_up_text.get_rect(center=(config.SCREEN_WIDTH // 2, config.SCREEN_HEIGHT // 2 - config.MESSAGE_FONT_SIZE // 2))
+        self.screen.blit(level_up_text, text_rect)
+
+        # Secondary message with next level information
+        font_small = get_font(config.MESSAGE_FONT_SIZE // 2)
+        next_level_text = text_cache.render(font_small, f"Starting Level {self.game_state.level}...", WHITE)
+        next_level_rect = next_level_text.get_rect(center=(config.SCREEN_WIDTH // 2, config.SCREEN_HEIGHT // 2 + config.MESSAGE_FONT_SIZE // 2))
+        self.screen.blit(next_level_text, next_level_rect)
+
+    def run_logic_tick(self, keys_pressed, profiler):
+        # One fixed-length simulation step; returns an overlay to show, if any
+        game_state = self.game_state
         # Update game state
         game_state.handle_player_movement(keys_pressed)
+        profiler.mark('movement')
         collision_occurred = game_state.handle_collisions()
-        if collision_occurred:
-            clear_score_area()
-            pygame.time.delay(1000)
-            
+        profiler.mark('collisions')
         game_state.handle_area_filling()
-        
-        # Draw everything
-        draw_game_field()
-        display_game_score_level_lives_etc()
-        
+        profiler.mark('area_filling')
+
         # Check for level completion
         if game_state.handle_level_up():
-            display_level_up_message()
-            clear_score_area()
-            display_game_score_level_lives_etc()
-        
-        # Update display
+            return TimedOverlay('level_up', 2.0, self.display_level_up_message)
+        if collision_occurred:
+            return TimedOverlay('collision', 1.0)
+        return None
+
+    def draw_frame_graph(self, profiler):
+        # Returns the screen rect the graph covers
+        self.frame_graph.update_text(profiler.summary)
+        return self.frame_graph.draw(self.screen, (self.config.SCREEN_WIDTH - self.frame_graph.surface.get_width(), self.config.SCORE_SPACE))
+
+    def render_frame(self, renderer, positions, overlay, profiler):
+        config = self.config
+        # Draw everything; overlays need the whole frame underneath them
+        if renderer and overlay is None:
+            dirty_rects = renderer.draw(positions)
+            profiler.mark('draw')
+            if self.display_game_score_level_lives_etc(blit_game_area=False, force=False):
+                dirty_rects.append(pygame.Rect(0, 0, config.SCREEN_WIDTH, config.SCORE_SPACE))
+            if config.DEBUG:
+                dirty_rects.append(pygame.Rect(0, config.SCREEN_HEIGHT - config.DEBUG_SPACE, config.SCREEN_WIDTH, config.DEBUG_SPACE))
+            profiler.mark('hud')
+            if config.PROFILE_OVERLAY:
+                dirty_rects.append(self.draw_frame_graph(profiler))
+                profiler.mark('other')
+            pygame.display.update(dirty_rects)
+            profiler.mark('present')
+            return
+
+        if renderer:
+            renderer.invalidate()
+            renderer.draw(positions)
+        else:
+            self.draw_game_field(positions)
+        profiler.mark('draw')
+        self.display_game_score_level_lives_etc(blit_game_area=not renderer)
+        if overlay and overlay.draw:
+            overlay.draw()
+        profiler.mark('hud')
+        if config.PROFILE_OVERLAY:
+            self.draw_frame_graph(profiler)
+            profiler.mark('other')
         pygame.display.flip()
-        pygame.time.Clock().tick(config.GAME_SPEED_ADJUSTMENT)
+        profiler.mark('present')
+
+    # Main game loop
+    def main(self, exit_on_quit=True, input_source=None, recorder=None):
+        # input_source replaces the keyboard (e.g. replay playback) and returns None when
+        # exhausted; recorder receives the keys of every simulated tick
+        config = self.config
+        if input_source is None:
+            input_source = read_keys_pressed
+        renderer = DirtyRectRenderer(self) if config.DIRTY_RECT_RENDERING else None
+        profiler = xonix_profiler.FrameProfiler(output_path=config.PROFILE_OUTPUT)
+        capture = xonix_capture.FrameCapture.from_config(config, self.screen.get_size())
+        clock = pygame.time.Clock()
+        tick_seconds = 1.0 / config.GAME_SPEED_ADJUSTMENT
+        accumulator = 0.0
+        overlay = None
+        previous_positions = None
+        running = True
+        while running:
+            # Cap the frame time so a long stall does not trigger a burst of catch-up ticks
+            frame_time = min(clock.tick(config.FRAME_RATE) / 1000.0, config.MAX_FRAME_TIME)
+            profiler.begin_frame()
+
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    running = False
+                elif event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                    config.PROFILE_OVERLAY = not config.PROFILE_OVERLAY
+                    if renderer:
+                        # Repaint whatever the graph was covering
+                        renderer.invalidate()
+            profiler.mark('input')
+
+            if overlay:
+                if overlay.update(frame_time):
+                    if overlay.on_finish:
+                        overlay.on_finish()
+                    overlay = None
+                    previous_positions = None
+                    self.clear_score_area()
+                    if renderer:
+                        renderer.invalidate()
+            else:
+                # Run as many fixed logic ticks as the elapsed time allows
+                accumulator += frame_time
+                while accumulator >= tick_seconds:
+                    previous_positions = self.sprite_positions()
+                    accumulator -= tick_seconds
+                    if self.game_state.lives <= 0:
+                        overlay = TimedOverlay('game_over', 2.0, self.display_game_over_message, self.game_state.reset_game)
+                        accumulator = 0.0
+                        break
+
+                    keys_pressed = input_source()
+                    profiler.mark('input')
+                    if keys_pressed is None:
+                        running = False
+                        break
+                    if recorder:
+                        recorder.record(keys_pressed)
+                    overlay = self.run_logic_tick(keys_pressed, profiler)
+                    profiler.mark('other')
+                    if overlay:
+                        accumulator = 0.0
+                        break
+
+            # Render between the last two ticks so movement stays smooth at any frame rate
+            alpha = accumulator / tick_seconds
+            positions = self.sprite_positions() if overlay else self.interpolated_positions(previous_positions, alpha)
+            profiler.mark('other')
+            self.render_frame(renderer, positions, overlay, profiler)
+            if capture:
+                capture.add(self.screen)
+                profiler.mark('other')
+            frame = profiler.end_frame()
+            if config.PROFILE_OVERLAY:
+                self.frame_graph.add(frame)
+
+        profiler.close()
+        if capture:
+            summary = capture.close()
+            print(f"Captured {summary['written']} frames to {config.CAPTURE_OUTPUT}, dropped {summary['dropped']}")
+
+        # Quit the game, or hand control back to the caller (e.g. the main menu)
+        if exit_on_quit:
+            pygame.quit()
+            sys.exit()
+
+    def run_game(self, game_config, seed=None, input_source=None, recorder=None):
+        # Play one game in this process and return when its window is closed
+        self.setup(game_config, seed)
+        self.main(exit_on_quit=False, input_source=input_source, recorder=recorder)
 
-    # Quit the game
-    pygame.quit()
-    sys.exit()
+    # Networked play against an xonix_server
+
+    def apply_players(self, players, player_index):
+        # Server player states: the local player is game_state.player, the rest are opponents
+        game_state = self.game_state
+        local_players = [game_state.player] + self.other_players
+        if len(local_players) != len(players):
+            local_players = [game_state.player] + [xonix_logic.Player(self.config) for _ in range(len(players) - 1)]
+            self.other_players = local_players[1:]
+        order = [player_index] + [index for index in range(len(players)) if index != player_index]
+        for player, index in zip(local_players, order):
+            cell_x, cell_y, lives, score, reset, cells = players[index]
+            player.x = cell_x * self.config.UNIT_SIZE
+            player.y = cell_y * self.config.UNIT_SIZE
+            if reset:
+                player.clear_line()
+            for cell in cells:
+                player.add_line_position(cell)
+        _, _, game_state.lives, game_state.score, _, _ = players[player_index]
+
+    def apply_full(self, payload, player_index):
+        # Replace the whole local state with the server's
+        _, _, snapshot, players = xonix_net.decode_full(payload)
+        self.game_state = xonix_snapshot.load_snapshot(snapshot, self.config)
+        self.other_players = []
+        self.apply_players(players, player_index)
+
+    def apply_delta(self, payload, player_index):
+        # Returns False, changing nothing, when the delta does not fit the local state
+        config = self.config
+        game_state = self.game_state
+        _, level, runs, players, enemy_cells = xonix_net.decode_delta(payload)
+        if len(enemy_cells) != len(game_state.enemies):
+            return False
+        field = game_state.writable_field()
+        changes = game_state.field_changes
+        filled = config.GAME_FIELD_FILLED
+        for y, x, length, value in runs:
+            xonix_field.fill_cells(field, [(y, column) for column in range(x, x + length)], value, changes)
+            if value == filled:
+                # Runs only hold cells that changed, so filled runs are newly filled territory
+                game_state.territory.add(y, length)
+                game_state.filled_units += length
+        game_state.level = level
+        self.apply_players(players, player_index)
+        for enemy, (cell_x, cell_y) in zip(game_state.enemies, enemy_cells):
+            enemy.x = cell_x * config.UNIT_SIZE
+            enemy.y = cell_y * config.UNIT_SIZE
+        return True
+
+    def run_network_game(self, host, port, view='modern'):
+        # Play on an xonix_server: keys go to the server, the state comes back every tick.
+        # Returns when the window is closed or the server goes away; the window stays open.
+        connection = xonix_net.Connection(host, port)
+        player_index, _ = xonix_net.decode_welcome(connection.wait_for(xonix_net.MSG_WELCOME))
+        payload = connection.wait_for(xonix_net.MSG_FULL)
+        game_config = xonix_snapshot.snapshot_config(xonix_net.decode_full(payload)[2])
+        game_config.view = view
+        self.setup(game_config)
+        self.apply_full(payload, player_index)
+        connection.start_polling()
+
+        config = self.config
+        renderer = DirtyRectRenderer(self) if config.DIRTY_RECT_RENDERING else None
+        profiler = xonix_profiler.FrameProfiler(output_path=config.PROFILE_OUTPUT)
+        clock = pygame.time.Clock()
+        tick_seconds = 1.0 / config.GAME_SPEED_ADJUSTMENT
+        since_update = 0.0
+        previous_positions = None
+        sent_keys = None
+        resyncing = False  # Deltas are dropped until the requested FULL arrives
+        running = True
+        while running and not connection.closed:
+            frame_time = clock.tick(config.FRAME_RATE) / 1000.0
+            profiler.begin_frame()
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    running = False
+
+            # Keys are only sent when they change; the server keeps the last ones
+            keys = xonix_replay.pack_keys(read_keys_pressed())
+            if keys != sent_keys:
+                connection.send(xonix_net.encode_input(keys))
+                sent_keys = keys
+            profiler.mark('input')
+
+            since_update += frame_time
+            for message_type, payload in connection.receive():
+                if message_type == xonix_net.MSG_FULL:
+                    self.apply_full(payload, player_index)
+                    previous_positions = None
+                    resyncing = False
+                    if renderer:
+                        renderer.invalidate()
+                elif message_type == xonix_net.MSG_DELTA and not resyncing:
+                    previous_positions = self.sprite_positions()
+                    if not self.apply_delta(payload, player_index):
+                        connection.send(xonix_net.encode_resync())
+                        resyncing = True
+                since_update = 0.0
+            profiler.mark('movement')
+
+            # Smooth between the last two server ticks
+            positions = self.interpolated_positions(previous_positions, min(1.0, since_update / tick_seconds))
+            self.render_frame(renderer, positions, None, profiler)
+            profiler.end_frame()
+
+        profiler.close()
+        connection.close()
+
+# One app shared by games started from the menu and other tools, so the window
+# and loaded assets carry over from one game to the next
+_app = None
+
+def get_app():
+    global _app
+    if _app is None:
+        _app = XonixApp()
+    return _app
+
+def run_game(game_config, seed=None, input_source=None, recorder=None):
+    get_app().run_game(game_config, seed, input_source, recorder)
+
+def run_network_game(host, port, view='modern'):
+    get_app().run_network_game(host, port, view)
+
+def main():
+    app = get_app()
+    app.setup(xonix_logic.GameConfig(GAME_MODE['view'], GAME_MODE['size']))
+    app.main()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,135 @@
+# xonix_headless.py - Headless simulation engine for Xonix
+
+import argparse
+import random
+import time
+import xonix_logic
+import xonix_snapshot
+
+# Key state tuples in the same (LEFT, RIGHT, UP, DOWN) order used by handle_player_movement
+NO_KEYS = (False, False, False, False)
+KEY_LEFT = (True, False, False, False)
+KEY_RIGHT = (False, True, False, False)
+KEY_UP = (False, False, True, False)
+KEY_DOWN = (False, False, False, True)
+ALL_KEYS = [NO_KEYS, KEY_LEFT, KEY_RIGHT, KEY_UP, KEY_DOWN]
+
+class TickResult:
+    def __init__(self, collision, level_up, game_over):
+        self.collision = collision
+        self.level_up = level_up
+        self.game_over = game_over
+
+class HeadlessEngine:
+    def __init__(self, config, seed=None, checkpoint_level_ups=False):
+        self.config = config
+        self.seed = seed
+        # (tick, snapshot bytes) saved after every level-up when enabled
+        self.checkpoint_level_ups = checkpoint_level_ups
+        self.checkpoints = []
+        self.game_state = None
+        self.ticks = 0
+        self.elapsed = 0.0
+        self.collisions = 0
+        self.level_ups = 0
+        self.games_over = 0
+        self.reset(seed)
+
+    def reset(self, seed=None):
+        self.seed = seed
+
+        # Same setup the GUI performs at startup, without any pygame dependency
+        self.game_state = xonix_logic.GameState(self.config, seed)
+        self.game_state.player = xonix_logic.Player(self.config)
+        self.game_state.initialize_enemies()
+
+        self.ticks = 0
+        self.elapsed = 0.0
+        self.collisions = 0
+        self.level_ups = 0
+        self.games_over = 0
+        self.checkpoints = []
+
+    def step(self, keys_pressed):
+        game_state = self.game_state
+
+        # Mirror xonix_gui.main: a lost game restarts on the following tick
+        game_over = game_state.lives <= 0
+        if game_over:
+            game_state.reset_game()
+            self.games_over += 1
+
+        game_state.handle_player_movement(keys_pressed)
+        collision = game_state.handle_collisions()
+        game_state.handle_area_filling()
+        level_up = game_state.handle_level_up()
+
+        self.ticks += 1
+        if collision:
+            self.collisions += 1
+        if level_up:
+            self.level_ups += 1
+            if self.checkpoint_level_ups:
+                self.checkpoints.append((self.ticks, xonix_snapshot.save_snapshot(game_state)))
+
+        return TickResult(collision, level_up, game_over)
+
+    def run(self, inputs, max_ticks=None):
+        # Step through a sequence of keys_pressed tuples as fast as possible
+        start_time = time.perf_counter()
+        ticks_run = 0
+
+        for keys_pressed in inputs:
+            if max_ticks is not None and ticks_run >= max_ticks:
+                break
+            self.step(keys_pressed)
+            ticks_run += 1
+
+        self.elapsed += time.perf_counter() - start_time
+        return ticks_run
+
+    def ticks_per_second(self):
+        if self.elapsed <= 0:
+            return 0.0
+        return self.ticks / self.elapsed
+
+    def summary(self):
+        return {
+            'seed': self.seed,
+            'ticks': self.ticks,
+            'elapsed': self.elapsed,
+            'ticks_per_second': self.ticks_per_second(),
+            'collisions': self.collisions,
+            'level_ups': self.level_ups,
+            'games_over': self.games_over,
+            'level': self.game_state.level,
+            'lives': self.game_state.lives,
+            'score': self.game_state.score,
+        }
+
+def random_inputs(seed, ticks, hold_min=1, hold_max=12):
+    # Random key presses held for a few ticks each, like a player would
+    rng = random.Random(seed)
+    produced = 0
+    while produced < ticks:
+        keys_pressed = rng.choice(ALL_KEYS)
+        for _ in range(min(rng.randint(hold_min, hold_max), ticks - produced)):
+            yield keys_pressed
+            produced += 1
+
+def main():
+    parser = argparse.ArgumentParser(description="Run Xonix game logic without a window")
+    parser.add_argument('--size', choices=['small', 'big'], default='small')
+    parser.add_argument('--ticks', type=int, default=100000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    config = xonix_logic.GameConfig('classic', args.size)
+    engine = HeadlessEngine(config, args.seed)
+    engine.run(random_inputs(args.seed, args.ticks))
+
+    for name, value in engine.summary().items():
+        print(f'{name}: {value}')
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+# xonix_hud.py - Cached text rendering for the Xonix score bar and messages
+
+import pygame
+
+class TextCache:
+    # Rendered text surfaces keyed by (font, text, color), so unchanged text is never re-rendered
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self.surfaces = {}
+
+    def render(self, font, text, color):
+        key = (id(font), text, color)
+        surface = self.surfaces.get(key)
+        if surface is None:
+            if len(self.surfaces) >= self.max_entries:
+                # Values like the score only move forward, so old entries are rarely needed again
+                self.surfaces.clear()
+            surface = font.render(text, True, color)
+            self.surfaces[key] = surface
+        return surface
+
+class ScoreBar:
+    # The level/lives/score/filled bar, rebuilt only when one of its values changes
+    def __init__(self, font, width, height, text_cache, text_color, background_color):
+        self.font = font
+        self.surface = pygame.Surface((width, height))
+        self.text_cache = text_cache
+        self.text_color = text_color
+        self.background_color = background_color
+        self.values = None
+
+    def invalidate(self):
+        self.values = None
+
+    def update(self, level, lives, score, filled_units, units_to_win):
+        # Returns True when the bar was re-rendered
+        values = (level, lives, score, filled_units, units_to_win)
+        if values == self.values:
+            return False
+        self.values = values
+
+        # Clear score area with black background
+        self.surface.fill(self.background_color)
+
+        # Display game stats with appropriate vertical positioning
+        vertical_position = self.surface.get_height() // 2 - self.font.get_height() // 2
+
+        texts = [
+            self.text_cache.render(self.font, f'Level: {level}', self.text_color),
+            self.text_cache.render(self.font, f'Lives: {lives}', self.text_color),
+            self.text_cache.render(self.font, f'Score: {score}', self.text_color),
+            self.text_cache.render(self.font, f'Filled: {filled_units}/{units_to_win}', self.text_color),
+        ]
+
+        # Divide remaining space by 5 (4 gaps + extra padding)
+        total_width = sum(text.get_width() for text in texts)
+        spacing = (self.surface.get_width() - total_width) // 5
+
+        x_position = spacing
+        for text in texts:
+            self.surface.blit(text, (x_position, vertical_position))
+            x_position += text.get_width() + spacing
+        return True
+
+# Stacked bar colors for the frame-time graph, in xonix_profiler.PHASES order
+PHASE_COLORS = {
+    'input': (160, 160, 160),
+    'movement': (80, 200, 120),
+    'collisions': (230, 200, 60),
+    'area_filling': (230, 120, 40),
+    'draw': (70, 140, 240),
+    'hud': (170, 100, 230),
+    'present': (220, 60, 60),
+    'other': (90, 90, 90),
+}
+
+class FrameTimeGraph:
+    # Scrolling per-frame bars stacked by phase, plus a percentile line. Each new frame
+    # scrolls the graph by one pixel and draws a single column, so it stays cheap.
+    def __init__(self, width, height, font, text_cache, frame_budget, phases):
+        self.surface = pygame.Surface((width, height))
+        self.font = font
+        self.text_cache = text_cache
+        self.phases = phases
+        self.text_height = font.get_linesize()
+        self.graph_rect = pygame.Rect(0, self.text_height, width, height - self.text_height)
+        # The frame budget sits halfway up the graph
+        self.pixels_per_second = self.graph_rect.height / (2 * frame_budget)
+        self.budget_y = self.graph_rect.bottom - int(frame_budget * self.pixels_per_second)
+        self.surface.fill((0, 0, 0))
+        self.frames_since_text = 0
+
+    def add(self, frame):
+        total, phases = frame
+        graph = self.surface.subsurface(self.graph_rect)
+        graph.scroll(-1, 0)
+        x = self.graph_rect.width - 1
+        graph.fill((0, 0, 0), (x, 0, 1, self.graph_rect.height))
+
+        bottom = self.graph_rect.height
+        for phase in self.phases:
+            height = int(phases[phase] * self.pixels_per_second)
+            if height > 0:
+                top = max(0, bottom - height)
+                graph.fill(PHASE_COLORS[phase], (x, top, 1, bottom - top))
+                bottom = top
+        graph.set_at((x, self.budget_y - self.graph_rect.top), (255, 255, 255))
+
+    def update_text(self, get_summary, every=15):
+        # The numbers only need to be readable, so recompute and re-render them every few frames
+        self.frames_since_text += 1
+        if self.frames_since_text < every:
+            return
+        self.frames_since_text = 0
+        summary = get_summary()
+        text = (f"p50 {summary['p50_ms']:.1f}  p95 {summary['p95_ms']:.1f}  p99 {summary['p99_ms']:.1f} ms"
+                f"  slowest: {summary['slowest_phase']}")
+        self.surface.fill((0, 0, 0), (0, 0, self.surface.get_width(), self.text_height))
+        self.surface.blit(self.text_cache.render(self.font, text, (255, 255, 255)), (2, 0))
+
+    def draw(self, target, position):
+        # Blit onto target; returns the covered rect
+        return target.blit(self.surface, position)
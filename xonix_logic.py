@@ -1,9 +1,47 @@
 # xonix_logic.py - Game logic for Xonix
 
 import random
+from collections import deque
+import xonix_field
+import xonix_enemies
+
+# Custom maps: share of the interior to fill per level, and the largest window
+CUSTOM_WIN_RATIO = 0.75
+MAX_VIEW_WIDTH = 1280
+MAX_VIEW_HEIGHT = 800
+
+# Maps with more cells than this use the sparse chunked field
+CHUNKED_FIELD_THRESHOLD = 250000
+# Maps with at least this many cells use a numpy array when numpy is installed.
+# Smaller maps spend most of a tick on single-cell reads, which are faster on lists.
+NUMPY_FIELD_THRESHOLD = 150000
+
+# GameState.last_hit when the player runs into their own line
+HIT_OWN_LINE = 'own_line'
+
+# Settings that decide how a game plays out
+RULE_SETTINGS = ('UNITS_TO_WIN', 'WIN_MODE', 'WIN_PERCENT', 'CROCODILES_PER_LEVEL', 'PLAYER_SPEED', 'ENEMY_SPEED',
+                 'GAME_FIELD_UNFILLED', 'GAME_FIELD_FILLED', 'GAME_FIELD_LINE', 'GAME_FIELD_PLAYER',
+                 'GAME_FIELD_ENEMY_U', 'GAME_FIELD_ENEMY_F', 'GAME_FIELD_TEMP_FILLED')
+# Replays and snapshots store these when they differ from the preset; the last two
+# change the pace and the storage of a game, not what happens in it
+RECORDED_SETTINGS = RULE_SETTINGS + ('GAME_SPEED_ADJUSTMENT', 'FIELD_BACKEND')
+# Settings the screen layout is derived from
+LAYOUT_SETTINGS = ('GAME_LOGIC_AREA_WIDTH', 'GAME_LOGIC_AREA_HEIGHT', 'UNIT_SIZE')
+
+def check_map_size(width, height):
+    if width < 2 * xonix_field.BORDER_COLUMNS + 1 or height < 2 * xonix_field.BORDER_ROWS + 1:
+        raise ValueError(f"Map {width}x{height} is too small to have an interior")
+
+def default_field_backend(width, height):
+    if width * height > CHUNKED_FIELD_THRESHOLD:
+        return 'chunked'
+    if width * height >= NUMPY_FIELD_THRESHOLD and xonix_field.numpy_available():
+        return 'numpy'
+    return 'list'  # 'bitboard' can also be chosen
 
 class GameConfig:
-    def __init__(self, view='modern', size='small'):
+    def __init__(self, view='modern', size='small', width=None, height=None, unit_size=None):
         self.view = view
         self.size = size
         
@@ -25,14 +63,61 @@ class GameConfig:
             self.SCORE_FONT_SIZE = int(self.UNIT_SIZE * 1.5)
             self.MESSAGE_FONT_SIZE = self.UNIT_SIZE * 4
         
+        # Custom map dimensions override the preset layout
+        if width is not None or height is not None or unit_size is not None:
+            self.set_custom_layout(width, height, unit_size)
+        
         # Common settings
         self.DEBUG = False
+        self.FIELD_BACKEND = default_field_backend(self.GAME_LOGIC_AREA_WIDTH, self.GAME_LOGIC_AREA_HEIGHT)
+        self.DIRTY_RECT_RENDERING = True  # Redraw and present only changed cells
+        self.PALETTE_FIELD_RENDERING = True  # Classic view: draw the field as one scaled 8-bit surface
+        self.FRAME_RATE = 60  # Render rate; logic runs at GAME_SPEED_ADJUSTMENT ticks per second
+        self.MAX_FRAME_TIME = 0.25  # Longest frame time fed into the simulation, in seconds
+        self.INTERPOLATE_MOVEMENT = True
+        self.WIN_MODE = 'units'  # 'units': UNITS_TO_WIN per level; 'percent': fill WIN_PERCENT of the interior
+        self.WIN_PERCENT = CUSTOM_WIN_RATIO * 100
+        self.CROCODILES_PER_LEVEL = 1  # Unfilled-area enemies spawned per level number
+        self.PROFILE_OVERLAY = False  # Frame-time graph on screen; F3 toggles it while playing
+        self.PROFILE_OUTPUT = None  # Path to stream per-frame phase timings to (.csv or .jsonl)
+        self.CAPTURE_OUTPUT = None  # Record presented frames: raw file, PNG directory or encoder command (see xonix_capture)
+        self.CAPTURE_FORMAT = 'raw'  # 'raw', 'png' or 'pipe'
+        self.CAPTURE_QUEUE_FRAMES = 30  # Frames waiting for the writer before new ones are dropped
         
-        # Constants
-        self.SCORE_SPACE = self.UNIT_SIZE * 2
+        self.update_layout()
+        
+        # Game field state constants
+        self.GAME_FIELD_UNFILLED = 0
+        self.GAME_FIELD_FILLED = 1
+        self.GAME_FIELD_LINE = 2
+        self.GAME_FIELD_PLAYER = 3
+        self.GAME_FIELD_ENEMY_U = 4
+        self.GAME_FIELD_ENEMY_F = 5
+        self.GAME_FIELD_TEMP_FILLED = 6
+
+    def set_custom_layout(self, width, height, unit_size):
+        # Map size and unit size, plus the win threshold and fonts scaled to them;
+        # None keeps the current value
+        self.GAME_LOGIC_AREA_WIDTH = width or self.GAME_LOGIC_AREA_WIDTH
+        self.GAME_LOGIC_AREA_HEIGHT = height or self.GAME_LOGIC_AREA_HEIGHT
+        self.UNIT_SIZE = unit_size or self.UNIT_SIZE
+        check_map_size(self.GAME_LOGIC_AREA_WIDTH, self.GAME_LOGIC_AREA_HEIGHT)
+        interior = ((self.GAME_LOGIC_AREA_WIDTH - 2 * xonix_field.BORDER_COLUMNS) *
+                    (self.GAME_LOGIC_AREA_HEIGHT - 2 * xonix_field.BORDER_ROWS))
+        self.UNITS_TO_WIN = max(1, int(interior * CUSTOM_WIN_RATIO))
+        self.SCORE_FONT_SIZE = max(int(self.UNIT_SIZE * 1.5), 24)
+        self.MESSAGE_FONT_SIZE = max(self.UNIT_SIZE * 4, 64)
+
+    def update_layout(self):
+        # Pixel sizes and speeds derived from the map size and UNIT_SIZE
+        self.SCORE_SPACE = max(self.UNIT_SIZE * 2, self.SCORE_FONT_SIZE + 4)
         self.GAME_AREA_WIDTH = self.GAME_LOGIC_AREA_WIDTH * self.UNIT_SIZE
         self.GAME_AREA_HEIGHT = self.GAME_LOGIC_AREA_HEIGHT * self.UNIT_SIZE
-        self.SCREEN_WIDTH = self.GAME_AREA_WIDTH
+        
+        # Visible part of the game area; the camera scrolls when the map is larger
+        self.VIEW_WIDTH = min(self.GAME_AREA_WIDTH, MAX_VIEW_WIDTH - MAX_VIEW_WIDTH % self.UNIT_SIZE)
+        self.VIEW_HEIGHT = min(self.GAME_AREA_HEIGHT, MAX_VIEW_HEIGHT - MAX_VIEW_HEIGHT % self.UNIT_SIZE)
+        self.SCREEN_WIDTH = self.VIEW_WIDTH
         
         # Adjust SCREEN_HEIGHT based on DEBUG status
         if self.DEBUG:
@@ -40,60 +125,144 @@ class GameConfig:
         else:
             self.DEBUG_SPACE = 0
             
-        self.SCREEN_HEIGHT = self.GAME_AREA_HEIGHT + self.SCORE_SPACE + self.DEBUG_SPACE
+        self.SCREEN_HEIGHT = self.VIEW_HEIGHT + self.SCORE_SPACE + self.DEBUG_SPACE
         self.PLAYER_SPEED = self.UNIT_SIZE
         self.ENEMY_SPEED = self.UNIT_SIZE
-        
-        # Game field state constants
-        self.GAME_FIELD_UNFILLED = 0
-        self.GAME_FIELD_FILLED = 1
-        self.GAME_FIELD_LINE = 2
-        self.GAME_FIELD_PLAYER = 3
-        self.GAME_FIELD_ENEMY_U = 4
-        self.GAME_FIELD_ENEMY_F = 5
-        self.GAME_FIELD_TEMP_FILLED = 6
+
+    def apply_settings(self, settings):
+        # Change settings by name, recomputing what is derived from them. Layout changes
+        # reset the win threshold, fonts, speeds and field backend unless settings also
+        # gives those.
+        unknown = [name for name in settings if name not in RECORDED_SETTINGS + LAYOUT_SETTINGS]
+        if unknown:
+            raise ValueError(f"Cannot change {', '.join(unknown)} on a GameConfig")
+        layout = {name: value for name, value in settings.items() if name in LAYOUT_SETTINGS}
+        if layout:
+            self.set_custom_layout(layout.get('GAME_LOGIC_AREA_WIDTH'), layout.get('GAME_LOGIC_AREA_HEIGHT'),
+                                   layout.get('UNIT_SIZE'))
+            self.update_layout()
+            self.FIELD_BACKEND = default_field_backend(self.GAME_LOGIC_AREA_WIDTH, self.GAME_LOGIC_AREA_HEIGHT)
+        for name, value in settings.items():
+            if name not in LAYOUT_SETTINGS:
+                setattr(self, name, value)
+        if self.FIELD_BACKEND == 'numpy' and not xonix_field.numpy_available():
+            self.FIELD_BACKEND = 'list'
 
 class GameState:
-    def __init__(self, config):
+    def __init__(self, config, seed=None):
         self.config = config
+        # All randomness goes through this generator so a seed reproduces a whole run
+        self.seed = seed
+        self.rng = random.Random(seed)
         self.lives = 5
         self.score = 0
         self.filled_units = 0
         self.level = 1
         self.game_field = None
         self.player = None
-        self.enemies = []
+        self.enemies = xonix_enemies.EnemyGroup(config)
         self.dx = 0
         self.dy = 0
+        self.last_hit = None  # What cost the most recent life: one of xonix_enemies.HIT_* or HIT_OWN_LINE
+        self.field_shared = False  # game_field is shared with a clone; copy it before writing
+        self.regions_shared = False  # Same for regions
+        # Cells (y, x) written since take_field_changes(), while tracking (for redrawing)
+        self.field_changes = None
+        self.field_replaced = False  # The whole field changed since take_field_changes()
         self.initialize_game_field()
         
     def initialize_game_field(self):
-        # Reset game field
-        self.game_field = [[self.config.GAME_FIELD_UNFILLED for _ in range(self.config.GAME_LOGIC_AREA_WIDTH)] 
-                           for _ in range(self.config.GAME_LOGIC_AREA_HEIGHT)]
-        
-        # Fill borders
-        for x in range(self.config.GAME_LOGIC_AREA_WIDTH):
-            for y in range(2):  # Top two rows
-                self.game_field[y][x] = self.config.GAME_FIELD_FILLED
-            for y in range(self.config.GAME_LOGIC_AREA_HEIGHT - 2, self.config.GAME_LOGIC_AREA_HEIGHT):  # Bottom two rows
-                self.game_field[y][x] = self.config.GAME_FIELD_FILLED
-                
-        for y in range(self.config.GAME_LOGIC_AREA_HEIGHT):
-            for x in range(3):  # Left three columns
-                self.game_field[y][x] = self.config.GAME_FIELD_FILLED
-            for x in range(self.config.GAME_LOGIC_AREA_WIDTH - 3, self.config.GAME_LOGIC_AREA_WIDTH):  # Right three columns
-                self.game_field[y][x] = self.config.GAME_FIELD_FILLED
+        # Reset game field with the borders already filled
+        self.game_field = xonix_field.create_game_field(self.config)
+        self.field_shared = False
+        # Filled cells per row and in total, updated as cells are filled
+        self.territory = xonix_field.FillCounter(self.config.GAME_LOGIC_AREA_WIDTH, self.config.GAME_LOGIC_AREA_HEIGHT)
+        # Unfilled regions, labelled on the first fill and then kept up to date
+        self.regions = None
+        self.note_field_replaced()
+
+    def track_field_changes(self):
+        # Start journaling field writes; the first take_field_changes() reports a full change
+        self.field_changes = set()
+        self.field_replaced = True
+
+    def take_field_changes(self):
+        # Cells written since the previous call, or None when everything must be treated as changed
+        changes = self.field_changes
+        if changes is None or self.field_replaced:
+            if changes is not None:
+                self.field_changes = set()
+                self.field_replaced = False
+            return None
+        self.field_changes = set()
+        return changes
+
+    def note_field_replaced(self):
+        if self.field_changes is not None:
+            self.field_replaced = True
+            self.field_changes = set()
+
+    def writable_field(self):
+        # Copy-on-write: the first write after clone() gives this state its own field
+        if self.field_shared:
+            self.game_field = xonix_field.copy_field(self.game_field)
+            self.field_shared = False
+        return self.game_field
+
+    def writable_regions(self):
+        # The region index, built from the field if there is none, copied if shared with a clone.
+        # The chunked field is too large for a per-cell index, and the bitboard field fills by
+        # dilation and keeps its clones cheap; neither has one.
+        if xonix_field.is_chunked_field(self.game_field) or xonix_field.is_bitboard_field(self.game_field):
+            return None
+        if self.regions is None:
+            self.regions = xonix_field.RegionIndex.from_field(self.game_field, self.config.GAME_FIELD_UNFILLED)
+            self.regions_shared = False
+        elif self.regions_shared:
+            self.regions = self.regions.copy()
+            self.regions_shared = False
+        return self.regions
+
+    def fill_trail(self, cells):
+        # Mark trail cells filled; cells holds each trail position once
+        game_field = self.writable_field()
+        filled = self.config.GAME_FIELD_FILLED
+        for (x, y) in cells:
+            game_field[y][x] = filled
+            self.territory.add(y)
+        if self.field_changes is not None:
+            self.field_changes.update((y, x) for x, y in cells)
+        # An index that does not exist yet is built later from the field as it is then
+        if self.regions is not None:
+            self.writable_regions().remove_cells(cells)
+
+    def clone(self):
+        # Independent copy for lookahead; the field is only copied once either side writes to it
+        state = GameState.__new__(GameState)
+        state.__dict__.update(self.__dict__)
+        state.rng = random.Random.__new__(random.Random)  # Skips seeding from the OS
+        state.rng.setstate(self.rng.getstate())
+        state.player = self.player.clone() if self.player is not None else None
+        state.enemies = self.enemies.copy()
+        state.territory = self.territory.copy()
+        state.field_shared = True
+        self.field_shared = True
+        state.regions_shared = True
+        self.regions_shared = True
+        state.field_changes = None  # Lookahead writes are never drawn
+        state.field_replaced = False
+        return state
     
     def initialize_enemies(self):
         # Create filled enemy at top middle
-        self.enemies = [Enemy(self.config.GAME_AREA_WIDTH // 2, 0, 'filled', self.config)]
+        self.enemies = xonix_enemies.EnemyGroup(self.config)
+        self.enemies.append(Enemy(self.config.GAME_AREA_WIDTH // 2, 0, 'filled', self.config, self.rng))
         
         # Create unfilled enemies based on current level
-        for _ in range(self.level):
-            x = random.randint(3, self.config.GAME_LOGIC_AREA_WIDTH - 4) * self.config.UNIT_SIZE
-            y = random.randint(2, self.config.GAME_LOGIC_AREA_HEIGHT - 3) * self.config.UNIT_SIZE
-            self.enemies.append(Enemy(x, y, 'unfilled', self.config))
+        for _ in range(self.level * self.config.CROCODILES_PER_LEVEL):
+            x = self.rng.randint(3, self.config.GAME_LOGIC_AREA_WIDTH - 4) * self.config.UNIT_SIZE
+            y = self.rng.randint(2, self.config.GAME_LOGIC_AREA_HEIGHT - 3) * self.config.UNIT_SIZE
+            self.enemies.append(Enemy(x, y, 'unfilled', self.config, self.rng))
     
     def reset_game(self):
         self.lives = 5
@@ -105,16 +274,20 @@ class GameState:
         self.initialize_game_field()
     
     def temp_flood_fill(self, start_pos, fill_value, boundary_values):
-        x_size = len(self.game_field[0])
-        y_size = len(self.game_field)
-        queue = [start_pos]
+        # Scan plain rows; array fields are written back in one bulk operation
+        self.writable_field()
+        self.regions = None  # Temporary values are not tracked by the region index
+        rows = xonix_field.field_rows(self.game_field)
+        x_size = len(rows[0])
+        y_size = len(rows)
+        queue = deque([start_pos])
         filled_area = []
 
         while queue:
-            x, y = queue.pop(0)
-            if not (0 <= x < x_size and 0 <= y < y_size) or self.game_field[y][x] in boundary_values:
+            x, y = queue.popleft()
+            if not (0 <= x < x_size and 0 <= y < y_size) or rows[y][x] in boundary_values:
                 continue
-            self.game_field[y][x] = fill_value
+            rows[y][x] = fill_value
             filled_area.append((y, x))
             
             # Add adjacent cells to queue
@@ -122,7 +295,11 @@ class GameState:
             queue.append((x + 1, y))
             queue.append((x, y - 1))
             queue.append((x, y + 1))
-                
+
+        if rows is not self.game_field:
+            xonix_field.fill_cells(self.game_field, filled_area, fill_value, self.field_changes)
+        elif self.field_changes is not None:
+            self.field_changes.update(filled_area)
         return filled_area
     
     def is_point_in_subarea(self, point, subarea):
@@ -150,28 +327,30 @@ class GameState:
                         
         return list(subareas_starting_points)
     
-    def handle_area_filling(self):
+    def handle_area_filling(self, blocked_cells=()):
         if self.player.returned_to_filled_area:
-            subareas_start_positions = self.identify_subareas_starting_points(self.player.line)
-            
-            while subareas_start_positions:
-                start_pos = subareas_start_positions.pop(0)
-                sub_area = self.temp_flood_fill(start_pos, self.config.GAME_FIELD_TEMP_FILLED, 
-                                               boundary_values=[self.config.GAME_FIELD_FILLED, self.config.GAME_FIELD_TEMP_FILLED])
-                
-                if all(not self.is_point_in_subarea((enemy.x // self.config.UNIT_SIZE, enemy.y // self.config.UNIT_SIZE), sub_area) 
-                       for enemy in self.enemies if enemy.type == 'unfilled'):
-                    # No enemies in this subarea, fill it
-                    self.score += len(sub_area)
-                    self.filled_units += len(sub_area)
-                    for y, x in sub_area:
-                        self.game_field[y][x] = self.config.GAME_FIELD_FILLED
-                else:
-                    # Enemies found, revert to unfilled
-                    for y, x in sub_area:
-                        self.game_field[y][x] = self.config.GAME_FIELD_UNFILLED
-                        
-            self.player.line.clear()
+            self.writable_field()
+            # Crocodiles (and any extra blocked_cells, e.g. other players) block their region from being filled
+            enemy_cells = set(self.enemies.cells('unfilled'))
+            enemy_cells.update(blocked_cells)
+            row_counts = {}
+            regions = self.writable_regions()
+            if regions is not None:
+                # The trail already split the index, so only its neighbouring regions are looked at
+                filled_count = xonix_field.fill_indexed_regions(self.game_field, regions, self.player.line,
+                                                                enemy_cells, self.config.GAME_FIELD_FILLED, row_counts,
+                                                                self.field_changes)
+            else:
+                subareas_start_positions = self.identify_subareas_starting_points(self.player.line)
+                filled_count = xonix_field.fill_enclosed_regions(self.game_field, subareas_start_positions,
+                                                                 self.config.GAME_FIELD_UNFILLED, enemy_cells,
+                                                                 self.config.GAME_FIELD_FILLED, row_counts,
+                                                                 self.field_changes)
+            self.territory.add_rows(row_counts)
+            self.score += filled_count
+            self.filled_units += filled_count
+
+            self.player.clear_line()
     
     def handle_player_movement(self, keys_pressed):
         self.dx, self.dy = 0, 0
@@ -197,57 +376,59 @@ class GameState:
         player_grid_x = self.player.x // self.config.UNIT_SIZE
         player_grid_y = self.player.y // self.config.UNIT_SIZE
         
-        # Check enemy collisions
-        for enemy in self.enemies:
-            enemy.move(self.game_field)
-            enemy_grid_x = enemy.x // self.config.UNIT_SIZE
-            enemy_grid_y = enemy.y // self.config.UNIT_SIZE
-            
-            # Player and enemy collision
-            if player_grid_x == enemy_grid_x and player_grid_y == enemy_grid_y:
-                if enemy.type == 'filled':
-                    # Collision with filled enemy (wolf)
-                    self.lives -= 1
-                    self.player.reset_position()
-                    enemy.x = self.config.GAME_AREA_WIDTH // 2
-                    enemy.x = enemy.x - (enemy.x % self.config.UNIT_SIZE)
-                    enemy.y = 0
-                    return True
-                elif enemy.type == 'unfilled' and self.game_field[player_grid_y][player_grid_x] == self.config.GAME_FIELD_UNFILLED:
-                    # Collision with unfilled enemy (crocodile) in unfilled area
-                    self.player.line.clear()
-                    self.lives -= 1
-                    self.player.reset_position()
-                    return True
-            elif enemy.type == 'unfilled':
-                # Enemy colliding with player's line
-                for position in self.player.line:
-                    line_grid_x, line_grid_y = position[0], position[1]
-                    if enemy_grid_x == line_grid_x and enemy_grid_y == line_grid_y:
-                        self.player.line.clear()
-                        self.lives -= 1
-                        self.player.reset_position()
-                        return True
+        # Move the enemies in order, stopping at the first one that hits the player or the line
+        player_on_unfilled = self.game_field[player_grid_y][player_grid_x] == self.config.GAME_FIELD_UNFILLED
+        hit = self.enemies.move_until_collision(self.game_field, (player_grid_x, player_grid_y),
+                                                player_on_unfilled, self.player.line_cells)
+        if hit is not None:
+            index, kind = hit
+            self.lives -= 1
+            self.last_hit = kind
+            self.player.reset_position()
+            if kind == xonix_enemies.HIT_WOLF:
+                # Collision with filled enemy (wolf)
+                enemy = self.enemies[index]
+                enemy.x = self.config.GAME_AREA_WIDTH // 2
+                enemy.x = enemy.x - (enemy.x % self.config.UNIT_SIZE)
+                enemy.y = 0
+            else:
+                # Crocodile caught the player in the unfilled area, or crossed the line
+                self.player.clear_line()
+            return True
         
-        # Check for player colliding with own line
-        for position in self.player.line[:-1]:  # Exclude the last line segment
-            line_grid_x, line_grid_y = position[0], position[1]
-            if player_grid_x == line_grid_x and player_grid_y == line_grid_y:
-                self.lives -= 1
-                self.player.reset_position()
-                self.player.line.clear()
-                return True
+        # Check for player colliding with own line, excluding the last line segment
+        if self.player.line_hits_before_end(player_grid_x, player_grid_y):
+            self.lives -= 1
+            self.last_hit = HIT_OWN_LINE
+            self.player.reset_position()
+            self.player.clear_line()
+            return True
         
         return False
     
+    def fill_percent(self):
+        # Share of the interior filled so far, from the incremental counters
+        return self.territory.fill_ratio() * 100
+
+    def level_completed(self):
+        if self.config.WIN_MODE == 'percent':
+            return self.fill_percent() >= self.config.WIN_PERCENT
+        return self.filled_units >= self.config.UNITS_TO_WIN
+
+    def recount_territory(self):
+        # Rebuild the counters and drop the region index after the field was replaced or edited directly
+        self.territory = xonix_field.FillCounter.from_field(self.game_field, self.config.GAME_FIELD_FILLED)
+        self.regions = None
+        self.note_field_replaced()
+
     def handle_level_up(self):
-        if self.filled_units >= self.config.UNITS_TO_WIN:
+        if self.level_completed():
             self.level += 1
             self.filled_units = 0
             
             # Reset for new level
             self.player.reset_position_new_level()
-            self.player.line.clear()
+            self.player.clear_line()
             self.enemies.clear()
             self.initialize_enemies()
             self.initialize_game_field()
@@ -267,10 +448,18 @@ class Player:
         self.start_x = self.x  # Starting x position
         self.start_y = self.y  # Starting y position
         self.line = []  # List to store the line positions
+        self.line_cells = {}  # Line position -> number of times it appears in line, for O(1) lookups
         self.movement_direction = None  # None, 'horizontal', or 'vertical'
         self.moving = False
         self.returned_to_filled_area = False
 
+    def clone(self):
+        player = Player.__new__(Player)
+        player.__dict__.update(self.__dict__)
+        player.line = self.line[:]
+        player.line_cells = dict(self.line_cells)
+        return player
+
     def reset_position_new_level(self):
         self.x = self.config.GAME_AREA_WIDTH // 2
         self.y = self.config.GAME_AREA_HEIGHT - 2 * self.config.UNIT_SIZE
@@ -332,6 +521,22 @@ class Player:
                (self.movement_direction == 'vertical' and abs(new_y - self.start_y) >= self.config.UNIT_SIZE):
                 self.movement_direction = None
 
+    def add_line_position(self, position):
+        self.line.append(position)
+        self.line_cells[position] = self.line_cells.get(position, 0) + 1
+
+    def clear_line(self):
+        self.line.clear()
+        self.line_cells.clear()
+
+    def line_hits_before_end(self, grid_x, grid_y):
+        # Same as checking (grid_x, grid_y) against line[:-1], without the scan
+        position = (grid_x, grid_y)
+        count = self.line_cells.get(position, 0)
+        if count and self.line[-1] == position:
+            count -= 1
+        return count > 0
+
     def needs_snapping(self):
         # Check if the player's position is not on a UNIT_SIZE grid
         off_grid_x = self.x % self.config.UNIT_SIZE != 0
@@ -361,15 +566,14 @@ class Player:
         if game_field[new_y][new_x] == self.config.GAME_FIELD_UNFILLED:  # Check if in unfilled area
             # Add the coordinate to the line based on movement direction
             if self.movement_direction == 'horizontal':
-                self.line.append((new_x, self.y // self.config.UNIT_SIZE))
+                self.add_line_position((new_x, self.y // self.config.UNIT_SIZE))
             elif self.movement_direction == 'vertical':
-                self.line.append((self.x // self.config.UNIT_SIZE, new_y))
+                self.add_line_position((self.x // self.config.UNIT_SIZE, new_y))
         else:
             # Player returns to a filled area, check if the line is not empty
             if self.line:
-                # Iterate through the line positions and mark them as filled
-                for (lx, ly) in self.line:
-                    game_field[ly][lx] = self.config.GAME_FIELD_FILLED
+                # Mark the line positions filled; line_cells holds each of them once
+                game_state.fill_trail(self.line_cells)
                 # Increase the score by the number of items in the line
                 game_state.score += len(self.line)
                 game_state.filled_units += len(self.line) 
@@ -379,13 +583,13 @@ class Player:
             self.start_y = new_y * self.config.UNIT_SIZE
 
 class Enemy:
-    def __init__(self, x, y, type, config):
+    def __init__(self, x, y, type, config, rng=random):
         self.config = config
         self.x = x - (x % config.UNIT_SIZE)  # Align to the nearest grid position on the left
         self.y = y - (y % config.UNIT_SIZE)  # Align to the nearest grid position on the top
         self.type = type
-        self.dx = config.ENEMY_SPEED if random.random() < 0.5 else -config.ENEMY_SPEED
-        self.dy = config.ENEMY_SPEED if random.random() < 0.5 else -config.ENEMY_SPEED
+        self.dx = config.ENEMY_SPEED if rng.random() < 0.5 else -config.ENEMY_SPEED
+        self.dy = config.ENEMY_SPEED if rng.random() < 0.5 else -config.ENEMY_SPEED
 
     def move(self, game_field):
         new_x = self.x + self.dx
@@ -2,17 +2,12 @@
 
 import pygame
 import sys
-import subprocess
-
-# Initialize Pygame
-pygame.init()
-pygame.font.init()
+import xonix_logic
+import xonix_gui
 
 # Screen settings
 SCREEN_WIDTH = 800
 SCREEN_HEIGHT = 600
-screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-pygame.display.set_caption("Xonix Game - Main Menu")
 
 # Colors
 BLACK = (0, 0, 0)
@@ -22,10 +17,21 @@ BLUE = (64, 164, 223)
 GREEN = (34, 139, 34)
 HIGHLIGHT_COLOR = (255, 165, 0)
 
-# Font setup
-title_font = pygame.font.SysFont(None, 80)
-button_font = pygame.font.SysFont(None, 40)
-info_font = pygame.font.SysFont(None, 30)
+# Window and fonts are created by setup_menu(), so importing this module has no side effects
+screen = None
+title_font = None
+button_font = None
+info_font = None
+
+def setup_menu():
+    global screen, title_font, button_font, info_font
+    pygame.init()
+    pygame.font.init()
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    pygame.display.set_caption("Xonix Game - Main Menu")
+    title_font = pygame.font.SysFont(None, 80)
+    button_font = pygame.font.SysFont(None, 40)
+    info_font = pygame.font.SysFont(None, 30)
 
 # Button class for menu options
 class Button:
@@ -94,41 +100,18 @@ def set_game_option(option, value):
     return None
 
 def start_game():
-    # Update the game_mode in xonix_gui.py
-    update_game_mode_in_file()
-    
-    # Launch the game
+    # Run the game in this process; the window, fonts and loaded assets are reused
     try:
-        pygame.quit()  # Close the menu window
-        subprocess.run(["python", "xonix_gui.py"])
-        pygame.init()  # Reinitialize pygame when returning to menu
-        pygame.font.init()
-        pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+        xonix_gui.run_game(xonix_logic.GameConfig(game_options['view'], game_options['size']))
     except Exception as e:
         print(f"Error launching game: {e}")
+    
+    # Back to the menu
+    global screen
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    pygame.display.set_caption("Xonix Game - Main Menu")
     return None
 
-def update_game_mode_in_file():
-    try:
-        # Read the xonix_gui.py file
-        with open("xonix_gui.py", "r") as file:
-            content = file.readlines()
-        
-        # Find the GAME_MODE definition and update it
-        for i, line in enumerate(content):
-            if "GAME_MODE = {" in line:
-                # Update the view and size settings
-                content[i+1] = f"    'view': '{game_options['view']}',  # 'classic' or 'modern'\n"
-                content[i+2] = f"    'size': '{game_options['size']}'    # 'small' or 'big'\n"
-                break
-        
-        # Write the updated content back to the file
-        with open("xonix_gui.py", "w") as file:
-            file.writelines(content)
-            
-    except Exception as e:
-        print(f"Error updating game mode: {e}")
-
 def draw_title():
     title_surf = title_font.render("XONIX", True, WHITE)
     subtitle_surf = button_font.render("Choose Your Game Options", True, BLUE)
@@ -167,6 +150,7 @@ def draw_instructions():
         screen.blit(text_surf, (20, start_y + i * 25))
 
 def main_menu():
+    setup_menu()
     buttons = create_buttons()
     running = True
     
@@ -0,0 +1,182 @@
+# xonix_net.py - Wire format for networked Xonix
+#
+# Every message is a frame: a little-endian u32 length, a one-byte message
+# type and the payload. The server sends WELCOME once, FULL whenever clients
+# need the whole state (joining, new level, new match) and a DELTA every tick.
+# A delta holds only field cells that changed, as horizontal runs, the cells
+# each trail gained since the previous tick and every entity's grid cell, so
+# its size follows what happened in the tick rather than the size of the map.
+# A client whose state no longer fits the deltas sends RESYNC and waits for
+# the FULL the server answers with.
+
+import socket
+import struct
+import zlib
+
+MSG_WELCOME = ord('W')  # Server -> client: your player index and the player count
+MSG_FULL = ord('F')  # Server -> client: snapshot plus every player's state
+MSG_DELTA = ord('D')  # Server -> client: changes of one tick
+MSG_INPUT = ord('I')  # Client -> server: packed key state, sent when it changes
+MSG_RESYNC = ord('R')  # Client -> server: local state is out of step, send a FULL
+
+FRAME = struct.Struct('<I')
+MAX_FRAME_SIZE = 64 * 1024 * 1024
+
+WELCOME = struct.Struct('<BB')
+# tick, level, snapshot length
+FULL_HEADER = struct.Struct('<IHI')
+# tick, level, run count, player count, enemy count
+DELTA_HEADER = struct.Struct('<IHIBH')
+# y, x, length, value
+RUN = struct.Struct('<HHHB')
+# cell x, cell y, lives, score, trail reset, trail cells that follow
+PLAYER = struct.Struct('<HHBIBH')
+CELL = struct.Struct('<HH')
+
+def frame(message_type, payload=b''):
+    return FRAME.pack(len(payload) + 1) + bytes([message_type]) + payload
+
+class FrameBuffer:
+    # Reassembles frames from a byte stream that may split or join them arbitrarily
+    def __init__(self):
+        self.data = bytearray()
+
+    def feed(self, data):
+        # Returns the (message type, payload) of every frame completed by data
+        self.data += data
+        messages = []
+        offset = 0
+        while len(self.data) - offset >= FRAME.size:
+            length, = FRAME.unpack_from(self.data, offset)
+            if not 0 < length <= MAX_FRAME_SIZE:
+                raise ValueError(f"Bad frame length {length}")
+            end = offset + FRAME.size + length
+            if end > len(self.data):
+                break
+            messages.append((self.data[offset + FRAME.size], bytes(self.data[offset + FRAME.size + 1:end])))
+            offset = end
+        del self.data[:offset]
+        return messages
+
+def cell_runs(changes, read_value):
+    # Merge changed (y, x) cells into (y, x, length, value) runs along rows
+    runs = []
+    for y, x in sorted(changes):
+        value = read_value(y, x)
+        if runs:
+            run_y, run_x, length, run_value = runs[-1]
+            if run_y == y and run_x + length == x and run_value == value:
+                runs[-1] = (run_y, run_x, length + 1, value)
+                continue
+        runs.append((y, x, 1, value))
+    return runs
+
+def encode_players(players):
+    # players: (cell x, cell y, lives, score, trail reset, trail cells) per player
+    parts = []
+    for cell_x, cell_y, lives, score, reset, cells in players:
+        parts.append(PLAYER.pack(cell_x, cell_y, lives, score, reset, len(cells)))
+        parts.extend(CELL.pack(x, y) for x, y in cells)
+    return b''.join(parts)
+
+def decode_players(payload, offset, count):
+    players = []
+    for _ in range(count):
+        cell_x, cell_y, lives, score, reset, cell_count = PLAYER.unpack_from(payload, offset)
+        offset += PLAYER.size
+        cells = [CELL.unpack_from(payload, offset + index * CELL.size) for index in range(cell_count)]
+        offset += cell_count * CELL.size
+        players.append((cell_x, cell_y, lives, score, bool(reset), cells))
+    return players, offset
+
+def encode_welcome(player_index, player_count):
+    return frame(MSG_WELCOME, WELCOME.pack(player_index, player_count))
+
+def decode_welcome(payload):
+    return WELCOME.unpack(payload)
+
+def encode_full(tick, level, snapshot, players):
+    # Full states are rare and mostly repetitive, so they are compressed
+    body = FULL_HEADER.pack(tick, level, len(snapshot)) + snapshot + bytes([len(players)]) + encode_players(players)
+    return frame(MSG_FULL, zlib.compress(body, 6))
+
+def decode_full(payload):
+    # Returns (tick, level, snapshot bytes, players)
+    body = zlib.decompress(payload)
+    tick, level, snapshot_length = FULL_HEADER.unpack_from(body)
+    offset = FULL_HEADER.size
+    snapshot = body[offset:offset + snapshot_length]
+    offset += snapshot_length
+    players, _ = decode_players(body, offset + 1, body[offset])
+    return tick, level, snapshot, players
+
+def encode_delta(tick, level, runs, players, enemy_cells):
+    parts = [DELTA_HEADER.pack(tick, level, len(runs), len(players), len(enemy_cells))]
+    parts.extend(RUN.pack(*run) for run in runs)
+    parts.append(encode_players(players))
+    parts.extend(CELL.pack(x, y) for x, y in enemy_cells)
+    return frame(MSG_DELTA, b''.join(parts))
+
+def decode_delta(payload):
+    # Returns (tick, level, runs, players, enemy cells)
+    tick, level, run_count, player_count, enemy_count = DELTA_HEADER.unpack_from(payload)
+    offset = DELTA_HEADER.size
+    runs = [RUN.unpack_from(payload, offset + index * RUN.size) for index in range(run_count)]
+    offset += run_count * RUN.size
+    players, offset = decode_players(payload, offset, player_count)
+    enemy_cells = [CELL.unpack_from(payload, offset + index * CELL.size) for index in range(enemy_count)]
+    return tick, level, runs, players, enemy_cells
+
+def encode_input(packed_keys):
+    return frame(MSG_INPUT, bytes([packed_keys]))
+
+def encode_resync():
+    return frame(MSG_RESYNC)
+
+class Connection:
+    # Client side of a server connection, polled once per frame by the game loop
+    def __init__(self, host, port, timeout=5.0):
+        self.socket = socket.create_connection((host, port), timeout)
+        self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.buffer = FrameBuffer()
+        self.pending = []
+        self.closed = False
+
+    def wait_for(self, message_type):
+        # Block until a message of message_type arrives; others stay queued for receive()
+        while True:
+            for index, (queued_type, payload) in enumerate(self.pending):
+                if queued_type == message_type:
+                    del self.pending[index]
+                    return payload
+            data = self.socket.recv(65536)
+            if not data:
+                raise ConnectionError("Server closed the connection")
+            self.pending.extend(self.buffer.feed(data))
+
+    def start_polling(self):
+        self.socket.setblocking(False)
+
+    def send(self, data):
+        self.socket.sendall(data)
+
+    def receive(self):
+        # Every message that has arrived since the last call, without blocking
+        messages, self.pending = self.pending, []
+        while not self.closed:
+            try:
+                data = self.socket.recv(65536)
+            except BlockingIOError:
+                break
+            except OSError:
+                self.closed = True
+                break
+            if not data:
+                self.closed = True
+                break
+            messages.extend(self.buffer.feed(data))
+        return messages
+
+    def close(self):
+        self.socket.close()
+        self.closed = True
@@ -0,0 +1,91 @@
+# xonix_profiler.py - Per-phase frame timing for the Xonix game loop
+#
+# The loop calls begin_frame() once per frame, mark(phase) after each phase
+# (the time since the previous mark is charged to that phase) and end_frame()
+# after presenting. The last few hundred frames are kept for percentiles and
+# every frame can also be streamed to a CSV or JSON-lines file.
+
+import csv
+import json
+import time
+from collections import deque
+
+PHASES = ('input', 'movement', 'collisions', 'area_filling', 'draw', 'hud', 'present', 'other')
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+class FrameProfiler:
+    def __init__(self, history=240, output_path=None):
+        self.frames = deque(maxlen=history)  # (total, {phase: seconds}) per frame
+        self.frame_count = 0
+        self.current = None
+        self.frame_start = 0.0
+        self.last_mark = 0.0
+        self.output = None
+        self.writer = None
+        if output_path:
+            self.open_output(output_path)
+
+    def open_output(self, path):
+        # JSON lines for .jsonl/.json paths, CSV otherwise
+        self.output = open(path, 'w', newline='')
+        if path.endswith(('.jsonl', '.json')):
+            self.writer = None
+        else:
+            self.writer = csv.writer(self.output)
+            self.writer.writerow(['frame', 'timestamp', 'total_ms'] + [f'{phase}_ms' for phase in PHASES])
+
+    def begin_frame(self):
+        self.current = dict.fromkeys(PHASES, 0.0)
+        self.frame_start = self.last_mark = time.perf_counter()
+
+    def mark(self, phase):
+        now = time.perf_counter()
+        self.current[phase] += now - self.last_mark
+        self.last_mark = now
+
+    def end_frame(self):
+        # Returns the finished frame as (total, phases)
+        phases = self.current
+        total = time.perf_counter() - self.frame_start
+        phases['other'] += total - sum(phases.values())
+        frame = (total, phases)
+        self.frames.append(frame)
+        self.frame_count += 1
+        if self.output:
+            self.write(frame)
+        return frame
+
+    def write(self, frame):
+        total, phases = frame
+        if self.writer:
+            self.writer.writerow([self.frame_count, f'{time.time():.3f}', f'{total * 1000:.3f}'] +
+                                 [f'{phases[phase] * 1000:.3f}' for phase in PHASES])
+        else:
+            record = {'frame': self.frame_count, 'timestamp': round(time.time(), 3), 'total_ms': round(total * 1000, 3)}
+            record.update((f'{phase}_ms', round(phases[phase] * 1000, 3)) for phase in PHASES)
+            self.output.write(json.dumps(record) + '\n')
+
+    def summary(self):
+        # Frame time percentiles and the phase with the highest p95, in milliseconds
+        totals = sorted(total for total, _ in self.frames)
+        phase_p95 = {phase: percentile(sorted(phases[phase] for _, phases in self.frames), 0.95) * 1000
+                     for phase in PHASES}
+        return {
+            'frames': len(totals),
+            'p50_ms': percentile(totals, 0.50) * 1000,
+            'p95_ms': percentile(totals, 0.95) * 1000,
+            'p99_ms': percentile(totals, 0.99) * 1000,
+            'max_ms': (totals[-1] if totals else 0.0) * 1000,
+            'phase_p95_ms': phase_p95,
+            'slowest_phase': max(phase_p95, key=phase_p95.get) if totals else None,
+        }
+
+    def close(self):
+        if self.output:
+            self.output.close()
+            self.output = None
+            self.writer = None
@@ -0,0 +1,192 @@
+# xonix_replay.py - Deterministic seeded replays for Xonix
+#
+# A replay is the seed, the game config and one byte of key state per tick,
+# so a session of several minutes fits in a few KB. Because all randomness
+# comes from GameState.rng, replaying the keys from the same seed reproduces
+# the run exactly, either in the GUI at normal speed or headless to any tick.
+#
+#   python xonix_replay.py record session.xrp --view modern --size big --seed 7
+#   python xonix_replay.py play session.xrp
+#   python xonix_replay.py seek session.xrp --tick 5000
+
+import argparse
+import ast
+import struct
+import zlib
+import xonix_logic
+import xonix_headless
+
+MAGIC = b'XNXR'
+FORMAT_VERSION = 2
+
+# Bit per key, in the (LEFT, RIGHT, UP, DOWN) order of handle_player_movement
+KEY_BITS = (1, 2, 4, 8)
+
+# magic, version, seed, width, height, unit size, tick count, view length, size length, settings length
+HEADER = struct.Struct('<4sBqHHHIBBH')
+
+PRESET_SIZES = ('small', 'big')
+
+def pack_keys(keys_pressed):
+    packed = 0
+    for bit, pressed in zip(KEY_BITS, keys_pressed):
+        if pressed:
+            packed |= bit
+    return packed
+
+def unpack_keys(packed):
+    return tuple(bool(packed & bit) for bit in KEY_BITS)
+
+def config_from_header(view, size, width, height, unit_size, settings=None):
+    # Preset sizes are rebuilt from their name; custom maps need the dimensions.
+    # settings holds the recorded settings that differ from that starting point.
+    if size in PRESET_SIZES:
+        config = xonix_logic.GameConfig(view, size)
+        layout = (config.GAME_LOGIC_AREA_WIDTH, config.GAME_LOGIC_AREA_HEIGHT, config.UNIT_SIZE)
+        if layout != (width, height, unit_size):
+            config.apply_settings(dict(zip(xonix_logic.LAYOUT_SETTINGS, (width, height, unit_size))))
+    else:
+        config = xonix_logic.GameConfig(view, size, width, height, unit_size)
+    if settings:
+        config.apply_settings(settings)
+    return config
+
+def changed_settings(config):
+    # Recorded settings of config that differ from the config its header alone would rebuild
+    base = config_from_header(config.view, config.size, config.GAME_LOGIC_AREA_WIDTH,
+                              config.GAME_LOGIC_AREA_HEIGHT, config.UNIT_SIZE)
+    return {name: getattr(config, name) for name in xonix_logic.RECORDED_SETTINGS
+            if getattr(config, name) != getattr(base, name)}
+
+def encode_settings(config):
+    # A Python literal dict, so any setting type round-trips without a schema
+    return repr(changed_settings(config)).encode('ascii')
+
+def decode_settings(data):
+    settings = ast.literal_eval(data.decode('ascii'))
+    if not isinstance(settings, dict):
+        raise ValueError("Bad settings block")
+    return settings
+
+class Replay:
+    def __init__(self, config, seed, key_log=None):
+        self.config = config
+        self.seed = seed
+        self.key_log = bytearray(key_log or b'')
+
+    def __len__(self):
+        return len(self.key_log)
+
+    def keys(self, start=0, stop=None):
+        # keys_pressed tuples for ticks [start, stop)
+        for packed in self.key_log[start:stop]:
+            yield unpack_keys(packed)
+
+    def input_source(self):
+        # A callable for xonix_gui.main that returns None once the log runs out
+        keys = self.keys()
+        return lambda: next(keys, None)
+
+    def to_bytes(self):
+        view = self.config.view.encode('ascii')
+        size = self.config.size.encode('ascii')
+        settings = encode_settings(self.config)
+        header = HEADER.pack(MAGIC, FORMAT_VERSION, self.seed or 0,
+                             self.config.GAME_LOGIC_AREA_WIDTH, self.config.GAME_LOGIC_AREA_HEIGHT,
+                             self.config.UNIT_SIZE, len(self.key_log), len(view), len(size), len(settings))
+        # Held keys produce long runs of identical bytes, which compress very well
+        return header + view + size + settings + zlib.compress(bytes(self.key_log), 9)
+
+    @classmethod
+    def from_bytes(cls, data):
+        magic, version = data[:4], data[4] if len(data) > 4 else None
+        if magic != MAGIC:
+            raise ValueError("Not a Xonix replay")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported replay version {version}")
+        (_, _, seed, width, height, unit_size, ticks, view_length, size_length,
+         settings_length) = HEADER.unpack_from(data)
+
+        offset = HEADER.size
+        view = data[offset:offset + view_length].decode('ascii')
+        offset += view_length
+        size = data[offset:offset + size_length].decode('ascii')
+        offset += size_length
+        settings = decode_settings(data[offset:offset + settings_length])
+        offset += settings_length
+
+        key_log = zlib.decompress(data[offset:])
+        if len(key_log) != ticks:
+            raise ValueError("Replay is truncated")
+        return cls(config_from_header(view, size, width, height, unit_size, settings), seed, key_log)
+
+    def save(self, path):
+        with open(path, 'wb') as file:
+            file.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as file:
+            return cls.from_bytes(file.read())
+
+class ReplayRecorder:
+    # Collects one packed byte per simulated tick
+    def __init__(self, config, seed):
+        if seed is None:
+            raise ValueError("Recording a replay needs a seed")
+        self.replay = Replay(config, seed)
+
+    def record(self, keys_pressed):
+        self.replay.key_log.append(pack_keys(keys_pressed))
+
+    def save(self, path):
+        self.replay.save(path)
+
+def fast_forward(replay, tick=None):
+    # Headless playback up to tick (or the end); returns the engine in that state
+    engine = xonix_headless.HeadlessEngine(replay.config, replay.seed)
+    engine.run(replay.keys(0, tick))
+    return engine
+
+def play(replay):
+    # Watch a replay in the GUI at normal speed
+    import xonix_gui
+    xonix_gui.run_game(replay.config, replay.seed, input_source=replay.input_source())
+
+def record(config, seed, path):
+    # Play a normal game in the GUI and save its replay when the window closes
+    import xonix_gui
+    recorder = ReplayRecorder(config, seed)
+    xonix_gui.run_game(config, seed, recorder=recorder)
+    recorder.save(path)
+    print(f"Saved {len(recorder.replay)} ticks to {path}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Record, watch and seek Xonix replays")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    record_parser = commands.add_parser('record', help="play and record a game")
+    record_parser.add_argument('path')
+    record_parser.add_argument('--view', choices=['classic', 'modern'], default='modern')
+    record_parser.add_argument('--size', choices=list(PRESET_SIZES), default='small')
+    record_parser.add_argument('--seed', type=int, default=0)
+
+    play_parser = commands.add_parser('play', help="watch a replay at normal speed")
+    play_parser.add_argument('path')
+
+    seek_parser = commands.add_parser('seek', help="fast-forward headless to a tick")
+    seek_parser.add_argument('path')
+    seek_parser.add_argument('--tick', type=int)
+
+    args = parser.parse_args()
+    if args.command == 'record':
+        record(xonix_logic.GameConfig(args.view, args.size), args.seed, args.path)
+    elif args.command == 'play':
+        play(Replay.load(args.path))
+    else:
+        engine = fast_forward(Replay.load(args.path), args.tick)
+        for name, value in engine.summary().items():
+            print(f'{name}: {value}')
+
+if __name__ == "__main__":
+    main()
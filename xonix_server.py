@@ -0,0 +1,291 @@
+# xonix_server.py - Authoritative two-player Xonix server
+#
+# The server owns one GameState and moves one Player per connection, using
+# the keys each client last sent. Every tick it broadcasts a delta built from
+# the game state's write journal, so the work per tick follows the cells that
+# actually changed, not how much of the map is already filled.
+#
+#   python xonix_server.py serve --size big --port 7777
+#   python xonix_server.py join --host 127.0.0.1 --port 7777 --view modern
+
+import argparse
+import asyncio
+import time
+import xonix_logic
+import xonix_net
+import xonix_replay
+import xonix_snapshot
+
+MAX_PLAYERS = 2
+START_LIVES = 5
+DEFAULT_PORT = 7777
+
+# Clients that fall this far behind on reading are dropped instead of buffering forever
+MAX_WRITE_BUFFER = 1024 * 1024
+
+class MultiplayerGame:
+    # Head-to-head rules on a shared field. Each player has their own lives and score.
+    # Crossing the other player's trail cuts it, which costs that player a life.
+    def __init__(self, config, seed=None, player_count=MAX_PLAYERS):
+        self.config = config
+        self.state = xonix_logic.GameState(config, seed)
+        self.player_count = player_count
+        self.keys = [xonix_replay.unpack_keys(0)] * player_count
+        self.tick_count = 0
+        self.new_match()
+
+    def spawn(self, player, index):
+        # Player 0 starts at the bottom border, player 1 at the top
+        player.reset_position_new_level()
+        if index % 2 == 1:
+            player.y = self.config.UNIT_SIZE
+            player.start_y = player.y
+
+    def new_match(self):
+        state = self.state
+        state.level = 1
+        state.score = 0
+        state.filled_units = 0
+        self.players = [xonix_logic.Player(self.config) for _ in range(self.player_count)]
+        for index, player in enumerate(self.players):
+            self.spawn(player, index)
+        self.lives = [START_LIVES] * self.player_count
+        self.scores = [0] * self.player_count
+        state.player = self.players[0]
+        state.initialize_enemies()
+        self.reset_field()
+
+    def next_level(self):
+        state = self.state
+        state.level += 1
+        state.filled_units = 0
+        for index, player in enumerate(self.players):
+            player.clear_line()
+            self.spawn(player, index)
+        state.initialize_enemies()
+        self.reset_field()
+
+    def reset_field(self):
+        self.state.initialize_game_field()
+        # The first take after this reports a replaced field, so clients get a full state
+        self.state.track_field_changes()
+        self.sent_lines = [0] * self.player_count
+
+    def lose_life(self, index):
+        player = self.players[index]
+        self.lives[index] -= 1
+        player.clear_line()
+        player.reset_position()
+
+    def check_collisions(self, index, enemy_cells):
+        # Same hits as GameState.handle_collisions, plus cutting the other players' trails
+        state = self.state
+        player = self.players[index]
+        unit = self.config.UNIT_SIZE
+        cell = (player.x // unit, player.y // unit)
+        on_unfilled = state.game_field[cell[1]][cell[0]] == self.config.GAME_FIELD_UNFILLED
+
+        for enemy_index, (enemy_cell, enemy_type) in enumerate(enemy_cells):
+            if enemy_cell == cell:
+                if enemy_type == 'filled':
+                    # The wolf goes back to the top middle, as in the single-player game
+                    wolf = state.enemies[enemy_index]
+                    wolf.x = self.config.GAME_AREA_WIDTH // 2
+                    wolf.x = wolf.x - (wolf.x % unit)
+                    wolf.y = 0
+                    self.lose_life(index)
+                    return
+                if on_unfilled:
+                    self.lose_life(index)
+                    return
+            elif enemy_type == 'unfilled' and enemy_cell in player.line_cells:
+                self.lose_life(index)
+                return
+
+        if player.line_hits_before_end(*cell):
+            self.lose_life(index)
+            return
+
+        for other_index, other in enumerate(self.players):
+            if other is not player and cell in other.line_cells:
+                self.lose_life(other_index)
+
+    def tick(self):
+        state = self.state
+        unit = self.config.UNIT_SIZE
+
+        for index, player in enumerate(self.players):
+            state.player = player
+            score = state.score
+            state.handle_player_movement(self.keys[index])
+            self.scores[index] += state.score - score
+
+        state.enemies.move_all(state.game_field)
+        enemy_cells = list(zip(state.enemies.cells(), (enemy.type for enemy in state.enemies)))
+        for index in range(self.player_count):
+            self.check_collisions(index, enemy_cells)
+
+        # A player's region is never filled over the other player
+        for index, player in enumerate(self.players):
+            state.player = player
+            score = state.score
+            others = [(other.x // unit, other.y // unit) for other in self.players if other is not player]
+            state.handle_area_filling(others)
+            self.scores[index] += state.score - score
+        state.player = self.players[0]
+
+        if min(self.lives) <= 0:
+            self.new_match()
+        elif state.level_completed():
+            self.next_level()
+        self.tick_count += 1
+
+    def player_states(self, full):
+        # Wire tuples for every player; deltas carry only the trail cells added since the last one
+        unit = self.config.UNIT_SIZE
+        players = []
+        for index, player in enumerate(self.players):
+            line = player.line
+            sent = self.sent_lines[index]
+            if full:
+                reset, cells = True, line
+            elif len(line) < sent:
+                reset, cells = True, line
+            else:
+                reset, cells = False, line[sent:]
+            players.append((player.x // unit, player.y // unit, max(0, self.lives[index]),
+                            self.scores[index], reset, cells))
+        return players
+
+    def full_message(self):
+        snapshot = xonix_snapshot.save_snapshot(self.state)
+        return xonix_net.encode_full(self.tick_count, self.state.level, snapshot, self.player_states(True))
+
+    def tick_message(self):
+        # FULL after a level or match reset, otherwise a DELTA built from the state's field journal
+        field = self.state.game_field
+        changes = self.state.take_field_changes()
+        if changes is None:
+            message = self.full_message()
+        else:
+            runs = xonix_net.cell_runs(changes, lambda y, x: int(field[y][x]))
+            message = xonix_net.encode_delta(self.tick_count, self.state.level, runs,
+                                             self.player_states(False), self.state.enemies.cells())
+        self.sent_lines = [len(player.line) for player in self.players]
+        return message
+
+class GameServer:
+    def __init__(self, config, seed=None, player_count=MAX_PLAYERS, stats_interval=None):
+        self.game = MultiplayerGame(config, seed, player_count)
+        self.writers = [None] * player_count
+        self.stats_interval = stats_interval
+        self.tick_bytes = 0
+        self.tick_seconds = 0.0
+        self.ticks_measured = 0
+
+    async def handle_client(self, reader, writer):
+        if None not in self.writers:
+            writer.close()
+            return
+        index = self.writers.index(None)
+        self.writers[index] = writer
+        writer.write(xonix_net.encode_welcome(index, self.game.player_count))
+        writer.write(self.game.full_message())
+        print(f"Player {index + 1} connected")
+
+        frames = xonix_net.FrameBuffer()
+        try:
+            while True:
+                data = await reader.read(4096)
+                if not data:
+                    break
+                for message_type, payload in frames.feed(data):
+                    if message_type == xonix_net.MSG_INPUT and payload:
+                        self.game.keys[index] = xonix_replay.unpack_keys(payload[0])
+                    elif message_type == xonix_net.MSG_RESYNC:
+                        writer.write(self.game.full_message())
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            # The player stays in the game with no keys held until someone takes the slot
+            self.game.keys[index] = xonix_replay.unpack_keys(0)
+            self.writers[index] = None
+            writer.close()
+            print(f"Player {index + 1} disconnected")
+
+    def broadcast(self, message):
+        for index, writer in enumerate(self.writers):
+            if writer is None:
+                continue
+            if writer.transport.get_write_buffer_size() > MAX_WRITE_BUFFER:
+                writer.close()
+                self.writers[index] = None
+                continue
+            writer.write(message)
+
+    def record_stats(self, message_size, elapsed):
+        self.tick_bytes += message_size
+        self.tick_seconds += elapsed
+        self.ticks_measured += 1
+        if self.stats_interval and self.ticks_measured >= self.stats_interval:
+            game = self.game
+            print(f"tick {game.tick_count}: {self.tick_bytes / self.ticks_measured:.0f} B/tick, "
+                  f"{self.tick_seconds / self.ticks_measured * 1000:.3f} ms/tick, "
+                  f"filled {game.state.fill_percent():.0f}%, lives {game.lives}, scores {game.scores}")
+            self.tick_bytes = 0
+            self.tick_seconds = 0.0
+            self.ticks_measured = 0
+
+    async def run_ticks(self):
+        # Fixed-rate simulation; ticks only run while somebody is connected
+        loop = asyncio.get_running_loop()
+        tick_length = 1.0 / self.game.config.GAME_SPEED_ADJUSTMENT
+        next_tick = loop.time()
+        while True:
+            next_tick += tick_length
+            await asyncio.sleep(max(0.0, next_tick - loop.time()))
+            if not any(self.writers):
+                next_tick = loop.time()
+                continue
+            start_time = time.perf_counter()
+            self.game.tick()
+            message = self.game.tick_message()
+            self.broadcast(message)
+            self.record_stats(len(message), time.perf_counter() - start_time)
+
+    async def serve(self, host, port):
+        server = await asyncio.start_server(self.handle_client, host, port)
+        print(f"Xonix server on {host}:{port}, waiting for {self.game.player_count} players")
+        async with server:
+            await asyncio.gather(server.serve_forever(), self.run_ticks())
+
+def main():
+    parser = argparse.ArgumentParser(description="Two-player networked Xonix")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    serve_parser = commands.add_parser('serve', help="run the authoritative server")
+    serve_parser.add_argument('--host', default='127.0.0.1')
+    serve_parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    serve_parser.add_argument('--size', choices=['small', 'big'], default='big')
+    serve_parser.add_argument('--players', type=int, choices=[1, 2], default=MAX_PLAYERS)
+    serve_parser.add_argument('--seed', type=int)
+    serve_parser.add_argument('--stats', type=int, metavar='TICKS', help="print bandwidth and CPU per tick every TICKS ticks")
+
+    join_parser = commands.add_parser('join', help="play on a server")
+    join_parser.add_argument('--host', default='127.0.0.1')
+    join_parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    join_parser.add_argument('--view', choices=['classic', 'modern'], default='modern')
+
+    args = parser.parse_args()
+    if args.command == 'serve':
+        server = GameServer(xonix_logic.GameConfig('classic', args.size), args.seed, args.players, args.stats)
+        try:
+            asyncio.run(server.serve(args.host, args.port))
+        except KeyboardInterrupt:
+            pass
+    else:
+        import xonix_gui
+        xonix_gui.run_network_game(args.host, args.port, args.view)
+
+if __name__ == "__main__":
+    main()
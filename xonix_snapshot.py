@@ -0,0 +1,255 @@
+# xonix_snapshot.py - Compact binary save/restore of a whole GameState
+#
+# A snapshot holds everything needed to resume a game exactly: counters, the
+# RNG state, the game field (one bit per cell while it only holds filled and
+# unfilled cells), the player with its trail and every enemy. On the big grid
+# it is a few KB and restores in well under a millisecond.
+
+import random
+import struct
+import xonix_logic
+import xonix_field
+import xonix_enemies
+import xonix_replay
+
+MAGIC = b'XNXS'
+FORMAT_VERSION = 2
+
+# magic, version, width, height, unit size, view length, size length, settings length
+HEADER = struct.Struct('<4sBHHHBBH')
+# lives, score, filled units, level, dx, dy, has seed, seed
+COUNTERS = struct.Struct('<iqiiiiBq')
+# gauss_next present, gauss_next
+RNG_FLAGS = struct.Struct('<Bd')
+RNG_WORDS = struct.Struct('<625I')
+# x, y, start x, start y, movement direction, moving, returned to filled area, line length
+PLAYER = struct.Struct('<iiiiBBBI')
+LINE_POSITION = struct.Struct('<II')
+# x, y, dx, dy, type
+ENEMY = struct.Struct('<iiiiB')
+COUNT = struct.Struct('<I')
+
+# Field encodings
+FIELD_BITS = 0  # One bit per cell: unfilled or filled
+FIELD_BYTES = 1  # One byte per cell, for fields holding any other value
+FIELD_CHUNKS = 2  # Allocated ChunkedField tiles only
+
+DIRECTIONS = [None, 'horizontal', 'vertical']
+ENEMY_TYPES = ['filled', 'unfilled']
+
+# Enemies draw their initial velocity in the constructor; restored ones use a
+# throwaway generator so loading never disturbs any real random sequence
+_RESTORE_RNG = random.Random(0)
+
+def _pack_bits(values):
+    packed = bytearray((len(values) + 7) // 8)
+    for index, value in enumerate(values):
+        if value:
+            packed[index >> 3] |= 0x80 >> (index & 7)
+    return bytes(packed)
+
+def _unpack_bits(packed, count):
+    return [(packed[index >> 3] >> (7 - (index & 7))) & 1 for index in range(count)]
+
+def _encode_field(game_field, config):
+    if xonix_field.is_chunked_field(game_field):
+        parts = [struct.pack('<BI', FIELD_CHUNKS, len(game_field.chunks))]
+        for (chunk_y, chunk_x), chunk in game_field.chunks.items():
+            parts.append(struct.pack('<II', chunk_y, chunk_x))
+            parts.append(bytes(chunk))
+        return b''.join(parts)
+
+    binary = config.GAME_FIELD_UNFILLED == 0 and config.GAME_FIELD_FILLED == 1
+    if xonix_field.is_array_field(game_field):
+        if binary and int(game_field.max()) <= 1:
+            payload = xonix_field.np.packbits(game_field, axis=None).tobytes()
+            return struct.pack('<BI', FIELD_BITS, len(payload)) + payload
+        payload = game_field.tobytes()
+        return struct.pack('<BI', FIELD_BYTES, len(payload)) + payload
+
+    values = [cell for row in game_field for cell in row]
+    if binary and max(values) <= 1:
+        payload = _pack_bits(values)
+        return struct.pack('<BI', FIELD_BITS, len(payload)) + payload
+    payload = bytes(values)
+    return struct.pack('<BI', FIELD_BYTES, len(payload)) + payload
+
+def _decode_field(data, offset, config):
+    encoding, length = struct.unpack_from('<BI', data, offset)
+    offset += 5
+    width = config.GAME_LOGIC_AREA_WIDTH
+    height = config.GAME_LOGIC_AREA_HEIGHT
+
+    if encoding == FIELD_CHUNKS:
+        game_field = xonix_field.ChunkedField(width, height, config.GAME_FIELD_UNFILLED, config.GAME_FIELD_FILLED)
+        chunk_bytes = game_field.chunk_size * game_field.chunk_size
+        for _ in range(length):
+            chunk_y, chunk_x = struct.unpack_from('<II', data, offset)
+            offset += 8
+            game_field.chunks[(chunk_y, chunk_x)] = bytearray(data[offset:offset + chunk_bytes])
+            offset += chunk_bytes
+        if config.FIELD_BACKEND == 'chunked':
+            return game_field, offset
+        # A sparse snapshot loaded into a dense backend goes through plain rows
+        return _field_from_rows([list(row) for row in game_field], config), offset
+
+    payload = data[offset:offset + length]
+    offset += length
+    if config.FIELD_BACKEND == 'numpy' and xonix_field.numpy_available():
+        np = xonix_field.np
+        if encoding == FIELD_BITS:
+            cells = np.unpackbits(np.frombuffer(payload, dtype=np.uint8), count=width * height)
+        else:
+            cells = np.frombuffer(payload, dtype=np.uint8).copy()
+        return cells.reshape((height, width)), offset
+
+    if encoding == FIELD_BITS:
+        values = _unpack_bits(payload, width * height)
+    else:
+        values = list(payload)
+    rows = [values[y * width:(y + 1) * width] for y in range(height)]
+    return _field_from_rows(rows, config), offset
+
+def _field_from_rows(rows, config):
+    # Plain rows of cell values as a field of the config's backend
+    width = config.GAME_LOGIC_AREA_WIDTH
+    height = config.GAME_LOGIC_AREA_HEIGHT
+    if config.FIELD_BACKEND == 'numpy' and xonix_field.numpy_available():
+        return xonix_field.np.array(rows, dtype=xonix_field.np.uint8)
+    if config.FIELD_BACKEND == 'bitboard':
+        return xonix_field.BitboardField.from_rows(rows, config.GAME_FIELD_UNFILLED, config.GAME_FIELD_FILLED)
+    if config.FIELD_BACKEND == 'chunked':
+        # A dense snapshot loaded into a sparse field only allocates the tiles that differ
+        game_field = xonix_field.ChunkedField(width, height, config.GAME_FIELD_UNFILLED, config.GAME_FIELD_FILLED)
+        for y, row in enumerate(rows):
+            for x, value in enumerate(row):
+                if value != game_field.default_value(y, x):
+                    game_field.set(y, x, value)
+        return game_field
+    return rows
+
+def save_snapshot(game_state):
+    config = game_state.config
+    view = config.view.encode('ascii')
+    size = config.size.encode('ascii')
+    settings = xonix_replay.encode_settings(config)
+    parts = [
+        HEADER.pack(MAGIC, FORMAT_VERSION, config.GAME_LOGIC_AREA_WIDTH, config.GAME_LOGIC_AREA_HEIGHT,
+                    config.UNIT_SIZE, len(view), len(size), len(settings)),
+        view,
+        size,
+        settings,
+        COUNTERS.pack(game_state.lives, game_state.score, game_state.filled_units, game_state.level,
+                      game_state.dx, game_state.dy, game_state.seed is not None, game_state.seed or 0),
+    ]
+
+    # The Mersenne Twister state keeps the restored game on the same random sequence
+    _, words, gauss_next = game_state.rng.getstate()
+    parts.append(RNG_FLAGS.pack(gauss_next is not None, gauss_next or 0.0))
+    parts.append(RNG_WORDS.pack(*words))
+
+    parts.append(_encode_field(game_state.game_field, config))
+
+    player = game_state.player
+    parts.append(PLAYER.pack(player.x, player.y, player.start_x, player.start_y,
+                             DIRECTIONS.index(player.movement_direction), player.moving,
+                             player.returned_to_filled_area, len(player.line)))
+    parts.extend(LINE_POSITION.pack(x, y) for x, y in player.line)
+
+    parts.append(COUNT.pack(len(game_state.enemies)))
+    parts.extend(ENEMY.pack(enemy.x, enemy.y, enemy.dx, enemy.dy, ENEMY_TYPES.index(enemy.type))
+                 for enemy in game_state.enemies)
+    return b''.join(parts)
+
+def _read_header(data):
+    # (config the snapshot was taken with, offset past the header)
+    magic, version = data[:4], data[4] if len(data) > 4 else None
+    if magic != MAGIC:
+        raise ValueError("Not a Xonix snapshot")
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Unsupported snapshot version {version}")
+    _, _, width, height, unit_size, view_length, size_length, settings_length = HEADER.unpack_from(data)
+
+    offset = HEADER.size
+    view = data[offset:offset + view_length].decode('ascii')
+    offset += view_length
+    size = data[offset:offset + size_length].decode('ascii')
+    offset += size_length
+    settings = xonix_replay.decode_settings(data[offset:offset + settings_length])
+    offset += settings_length
+    return xonix_replay.config_from_header(view, size, width, height, unit_size, settings), offset
+
+def snapshot_config(data):
+    # A fresh GameConfig matching the snapshot, to adjust before calling load_snapshot
+    return _read_header(data)[0]
+
+def _check_config(config, stored):
+    # The view, field backend and game speed may differ; layout and rules must not
+    names = xonix_logic.LAYOUT_SETTINGS + xonix_logic.RULE_SETTINGS
+    different = [name for name in names if getattr(config, name) != getattr(stored, name)]
+    if different:
+        raise ValueError(f"Snapshot does not match the given config: {', '.join(different)} differ")
+
+def load_snapshot(data, config=None):
+    # Rebuild a GameState; config defaults to the one the snapshot was taken with
+    stored, offset = _read_header(data)
+    if config is None:
+        config = stored
+    else:
+        _check_config(config, stored)
+
+    lives, score, filled_units, level, dx, dy, has_seed, seed = COUNTERS.unpack_from(data, offset)
+    offset += COUNTERS.size
+
+    game_state = xonix_logic.GameState(config, seed if has_seed else None)
+    game_state.lives = lives
+    game_state.score = score
+    game_state.filled_units = filled_units
+    game_state.level = level
+    game_state.dx = dx
+    game_state.dy = dy
+
+    has_gauss, gauss_next = RNG_FLAGS.unpack_from(data, offset)
+    offset += RNG_FLAGS.size
+    words = RNG_WORDS.unpack_from(data, offset)
+    offset += RNG_WORDS.size
+    game_state.rng.setstate((3, words, gauss_next if has_gauss else None))
+
+    game_state.game_field, offset = _decode_field(data, offset, config)
+    game_state.recount_territory()
+
+    x, y, start_x, start_y, direction, moving, returned, line_length = PLAYER.unpack_from(data, offset)
+    offset += PLAYER.size
+    player = xonix_logic.Player(config)
+    player.x = x
+    player.y = y
+    player.start_x = start_x
+    player.start_y = start_y
+    player.movement_direction = DIRECTIONS[direction]
+    player.moving = bool(moving)
+    player.returned_to_filled_area = bool(returned)
+    for _ in range(line_length):
+        player.add_line_position(LINE_POSITION.unpack_from(data, offset))
+        offset += LINE_POSITION.size
+    game_state.player = player
+
+    enemy_count, = COUNT.unpack_from(data, offset)
+    offset += COUNT.size
+    game_state.enemies = xonix_enemies.EnemyGroup(config)
+    for _ in range(enemy_count):
+        x, y, enemy_dx, enemy_dy, enemy_type = ENEMY.unpack_from(data, offset)
+        offset += ENEMY.size
+        enemy = xonix_logic.Enemy(x, y, ENEMY_TYPES[enemy_type], config, _RESTORE_RNG)
+        enemy.dx = enemy_dx
+        enemy.dy = enemy_dy
+        game_state.enemies.append(enemy)
+
+    return game_state
+
+def write_snapshot(game_state, path):
+    with open(path, 'wb') as file:
+        file.write(save_snapshot(game_state))
+
+def read_snapshot(path, config=None):
+    with open(path, 'rb') as file:
+        return load_snapshot(file.read(), config)
@@ -0,0 +1,301 @@
+# xonix_tournament.py - Parallel seeded tournaments for balance and regression statistics
+#
+# Plays many complete headless games, one seed each, across a process pool and
+# aggregates what happened: levels reached, score, game length (in ticks and
+# in seconds at GAME_SPEED_ADJUSTMENT ticks per second) and what cost every
+# life. Game i always uses seed base_seed + i, so the same command gives
+# the same report, and two reports that differ only in a --set override show
+# that constant's effect on exactly the same games.
+#
+#   python xonix_tournament.py --games 10000 --policy scripted
+#   python xonix_tournament.py --games 10000 --set UNITS_TO_WIN=150 --set CROCODILES_PER_LEVEL=2
+#   python xonix_tournament.py --games 2000 --results games.jsonl --report report.json
+
+import argparse
+import ast
+import json
+import multiprocessing
+import os
+import random
+import statistics
+import time
+from collections import Counter
+import xonix_logic
+import xonix_headless
+import xonix_bot
+
+DEFAULT_MAX_TICKS = 20000
+POLICIES = ('random', 'scripted', 'bot')
+BOT_BUDGET = 200  # Small search budget so bot tournaments finish in reasonable time
+
+# Direction names for the scripted policy
+LEGS = {
+    'left': (xonix_headless.KEY_LEFT, (-1, 0)),
+    'right': (xonix_headless.KEY_RIGHT, (1, 0)),
+    'up': (xonix_headless.KEY_UP, (0, -1)),
+    'down': (xonix_headless.KEY_DOWN, (0, 1)),
+}
+OPPOSITE = {'left': 'right', 'right': 'left', 'up': 'down', 'down': 'up'}
+SIDEWAYS = {'left': ('up', 'down'), 'right': ('up', 'down'), 'up': ('left', 'right'), 'down': ('left', 'right')}
+
+class RandomPolicy:
+    # Random keys held for a few ticks, like xonix_headless.random_inputs
+    def __init__(self, config, seed):
+        self.rng = random.Random(seed)
+        self.keys = xonix_headless.NO_KEYS
+        self.hold = 0
+
+    def decide(self, game_state):
+        if self.hold <= 0:
+            self.keys = self.rng.choice(xonix_headless.ALL_KEYS)
+            self.hold = self.rng.randint(1, 12)
+        self.hold -= 1
+        return self.keys
+
+class ScriptedPolicy:
+    # Out-and-back loops of random size: head into the unfilled area, step sideways
+    # and come back, without looking at the enemies. A cheap, repeatable baseline.
+    def __init__(self, config, seed):
+        self.config = config
+        self.rng = random.Random(seed)
+        self.plan = []
+
+    def open_directions(self, game_state):
+        # Directions whose neighbouring cell is unfilled
+        config = self.config
+        x = game_state.player.x // config.UNIT_SIZE
+        y = game_state.player.y // config.UNIT_SIZE
+        directions = []
+        for name, (_, (dx, dy)) in LEGS.items():
+            if (0 <= x + dx < config.GAME_LOGIC_AREA_WIDTH and 0 <= y + dy < config.GAME_LOGIC_AREA_HEIGHT and
+                    game_state.game_field[y + dy][x + dx] == config.GAME_FIELD_UNFILLED):
+                directions.append(name)
+        return directions
+
+    def decide(self, game_state):
+        if not self.plan:
+            directions = self.open_directions(game_state)
+            if directions:
+                out = self.rng.choice(directions)
+                length = self.rng.randint(1, 8)
+                self.plan = ([out] * length + [self.rng.choice(SIDEWAYS[out])] * self.rng.randint(1, 8) +
+                             [OPPOSITE[out]] * (length + 1))
+            else:
+                # Deep inside filled ground: take the shortest way back to open water
+                self.plan = [xonix_bot.direction_to_unfilled(self.config, game_state) or 'up']
+        # On filled ground the player keeps its axis until the keys are released
+        axis = 'horizontal' if self.plan[0] in ('left', 'right') else 'vertical'
+        if game_state.player.movement_direction not in (None, axis):
+            return xonix_headless.NO_KEYS
+        return LEGS[self.plan.pop(0)][0]
+
+class BotPolicy:
+    # The lookahead bot from xonix_bot with a small budget
+    def __init__(self, config, seed):
+        self.bot = xonix_bot.AutoPlayer(config, BOT_BUDGET)
+
+    def decide(self, game_state):
+        return self.bot.decide(game_state)
+
+def make_policy(name, config, seed):
+    if name == 'random':
+        return RandomPolicy(config, seed)
+    if name == 'scripted':
+        return ScriptedPolicy(config, seed)
+    if name == 'bot':
+        return BotPolicy(config, seed)
+    raise ValueError(f"Unknown policy {name!r}")
+
+def play_game(config, seed, policy_name, max_ticks=DEFAULT_MAX_TICKS):
+    # One game from the first tick until the last life is lost or max_ticks pass
+    engine = xonix_headless.HeadlessEngine(config, seed)
+    game_state = engine.game_state
+    policy = make_policy(policy_name, config, seed)
+    deaths = []  # (cause, level, tick) per life lost
+    level_ticks = []  # Ticks spent on each completed level
+    level_start = 0
+
+    while engine.ticks < max_ticks:
+        result = engine.step(policy.decide(game_state))
+        if result.collision:
+            deaths.append((game_state.last_hit, game_state.level, engine.ticks))
+        if result.level_up:
+            level_ticks.append(engine.ticks - level_start)
+            level_start = engine.ticks
+        if game_state.lives <= 0:
+            break
+
+    ticks_per_second = config.GAME_SPEED_ADJUSTMENT
+    return {
+        'seed': seed,
+        'level': game_state.level,
+        'levels_completed': engine.level_ups,
+        'score': game_state.score,
+        'ticks': engine.ticks,
+        'seconds': engine.ticks / ticks_per_second,
+        'game_over': game_state.lives <= 0,
+        'deaths': deaths,
+        'level_ticks': level_ticks,
+        'level_seconds': [ticks / ticks_per_second for ticks in level_ticks],
+    }
+
+def _play_job(job):
+    return play_game(*job)
+
+def parse_overrides(assignments):
+    # ['UNITS_TO_WIN=150', ...] -> {'UNITS_TO_WIN': 150, ...}
+    overrides = {}
+    for assignment in assignments:
+        name, _, value = assignment.partition('=')
+        if not name or not value:
+            raise ValueError(f"Expected NAME=VALUE, got {assignment!r}")
+        try:
+            overrides[name] = ast.literal_eval(value)
+        except (ValueError, SyntaxError):
+            overrides[name] = value
+    return overrides
+
+def make_config(size, overrides):
+    # Only settings the headless game uses can be overridden; apply_settings rejects
+    # the rest and recomputes what depends on the map layout
+    config = xonix_logic.GameConfig('classic', size)
+    config.apply_settings(overrides)
+    return config
+
+def distribution(values):
+    if not values:
+        return {}
+    values = sorted(values)
+    def pick(fraction):
+        return values[min(len(values) - 1, int(len(values) * fraction))]
+    return {
+        'mean': statistics.fmean(values),
+        'stdev': statistics.pstdev(values),
+        'min': values[0],
+        'p10': pick(0.10),
+        'p50': pick(0.50),
+        'p90': pick(0.90),
+        'p99': pick(0.99),
+        'max': values[-1],
+    }
+
+class TournamentReport:
+    # Aggregates game results as they stream in from the pool
+    def __init__(self):
+        self.games = 0
+        self.levels = []
+        self.scores = []
+        self.ticks = []
+        self.seconds = []
+        self.level_ticks = []
+        self.level_seconds = []
+        self.games_over = 0
+        self.death_causes = Counter()
+        self.deaths_by_level = Counter()
+
+    def add(self, result):
+        self.games += 1
+        self.levels.append(result['level'])
+        self.scores.append(result['score'])
+        self.ticks.append(result['ticks'])
+        self.seconds.append(result['seconds'])
+        self.level_ticks.extend(result['level_ticks'])
+        self.level_seconds.extend(result['level_seconds'])
+        self.games_over += result['game_over']
+        for cause, level, _ in result['deaths']:
+            self.death_causes[cause] += 1
+            self.deaths_by_level[level] += 1
+
+    def to_dict(self):
+        deaths = sum(self.death_causes.values())
+        return {
+            'games': self.games,
+            'games_over': self.games_over,
+            'level': distribution(self.levels),
+            'level_histogram': dict(sorted(Counter(self.levels).items())),
+            'score': distribution(self.scores),
+            'ticks': distribution(self.ticks),
+            'seconds': distribution(self.seconds),
+            'ticks_per_level': distribution(self.level_ticks),
+            'seconds_per_level': distribution(self.level_seconds),
+            'deaths': deaths,
+            'death_causes': {cause: count / deaths for cause, count in self.death_causes.most_common()} if deaths else {},
+            'deaths_by_level': dict(sorted(self.deaths_by_level.items())),
+        }
+
+    def print_summary(self):
+        report = self.to_dict()
+        print(f"{report['games']} games, {report['games_over']} ended by losing every life")
+        for name in ('level', 'score', 'ticks', 'seconds', 'ticks_per_level', 'seconds_per_level'):
+            values = report[name]
+            if values:
+                print(f"{name:>17}: mean {values['mean']:.1f}  p10 {values['p10']:.4g}  p50 {values['p50']:.4g}  "
+                      f"p90 {values['p90']:.4g}  max {values['max']:.4g}")
+        print("Levels reached:")
+        largest = max(report['level_histogram'].values(), default=0)
+        for level, count in report['level_histogram'].items():
+            print(f"  {level:>4} {count:>7}  {'#' * max(1, round(40 * count / largest))}")
+        print(f"Lives lost: {report['deaths']}")
+        for cause, share in report['death_causes'].items():
+            print(f"  {cause:>10} {share:6.1%}")
+
+def run_tournament(config, games, policy='random', base_seed=0, max_ticks=DEFAULT_MAX_TICKS,
+                   processes=None, results_path=None):
+    # processes=None uses every core, 0 plays in this process. Returns the report.
+    report = TournamentReport()
+    jobs = ((config, base_seed + index, policy, max_ticks) for index in range(games))
+    results_file = open(results_path, 'w') if results_path else None
+    try:
+        if processes == 0:
+            results = map(_play_job, jobs)
+            pool = None
+        else:
+            workers = processes or os.cpu_count() or 1
+            pool = multiprocessing.Pool(workers)
+            # Games finish in any order; small chunks keep every worker busy to the end
+            results = pool.imap_unordered(_play_job, jobs, chunksize=max(1, min(32, games // (workers * 8))))
+        for result in results:
+            report.add(result)
+            if results_file:
+                results_file.write(json.dumps(result) + '\n')
+        if pool:
+            pool.close()
+            pool.join()
+    finally:
+        if results_file:
+            results_file.close()
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description="Play many seeded Xonix games and report statistics")
+    parser.add_argument('--games', type=int, default=1000)
+    parser.add_argument('--size', choices=['small', 'big'], default='small')
+    parser.add_argument('--policy', choices=POLICIES, default='random')
+    parser.add_argument('--seed', type=int, default=0, help="seed of the first game; game i uses seed + i")
+    parser.add_argument('--max-ticks', type=int, default=DEFAULT_MAX_TICKS, help="ticks after which a game is cut off")
+    parser.add_argument('--processes', type=int, help="worker processes (default: one per core, 0: no pool)")
+    parser.add_argument('--set', action='append', default=[], metavar='NAME=VALUE', help="override a GameConfig setting")
+    parser.add_argument('--results', help="write one JSON line per game")
+    parser.add_argument('--report', help="write the aggregated report as JSON")
+    args = parser.parse_args()
+
+    try:
+        overrides = parse_overrides(args.set)
+        config = make_config(args.size, overrides)
+    except ValueError as error:
+        parser.error(str(error))
+    start_time = time.perf_counter()
+    report = run_tournament(config, args.games, args.policy, args.seed, args.max_ticks, args.processes, args.results)
+    elapsed = time.perf_counter() - start_time
+
+    report.print_summary()
+    print(f"Played in {elapsed:.1f} s ({report.games / elapsed:.1f} games/s)")
+    if args.report:
+        data = report.to_dict()
+        data['settings'] = {'size': args.size, 'policy': args.policy, 'seed': args.seed,
+                            'max_ticks': args.max_ticks, 'overrides': overrides}
+        with open(args.report, 'w') as file:
+            json.dump(data, file, indent=2)
+
+if __name__ == "__main__":
+    main()